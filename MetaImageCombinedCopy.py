@@ -1,4 +1,4 @@
-﻿# helper class to load MetaImage information from a file
+﻿# VR slice viewer for MetaImage files, the loader is in the metaimage package
 #
 # Copyright (C) 2008  'Peter Roesch' <Peter.Roesch@fh-augsburg.de>
 #
@@ -33,87 +33,12 @@ import vizinfo
 import os
 import shutil
 import vizconnect
-
-class MetaImage (object):
-    '''Load 3D image characteristics from a mhd file
-    '''
-    def __init__(self, fileName, doDataLoad=True):
-        self.__dataTypeMap = \
-                {'MET_UCHAR': numpy.uint8, 'MET_CHAR': numpy.int8,
-                 'MET_USHORT': numpy.uint16, 'MET_SHORT': numpy.int16,
-                 'MET_UINT': numpy.uint32, 'MET_INT': numpy.int32,
-                 'MET_ULONG': numpy.uint64, 'MET_LONG': numpy.int64,
-                 'MET_FLOAT': numpy.float32, 'MET_DOUBLE': numpy.float64}
-        self.__dic = {}
-        self.__loadMHD(fileName)
-        self.NDims = 3
-        if 'NDims' in self.__dic:
-            self.NDims = int(self.__dic['NDims'][0])
-        self.BinaryDataByteOrderMSB = []
-        if 'BinaryDataByteOrderMSB' in self.__dic:
-            self.BinaryDataByteOrderMSB \
-                = bool(self.__dic['BinaryDataByteOrderMSB'][0])
-        self.TransformMatrix = [1, 0, 0, 0, 1, 0, 0, 0, 1]
-        if 'TransformMatrix' in self.__dic:
-            self.__readPar('TransformMatrix', self.TransformMatrix,
-                           float, '0', 9)
-        self.Offset = []
-        self.__readPar('Offset', self.Offset, float, '0', self.NDims)
-        self.CenterOfRotation = []
-        self.__readPar('CenterOfRotation', self.CenterOfRotation,
-                       float, '0', self.NDims)
-        self.ElementSpacing = []
-        self.__readPar('ElementSpacing', self.ElementSpacing,
-                       float, '0', self.NDims)
-        self.DimSize = []
-        self.__readPar('DimSize', self.DimSize, int, '1', self.NDims)
-        self.ElementType = None
-        if 'ElementType' in self.__dic:
-            self.ElementType = self.__dic['ElementType'][0]
-            if self.ElementType in self.__dataTypeMap:
-                self.__numpyDataType = self.__dataTypeMap[self.ElementType]
-            else:
-                print('illegal data type ', self.ElementType)
-                sys.exit()
-        self.ElementDataFile = None
-        if 'ElementDataFile' in self.__dic:
-            self.ElementDataFile = self.__dic['ElementDataFile'][0]
-        self.dataArray = None
-        if doDataLoad:
-            self.__loadData(os.path.join(
-                os.path.dirname(fileName), self.ElementDataFile))
-
-    def __readPar(self, name, target, type, defaultValue, dim=3):
-        for i in range(dim):
-            if name in self.__dic:
-                target.append(type(self.__dic[name][i]))
-            else:
-                target.append(type(defaultValue))
-
-    def __loadMHD(self, fileName):
-        try:
-            mhdFile = open(fileName, 'r')
-        except FileNotFoundError:
-            print('could not open file ', fileName)
-            sys.exit()
-        for line in mhdFile:
-            words = line.split()
-            if len(words) > 0:
-                self.__dic[words[0]] = words[2:]
-        mhdFile.close()
-
-    def __loadData(self, fName):
-        try:
-            dataFile = open(fName, 'r')
-        except FileNotFoundError:
-            print('could not open file ', self.ElementDataFile)
-            sys.exit()
-        size = 1
-        for i in range(self.NDims):
-            size = size * self.DimSize[i]
-        tmpArray = numpy.fromfile(dataFile, self.__numpyDataType)
-        self.dataArray = tmpArray.reshape(self.DimSize[::-1])
-        dataFile.close()
+from metaimage import MetaImage
+from metaimage import slabs
+import orthogonal_viewer
+import quality_controller
+import slice_scrub
+import slice_textures
 
 #TestEvent, nothing more
 class QuadColorChanger(viz.EventClass):
@@ -211,63 +136,33 @@ if __name__ == '__main__':
     #Do something with 'key' variable 
         pass
 
-    #with movement to the back (scripted, not real)
-    def ChangeSliceTexture(sliceNumber):
-        TextureName = "textures/TextureConventNumber" + str(sliceNumber) + ".png"
-
-        #default number = 3.0
-        movementNumber = 3.0
-        # default multiplicator
-        multiNumber = 0.003921
-        newMovementNumber = movementNumber + (multiNumber * sliceNumber)
-        pic = viz.addTexture(TextureName) 
-        quad.setPosition([-.75, 2, newMovementNumber]) #put quad in view
-        quad.texture(pic)
-
-    #create the necessary texture, but still saved it
-    def CreateTextureOnTheFly(textureNumber):
-        
-        # create folder "textures
-        newpath = 'textures' 
-        if os.path.exists(newpath):
-            shutil.rmtree(r'textures')
-        if not os.path.exists(newpath):
-            os.makedirs(newpath)
-        
-        testSliceConvert = image.dataArray[:, textureNumber,:] #-> second number, from 0 to 255, all slices
-        testSliceConvert = testSliceConvert.astype(np.uint8)
-        testSliceImage = Image.fromarray(testSliceConvert, "L")
-        ImageFileName = "textures/TextureConventNumber" + str(textureNumber) + ".png"
-        print(ImageFileName)
-        testSliceImage.save(ImageFileName)
-        print("Created Slice Number ", textureNumber)
-        
-        ###test: image size
-        im = Image.open(ImageFileName)
-        width, height = im.size
-        print(width)
-        print(height)
-        ###test done
+    #slice textures are cached, grabbing the quad and moving it along its
+    #normal scrubs through the slices (movement to the back as before:
+    #3.0 + 0.003921 per slice)
+    #contiguous copies along all axes, dataArray[:, n, :] and
+    #dataArray[:, :, n] are strided
+    layout = image.buildLayout('axis')
+    sliceCache = slice_textures.SliceTextureCache(image.dataArray, axis=1, layout=layout)
+    scrubber = slice_scrub.SliceScrubber(quad, sliceCache, [-.75, 2, 3],
+                                         normal=[0, 0, 1], sliceSpacing=0.003921)
 
     def SetSliceNumber(pos):
-        #Make wheelbarrow spin according to slider position
-        #wheelbarrow.runAction( vizact.spin(0, -1, 0, 500 * pos) )
-        sliceNumber = pos * 255
-        print(int(round(sliceNumber)))
-        CreateTextureOnTheFly(int(round(sliceNumber)))
-        ChangeSliceTexture(int(round(sliceNumber)))
-        return int(round(sliceNumber))
+        sliceNumber = int(round(pos * 255))
+        print(sliceNumber)
+        scrubber.setSlice(sliceNumber)
+        return sliceNumber
 
-    ### experimental, maybe crap
     defaultNumber = 0
-    numberOfTexture = SetSliceNumber(defaultNumber)
-    TextureName = "TextureConventNumber" + str(numberOfTexture) + ".png"
+    SetSliceNumber(defaultNumber)
 
-    #Texture on 2d quad
-    pic = viz.addTexture(TextureName) 
-    #quad = viz.addTexQuad() 
-    quad.setPosition([-.75, 2, 3]) #put quad in view 
-    quad.texture(pic)
+    #thick slabs for vessels (MIP) and lungs (MinIP), 'm' cycles the modes
+    slabModes = [(1, None), (16, slabs.MIP), (16, slabs.MINIP), (16, slabs.AVERAGE)]
+    def NextSlabMode():
+        slabModes.append(slabModes.pop(0))
+        sliceCache.setSlab(*slabModes[0])
+        scrubber.refresh()
+
+    vizact.onkeydown('m', NextSlabMode)
 
     """
     #Texture on 3d object
@@ -277,6 +172,17 @@ if __name__ == '__main__':
     """
 
     vizact.onslider(slider, SetSliceNumber)
+
+    #axial, coronal and sagittal planes through a cursor which can be grabbed
+    orthoViewer = orthogonal_viewer.OrthogonalViewer(image, layout=layout, size=1.0, pos=[1, 1.5, 3])
+
+    #'c' switches CLAHE contrast enhancement of the slice textures
+    def ToggleEnhance():
+        sliceCache.setEnhance(not sliceCache.getEnhance())
+        scrubber.refresh()
+        orthoViewer.setEnhance(sliceCache.getEnhance())
+
+    vizact.onkeydown('c', ToggleEnhance)
    
     ###########
     #test, maybe crap: controlls with laser pointer / touch
@@ -284,11 +190,18 @@ if __name__ == '__main__':
     #Animate shapes
     #quad.addAction(vizact.spin(0,-1,0,15))
     
-    shapes = [quad]
+    shapes = [quad, orthoViewer.cursor]
     lp = vizconnect.getRawTool('highlighter')
     lp.setItems(shapes)
     grabber = vizconnect.getRawTool('grabber')
     grabber.setItems(shapes)
+
+    #keep 90 fps on the Rift: coarser slices and box instead of outline
+    #highlights while the frame time is too long
+    quality = quality_controller.QualityController([
+        quality_controller.sliceLevelKnob(sliceCache, scrubber, levels=[0, 1, 2]),
+        quality_controller.highlightKnob([grabber]),
+    ], targetFrameTime=1.0/90.0)
     
     
     def movePicture():
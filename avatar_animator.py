@@ -0,0 +1,71 @@
+"""Direct avatar animator with an update budget. It is the Direct animator
+of vizconnect, solving the skeleton exactly like it, but it is only given
+the bones somebody can see or depends on, and it skips the solve on frames
+in which none of its trackers moved."""
+
+import viz
+from vizconnect.util.avatar import animator
+
+
+def getNeededAssignments(trackerAssignmentDict, visibleBones=None, attachedBones=()):
+	"""Returns the part of a tracker assignment which needs solving: the
+	bones with a visible mesh or an attachment point, and the parents they
+	are solved relative to.
+
+	@param trackerAssignmentDict bone: (tracker, parent bone, degrees of freedom)
+	@param visibleBones bones with a visible mesh, None if all are visible
+	@param attachedBones bones carrying attachment points
+	"""
+	if visibleBones is None:
+		return dict(trackerAssignmentDict)
+	needed = set(bone for bone in trackerAssignmentDict
+					if bone in visibleBones or bone in attachedBones)
+	for bone in list(needed):
+		parent = trackerAssignmentDict[bone][1]
+		while parent in trackerAssignmentDict and parent not in needed:
+			needed.add(parent)
+			parent = trackerAssignmentDict[parent][1]
+	return dict((bone, trackerAssignmentDict[bone]) for bone in needed)
+
+
+class BudgetAnimator(animator.Direct):
+	"""Direct animator which solves only the visible and attached bones
+	with their parents, and only on frames in which a tracker of those
+	bones or the avatar moved.
+
+	@param visibleBones bones with a visible mesh, None if all are visible
+	@param attachedBones bones carrying attachment points, which are always solved
+	"""
+	def __init__(self,
+					avatar,
+					skeleton,
+					trackerAssignmentDict,
+					visibleBones=None,
+					attachedBones=(),
+					skipUnchanged=True,
+					**kwargs):
+		assignmentDict = getNeededAssignments(trackerAssignmentDict, visibleBones, attachedBones)
+		self._budgetAvatar = avatar
+		self._trackers = [tracker for tracker, parent, dof in assignmentDict.values()]
+		self._skipUnchanged = skipUnchanged
+		self._lastPoses = None
+		self.solveCount = 0
+		super(BudgetAnimator, self).__init__(avatar, skeleton, assignmentDict, **kwargs)
+
+	def getPoses(self):
+		"""Returns the global poses of the avatar and the solved trackers"""
+		poses = []
+		for node in [self._budgetAvatar]+self._trackers:
+			poses.append(node.getPosition(viz.ABS_GLOBAL))
+			poses.append(node.getQuat(viz.ABS_GLOBAL))
+		return poses
+
+	def update(self):
+		"""Solves the skeleton unless nothing moved since the last solve"""
+		if self._skipUnchanged:
+			poses = self.getPoses()
+			if poses == self._lastPoses:
+				return
+			self._lastPoses = poses
+		self.solveCount += 1
+		super(BudgetAnimator, self).update()
@@ -0,0 +1,69 @@
+"""Per-frame cost of the avatar animator in avatar_animator.py, measured with
+the headless harness. A full body tracker assignment is solved by the
+Direct animator of vizconnect, which solves every bone on every frame, and
+by the BudgetAnimator, where only the head and right hand are needed and
+the trackers only move during part of the run:
+
+	python benchmarks/bench_animator.py
+"""
+
+import math
+
+import harness
+viz = harness.install()
+
+import vizconnect
+from vizconnect.util.avatar import animator
+from vizconnect.util.avatar import skeleton
+
+import avatar_animator
+
+
+FRAMES = 600
+#fraction of the frames in which the trackers move
+MOVING_FRACTION = 0.25
+BONES = ['head', 'r_hand', 'l_hand', 'pelvis', 'r_foot', 'l_foot', 'r_elbow', 'l_elbow']
+PARENTS = {'r_hand':'head', 'l_hand':'head', 'r_elbow':'pelvis', 'l_elbow':'pelvis'}
+
+
+def makeScene():
+	"""Returns an avatar and a full body tracker assignment"""
+	avatar = viz.addAvatar('mark.cfg')
+	trackers = dict((bone, viz.addGroup()) for bone in BONES)
+	assignmentDict = dict((bone, (trackers[bone], PARENTS.get(bone), vizconnect.DOF_6DOF)) for bone in BONES)
+	return avatar, trackers, assignmentDict
+
+
+def moveTrackers(trackers, frame):
+	"""Moves all trackers during the first MOVING_FRACTION of every 100 frames"""
+	if frame%100 >= 100*MOVING_FRACTION:
+		return
+	for i, tracker in enumerate(trackers.values()):
+		angle = 0.05*frame+i
+		tracker.setPosition([0.2*math.sin(angle), 1.0+0.1*i, 0.2*math.cos(angle)])
+		tracker.setQuat([0.0, math.sin(0.5*angle), 0.0, math.cos(0.5*angle)])
+
+
+def runScenario(name, animatorClass, **kwargs):
+	viz.reset()
+	avatar, trackers, assignmentDict = makeScene()
+	rawAnimator = animatorClass(avatar, skeleton.CompleteCharactersHD(avatar), assignmentDict, **kwargs)
+	stats = harness.runFrames(name, FRAMES, lambda frame: moveTrackers(trackers, frame))
+	if hasattr(rawAnimator, 'solveCount'):
+		stats.name = '%s (%d solves)' % (name, rawAnimator.solveCount)
+	return stats
+
+
+def main():
+	budget = avatar_animator.BudgetAnimator
+	harness.printStats([
+		runScenario('Direct', animator.Direct),
+		runScenario('budget, every frame', budget, skipUnchanged=False),
+		runScenario('budget, skip unchanged', budget),
+		runScenario('budget, visible, every frame', budget, visibleBones=['r_hand'], attachedBones=['head'], skipUnchanged=False),
+		runScenario('budget, visible, skip unchanged', budget, visibleBones=['r_hand'], attachedBones=['head']),
+	], title='avatar animator, %d bones, trackers moving %d%% of the frames' % (len(BONES), 100*MOVING_FRACTION))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,101 @@
+"""Per-frame cost of cine playback in cine_player.py, measured with the
+headless harness at 90 frames per second in real time, so the loading
+thread of metaimage/sequence.py gets the time between frames it would get
+in VR. The baseline loads the volume of every timepoint when it is due, in
+the render loop; the player shows the slices of volumes preloaded into a
+ring of buffers. The volume files are usually in the page cache after
+writing, real disks make the baseline slower still:
+
+	python benchmarks/bench_cine.py [size] [timepoints]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import harness
+viz = harness.install()
+
+import numpy
+import vizact
+
+import metaimage
+from metaimage import sequence
+from metaimage import slices
+import cine_player
+
+
+FPS = 15.0
+FRAMES = 270
+
+
+def writeSequence(directory, size, count):
+	"""Writes count uint8 volumes and returns their file names"""
+	rand = numpy.random.RandomState(1)
+	fileNames = []
+	for t in range(count):
+		fileName = os.path.join(directory, 'volume%02d.mhd' % t)
+		with open(fileName, 'w') as mhd:
+			mhd.write('NDims = 3\nDimSize = %d %d %d\nElementSpacing = 1 1 1\n'
+						'ElementType = MET_UCHAR\nElementDataFile = volume%02d.raw\n' % (size, size, size, t))
+		rand.randint(0, 256, size**3).astype(numpy.uint8).tofile(os.path.join(directory, 'volume%02d.raw' % t))
+		fileNames.append(fileName)
+	return fileNames
+
+
+def realTime():
+	"""Returns a harness script which sleeps until the next frame is due"""
+	clock = getattr(time, 'perf_counter', time.time)
+	state = [clock()]
+	def wait(frame):
+		state[0] += 1.0/90.0
+		delay = state[0]-clock()
+		if delay > 0:
+			time.sleep(delay)
+		else:
+			state[0] = clock()
+	return wait
+
+
+def runBaseline(fileNames, directory):
+	viz.reset()
+	quad = viz.addTexQuad()
+	state = {'elapsed':0.0, 'time':0}
+	def step():
+		state['elapsed'] += viz.getFrameElapsed()
+		if state['elapsed'] < 1.0/FPS:
+			return
+		state['elapsed'] -= 1.0/FPS
+		state['time'] = (state['time']+1)%len(fileNames)
+		image = metaimage.MetaImage(fileNames[state['time']])
+		fileName = os.path.join(directory, 'baseline.bmp')
+		slices.saveImage(slices.toGrey(slices.getSlice(image.dataArray, 0, image.dataArray.shape[0]//2)), fileName)
+		quad.texture(viz.addTexture(fileName))
+	vizact.onupdate(0, step)
+	return harness.runFrames('load every timepoint when due', FRAMES, realTime())
+
+
+def runPlayer(fileNames, directory):
+	viz.reset()
+	volumes = sequence.VolumeSequence(fileNames, ringSize=4)
+	player = cine_player.CinePlayer(volumes, viz.addTexQuad(), axis=0, fps=FPS, directory=directory)
+	player.play()
+	stats = harness.runFrames('preloaded ring of 4 volumes', FRAMES, realTime())
+	print('player kept a timepoint %d times, ring %.0f MB' % (player.getHeldFrames(), volumes.getMemorySize()/1e6))
+	player.remove()
+	volumes.close()
+	return stats
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+	count = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+	directory = tempfile.mkdtemp()
+	fileNames = writeSequence(directory, size, count)
+	harness.printStats([runBaseline(fileNames, directory), runPlayer(fileNames, directory)],
+						title='cine playback at %g fps, %d timepoints of %d^3 uint8' % (FPS, count, size))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,72 @@
+"""Cost of switching the CLAHE enhancement of slice textures in
+slice_textures.py, measured with the headless harness. The baseline extracts
+the slice, enhances it and writes its texture on every switch; the cache
+keeps the grey image, tile lookup tables and both textures of each slice,
+so after the first switch a switch only returns the other texture:
+
+	python benchmarks/bench_clahe.py [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import harness
+viz = harness.install()
+
+import numpy
+
+from metaimage import contrast
+from metaimage import slices
+import slice_textures
+
+
+SLICES = 16
+SWITCHES = 8
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+	rand = numpy.random.RandomState(1)
+	volume = numpy.clip(rand.normal(80.0, 20.0, (SLICES, size, size)), 0, 255).astype(numpy.uint8)
+	clock = getattr(time, 'perf_counter', time.time)
+	directory = tempfile.mkdtemp()
+	print('CLAHE switching, %d slices of %d^2 uint8, 8x8 tiles' % (SLICES, size))
+	print('%-34s %12s' % ('step', 'ms per slice'))
+
+	def report(name, function):
+		start = clock()
+		for i in range(SWITCHES):
+			for index in range(SLICES):
+				function(index, i%2 == 0)
+		print('%-34s %12.2f' % (name, (clock()-start)*1e3/(SWITCHES*SLICES)))
+
+	def baseline(index, enhance):
+		image = slices.toGrey(slices.getSlice(volume, 0, index))
+		if enhance:
+			image = contrast.clahe(image)
+		fileName = os.path.join(directory, 'baseline%d.bmp' % index)
+		slices.saveImage(image, fileName)
+		viz.addTexture(fileName)
+	report('re-extract and enhance every switch', baseline)
+
+	cache = slice_textures.SliceTextureCache(volume, axis=0, capacity=SLICES, directory=directory, extension='.bmp')
+	start = clock()
+	for index in range(SLICES):
+		cache.getTexture(index)
+	print('%-34s %12.2f' % ('plain texture, first time', (clock()-start)*1e3/SLICES))
+	cache.setEnhance(True)
+	start = clock()
+	for index in range(SLICES):
+		cache.getTexture(index)
+	print('%-34s %12.2f' % ('enhanced texture, first time', (clock()-start)*1e3/SLICES))
+
+	def switch(index, enhance):
+		cache.setEnhance(enhance)
+		cache.getTexture(index)
+	report('cached switch', switch)
+
+
+if __name__ == '__main__':
+	main()
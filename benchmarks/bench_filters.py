@@ -0,0 +1,50 @@
+"""Thread scaling of the filters in metaimage/filters.py on a noisy
+128 x 256 x 256 uint8 volume. Each filter runs with 1 thread up to the
+number of cores (at least 4); the speedup is relative to 1 thread. Every
+run after the first reuses the filter's scratch buffers:
+
+	python benchmarks/bench_filters.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metaimage import filters
+
+
+def main():
+	rand = numpy.random.RandomState(1)
+	volume = numpy.zeros((128, 256, 256), numpy.float32)
+	volume[32:96, 64:192, 64:192] = 160.0
+	volume = numpy.clip(volume+rand.normal(0.0, 25.0, volume.shape), 0, 255).astype(numpy.uint8)
+	cores = os.cpu_count() or 1
+	threadCounts = sorted(set([1, 2, 4, cores]))
+	clock = getattr(time, 'perf_counter', time.time)
+	print('filters on %s uint8, %d cores' % (volume.shape, cores))
+	print('%-28s %8s %10s %10s %12s' % ('filter', 'threads', 'time [s]', 'speedup', 'scratch [MB]'))
+	cases = [('gaussian sigma 1.5', lambda threads: filters.GaussianFilter(1.5, threads=threads)),
+			('median 3^3', lambda threads: filters.MedianFilter(3, threads=threads)),
+			('diffusion 5 iterations', lambda threads: filters.DiffusionFilter(5, 30.0, threads=threads))]
+	for name, makeFilter in cases:
+		single = None
+		for threads in threadCounts:
+			volumeFilter = makeFilter(threads)
+			volumeFilter.apply(volume[:16])
+			start = clock()
+			volumeFilter.apply(volume)
+			seconds = clock()-start
+			if single is None:
+				single = seconds
+			print('%-28s %8d %10.2f %10.2f %12.1f' % (name, threads, seconds, single/seconds,
+														volumeFilter.getScratchMemorySize()/2.0**20))
+
+
+if __name__ == '__main__':
+	main()
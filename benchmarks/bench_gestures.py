@@ -0,0 +1,65 @@
+"""Per-frame cost of the hand gestures in hand_gestures.py, measured with the
+headless harness. The mouse button is held for a third of the run. The
+baseline polls the button and re-applies the finger pose every frame like
+the hand model does. The gesture hand of the desktop configuration, built
+with hand_gestures.addGestureHand, only blends after a change:
+
+	python benchmarks/bench_gestures.py
+"""
+
+import harness
+viz = harness.install()
+
+import vizact
+
+import hand_gestures
+import input_bindings
+
+
+FRAMES = 600
+MOUSEBUTTON_LEFT = 1
+FLAT, FIST = 0, 1
+FLEXION = {FLAT:(0, 0, 0, 0, 0), FIST:(1, 1, 1, 1, 1)}
+
+
+class ScriptedMouse(object):
+	def __init__(self):
+		self.state = 0
+
+	def getState(self):
+		return self.state
+
+
+def press(mouse, frame):
+	mouse.state = MOUSEBUTTON_LEFT if FRAMES//3 <= frame < 2*FRAMES//3 else 0
+
+
+def runBaseline():
+	viz.reset()
+	mouse = ScriptedMouse()
+	avatar = viz.addAvatar('mark.cfg')
+	machine = hand_gestures.GestureStateMachine(input_bindings.InputSnapshot({'mouse':mouse}), [], FLAT)
+	blender = hand_gestures.FingerPoseBlender(avatar, machine, FLEXION)
+	blender.remove()
+	def reapply():
+		data = (FIST if mouse.getState()&MOUSEBUTTON_LEFT else FLAT, False, False)
+		blender._applyPose(blender.getPose(data[0]))
+	vizact.onupdate(0, reapply)
+	return harness.runFrames('re-apply every frame', FRAMES, lambda frame: press(mouse, frame))
+
+
+def runStateMachine():
+	viz.reset()
+	mouse = ScriptedMouse()
+	avatar = viz.addAvatar('mark.cfg')
+	snapshot = input_bindings.InputSnapshot({'mouse':mouse})
+	hand_gestures.addGestureHand(avatar, snapshot, [('mouse', MOUSEBUTTON_LEFT, FIST)], FLAT, FLEXION, left=False)
+	return harness.runFrames('gesture hand (desktop configuration)', FRAMES, lambda frame: press(mouse, frame))
+
+
+def main():
+	harness.printStats([runBaseline(), runStateMachine()], title='hand gestures, 15 finger bones')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,115 @@
+"""Per-frame cost of the grabbers in grabber.py, measured with the headless
+harness. Each scenario scripts a hand or ray sweeping over N items, grabbing
+one of them, moving it and releasing it again:
+
+	python benchmarks/bench_grabber.py [N ...]
+"""
+
+import sys
+
+import harness
+viz = harness.install()
+
+import grabber
+import multi_grabber
+import ray_batch
+import tools.collision_test
+import vizshape
+
+
+ITEM_COUNTS = (10, 100, 1000)
+FRAMES = 300
+GRAB_FRAMES = (120, 210)
+
+
+def makeItems(count):
+	"""Places count small spheres on a grid in the plane z=2"""
+	side = max(1, int(round(count**0.5)))
+	items = []
+	for i in range(count):
+		item = vizshape.addSphere(0.05)
+		item.setPosition([-1.0+2.0*(i%side)/side, -1.0+2.0*(i//side)/side, 2.0])
+		items.append(item)
+	return items
+
+
+def sweep(frame, y=0.0, z=2.0):
+	"""Returns the scripted position of a hand or ray origin"""
+	t = (frame%150)/150.0
+	return [-1.0+2.0*t, y, z]
+
+
+def holdWhileGrabbing(tool):
+	if getattr(tool, 'grabRequested', False):
+		tool.grabAndHold()
+
+
+def runScenario(name, tools, count):
+	"""Runs the grab script for the given tools and returns the frame stats"""
+	def script(frame):
+		for i, tool in enumerate(tools):
+			tool.setPosition(sweep(frame, y=0.25*i, z=tool.scriptZ))
+			tool.grabRequested = GRAB_FRAMES[0] <= frame < GRAB_FRAMES[1]
+	for tool in tools:
+		tool.setUpdateFunction(holdWhileGrabbing)
+	return harness.runFrames('%s, %d items' % (name, count), FRAMES, script)
+
+
+def handGrabber(usingPhysics, perItem=False):
+	tool = grabber.HandGrabber(usingPhysics=usingPhysics, usingSprings=False)
+	if perItem:
+		# the Distance tester, which checks every item, instead of the proximity grid
+		previous = tool.getCollisionTester()
+		tool.setCollisionTester(tools.collision_test.Distance(node=tool._node))
+		previous.remove()
+	tool.scriptZ = 2.0
+	return tool
+
+
+def rayGrabber(rayBatch=None):
+	tool = grabber.RayGrabber(rayBatch=rayBatch)
+	tool.scriptZ = 0.0
+	return tool
+
+
+def scenarios():
+	yield 'HandGrabber (distance)', lambda: [handGrabber(False, perItem=True)]
+	yield 'HandGrabber (grid)', lambda: [handGrabber(False)]
+	yield 'HandGrabber (physics)', lambda: [handGrabber(True)]
+	yield 'RayGrabber', lambda: [rayGrabber()]
+	yield 'RayGrabber (ray batch)', lambda: [rayGrabber(ray_batch.RayBatch())]
+	yield 'four RayGrabbers', lambda: [rayGrabber() for i in range(4)]
+	def batched():
+		batch = ray_batch.RayBatch()
+		return [rayGrabber(batch) for i in range(4)]
+	yield 'four RayGrabbers (ray batch)', batched
+	yield 'two HandGrabbers', lambda: [handGrabber(False), handGrabber(False)]
+	def coordinated():
+		tools = [handGrabber(False), handGrabber(False)]
+		multi_grabber.MultiHandCoordinator(tools)
+		return tools
+	yield 'two HandGrabbers (coordinated)', coordinated
+
+
+def main(counts):
+	for count in counts:
+		statsList = []
+		for name, makeTools in scenarios():
+			viz.reset()
+			items = makeItems(count)
+			tools = makeTools()
+			coordinator = tools[0].getCoordinator()
+			if coordinator is not None:
+				coordinator.setItems(items)
+			else:
+				for tool in tools:
+					tool.setItems(items)
+			statsList.append(runScenario(name, tools, count))
+			for tool in tools:
+				tool.remove()
+		harness.printStats(statsList)
+		print('')
+
+
+if __name__ == '__main__':
+	main([int(arg) for arg in sys.argv[1:]] or ITEM_COUNTS)
@@ -0,0 +1,94 @@
+"""Import and worker start-up cost of the metaimage package. Each case runs
+in a fresh interpreter and the start-up time of an empty interpreter is
+subtracted. The module level imports of MetaImageCombinedCopy.py without the
+Vizard modules are the baseline; scipy.misc is left out if scipy is not
+installed. The pool cases start process pool workers with the spawn method,
+as on Windows, and send each a loaded or a memory mapped 256^3 MetaImage:
+
+	python benchmarks/bench_import.py
+"""
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+RUNS = 5
+WORKERS = 4
+
+BASELINE = '''
+import numpy
+from PIL import Image
+try:
+    import scipy.misc
+except ImportError:
+    pass
+'''
+
+POOL = '''
+import concurrent.futures
+import multiprocessing
+import pickle
+import sys
+import metaimage
+
+def sliceMean(data):
+    image = pickle.loads(data)
+    return float(image.dataArray[:, 0, :].mean())
+
+if __name__ == '__main__':
+    image = metaimage.MetaImage(sys.argv[1], memoryMap=sys.argv[2] == 'map')
+    data = pickle.dumps(image)
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(%d, mp_context=context) as pool:
+        list(pool.map(sliceMean, [data]*%d))
+''' % (WORKERS, WORKERS)
+
+def writeVolume(directory, shape=(256, 256, 256)):
+	"""Writes a uint8 volume and returns the name of its mhd file"""
+	fileName = os.path.join(directory, 'volume.mhd')
+	with open(fileName, 'w') as mhd:
+		mhd.write('NDims = 3\nDimSize = %d %d %d\nElementType = MET_UCHAR\nElementDataFile = volume.raw\n' % shape[::-1])
+	with open(os.path.join(directory, 'volume.raw'), 'wb') as raw:
+		raw.write(os.urandom(shape[0]*shape[1]*shape[2]))
+	return fileName
+
+
+def measure(directory, name, code, *args):
+	"""Returns the best wall time in seconds of running code RUNS times in
+	a fresh interpreter
+	"""
+	caseFile = os.path.join(directory, name+'.py')
+	with open(caseFile, 'w') as case:
+		case.write(code)
+	env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	clock = getattr(time, 'perf_counter', time.time)
+	times = []
+	for run in range(RUNS):
+		start = clock()
+		subprocess.check_call([sys.executable, caseFile]+list(args), env=env, cwd=directory)
+		times.append(clock()-start)
+	return min(times)
+
+
+def main():
+	directory = tempfile.mkdtemp()
+	volume = writeVolume(directory)
+	empty = measure(directory, 'empty', 'pass\n')
+	rows = [('numpy, PIL, scipy.misc (old module level)', measure(directory, 'baseline', BASELINE)),
+			('import metaimage', measure(directory, 'package', 'import metaimage\n')),
+			('import metaimage, read header', measure(directory, 'header', 'import metaimage, sys\nmetaimage.MetaImage(sys.argv[1], doDataLoad=False)\n', volume)),
+			('%d spawned workers, loaded volume' % WORKERS, measure(directory, 'pool', POOL, volume, 'load')),
+			('%d spawned workers, mapped volume' % WORKERS, measure(directory, 'pool', POOL, volume, 'map'))]
+	print('import cost, best of %d runs, empty interpreter: %.1f ms' % (RUNS, empty*1e3))
+	print('%-45s %10s' % ('case', 'time [ms]'))
+	for name, seconds in rows:
+		print('%-45s %10.1f' % (name, (seconds-empty)*1e3))
+
+
+if __name__ == '__main__':
+	main()
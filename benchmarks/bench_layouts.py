@@ -0,0 +1,64 @@
+"""Per-axis slice latency of the layouts in metaimage/layouts.py. Random
+slices of a uint8 volume are extracted along each array axis and made
+contiguous, as needed for a texture upload, from the plain C ordered array,
+the axis-major copies and the bricked layout:
+
+	python benchmarks/bench_layouts.py [size]
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metaimage import layouts
+
+
+SLICES = 64
+
+
+class PlainLayout(object):
+	def __init__(self, dataArray):
+		self.dataArray = dataArray
+
+	def getSlice(self, axis, index):
+		return numpy.take(self.dataArray, index, axis=axis)
+
+
+def measure(layout, axis, indices):
+	"""Returns the mean time in seconds per contiguous slice"""
+	clock = getattr(time, 'perf_counter', time.time)
+	start = clock()
+	for index in indices:
+		numpy.ascontiguousarray(layout.getSlice(axis, index))
+	return (clock()-start)/len(indices)
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+	volume = numpy.random.RandomState(1).randint(0, 256, (size, size, size)).astype(numpy.uint8)
+	clock = getattr(time, 'perf_counter', time.time)
+	cases = [('C ordered array', lambda: PlainLayout(volume)),
+			('axis-major copies', lambda: layouts.AxisMajorLayout(volume)),
+			('bricks of 16^3', lambda: layouts.BrickedLayout(volume, 16)),
+			('bricks of 32^3', lambda: layouts.BrickedLayout(volume, 32))]
+	print('slice latency, %d^3 uint8 volume, %d random slices per axis' % (size, SLICES))
+	print('%-22s %10s %10s %10s %10s %10s' % ('layout', 'build [ms]', 'z [us]', 'y [us]', 'x [us]', 'extra [MB]'))
+	for name, build in cases:
+		start = clock()
+		layout = build()
+		buildTime = clock()-start
+		rand = random.Random(2)
+		times = [measure(layout, axis, [rand.randrange(size) for i in range(SLICES)]) for axis in range(3)]
+		extra = getattr(layout, 'getMemorySize', lambda: 0)()/2.0**20
+		print('%-22s %10.1f %10.1f %10.1f %10.1f %10.1f' % ((name, buildTime*1e3)+tuple(t*1e6 for t in times)+(extra,)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,73 @@
+"""Per-frame cost of the three-plane viewer in orthogonal_viewer.py, measured
+with the headless harness. The cursor moves one voxel along x, y and z every
+frame, so all three planes change. The baseline re-extracts all three slices
+from the C ordered array and writes their textures every frame; the viewer
+slices axis-major copies, shows the nearest cached slices and loads one exact
+texture per frame:
+
+	python benchmarks/bench_orthoviewer.py [size]
+"""
+
+import os
+import sys
+import tempfile
+
+import harness
+viz = harness.install()
+
+import numpy
+import vizact
+
+import metaimage
+from metaimage import slices
+import orthogonal_viewer
+
+
+FRAMES = 120
+
+
+def writeVolume(directory, size):
+	"""Writes a uint8 volume and returns its MetaImage"""
+	fileName = os.path.join(directory, 'volume.mhd')
+	with open(fileName, 'w') as mhd:
+		mhd.write('NDims = 3\nDimSize = %d %d %d\nElementSpacing = 1 1 1\n'
+					'ElementType = MET_UCHAR\nElementDataFile = volume.raw\n' % (size, size, size))
+	numpy.random.RandomState(1).randint(0, 256, size**3).astype(numpy.uint8).tofile(os.path.join(directory, 'volume.raw'))
+	return metaimage.MetaImage(fileName)
+
+
+def runBaseline(image, directory):
+	viz.reset()
+	size = image.dataArray.shape[0]
+	def extractAll():
+		n = viz.getFrameNumber()%size
+		for axis in range(3):
+			fileName = os.path.join(directory, 'baseline%d.png' % axis)
+			slices.saveImage(slices.toGrey(slices.getSlice(image.dataArray, axis, n)), fileName)
+			viz.addTexture(fileName)
+	vizact.onupdate(0, extractAll)
+	return harness.runFrames('all planes every frame', FRAMES)
+
+
+def runViewer(image, directory):
+	viz.reset()
+	layout = image.buildLayout('axis')
+	viewer = orthogonal_viewer.OrthogonalViewer(image, layout=layout, directory=directory)
+	size = image.dataArray.shape[0]
+	def moveCursor(frame):
+		viewer.cursor.setPosition(viewer.node.getMatrix(viz.ABS_GLOBAL).preMultVec([(frame%size)+0.5]*3))
+	stats = harness.runFrames('changed planes, one upload per frame', FRAMES, moveCursor)
+	image.clearLayout()
+	return stats
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+	directory = tempfile.mkdtemp()
+	image = writeVolume(directory, size)
+	harness.printStats([runBaseline(image, directory), runViewer(image, directory)],
+						title='three-plane viewer, %d^3 uint8 volume' % size)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,105 @@
+"""Memory and switching cost of label overlays, metaimage/labelmaps.py and
+slice_textures.py, measured with the headless harness. The labels are the
+connected components of spheres in a volume. The baseline keeps the label
+volume and extracts the grey and label slices, blends and writes the
+texture on every switch; the cache keeps the grey image and both textures
+of each slice, so after the first switch a switch only returns the other
+texture. Compositing is one gather from a table of the blended colour of
+every label and grey value:
+
+	python benchmarks/bench_overlay.py [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import harness
+viz = harness.install()
+
+import numpy
+
+from metaimage import labelmaps
+from metaimage import segmentation
+from metaimage import slices
+import slice_textures
+
+
+SLICES = 16
+SWITCHES = 8
+AXIS = 1
+
+
+def makeVolume(size):
+	"""Returns a uint8 volume with spheres of values 150 to 200"""
+	rand = numpy.random.RandomState(0)
+	volume = rand.randint(0, 40, (size, size, size)).astype(numpy.uint8)
+	for i in range(6):
+		radius = rand.randint(size//25, size//8)
+		centre = rand.randint(radius, size-radius, 3)
+		z, y, x = numpy.ogrid[-radius:radius+1, -radius:radius+1, -radius:radius+1]
+		box = tuple(slice(c-radius, c+radius+1) for c in centre)
+		volume[box][z*z+y*y+x*x <= radius*radius] = 150+i*10
+	return volume
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+	volume = makeVolume(size)
+	labels, count = segmentation.labelComponents(volume, 150)
+	clock = getattr(time, 'perf_counter', time.time)
+	start = clock()
+	runs = labelmaps.RunLengthLabels(labels)
+	encoding = clock()-start
+	print('label overlay, %d^3 uint8 volume, %d labels' % (size, count))
+	print('label volume %.1f MB, runs of all three axes %.2f MB, encoded in %.2f s'
+			% (labels.nbytes/1e6, runs.getMemorySize()/1e6, encoding))
+	palette = labelmaps.getPalette(count)
+	table = labelmaps.getBlendTable(palette)
+	indices = [size//2+i for i in range(-SLICES//2, SLICES//2)]
+	start = clock()
+	for index in indices:
+		runs.getSlice(AXIS, index)
+	print('decode %.3f ms per slice' % ((clock()-start)*1e3/SLICES))
+	grey = slices.getSlice(volume, AXIS, indices[0])
+	labelSlice = runs.getSlice(AXIS, indices[0])
+	start = clock()
+	for index in indices:
+		labelmaps.blend(grey, labelSlice, table)
+	print('blend %.3f ms per slice' % ((clock()-start)*1e3/SLICES))
+
+	directory = tempfile.mkdtemp()
+	print('%-34s %12s' % ('switch', 'ms per slice'))
+
+	def report(name, function):
+		start = clock()
+		for i in range(SWITCHES):
+			for index in indices:
+				function(index, i%2 == 0)
+		print('%-34s %12.3f' % (name, (clock()-start)*1e3/(SWITCHES*SLICES)))
+
+	def baseline(index, visible):
+		image = slices.toGrey(slices.getSlice(volume, AXIS, index))
+		if visible:
+			image = labelmaps.blend(image, slices.getSlice(labels, AXIS, index), table)
+		fileName = os.path.join(directory, 'baseline%d.bmp' % index)
+		slices.saveImage(image, fileName)
+		viz.addTexture(fileName)
+	report('re-extract and blend every switch', baseline)
+
+	cache = slice_textures.SliceTextureCache(volume, axis=AXIS, capacity=SLICES, directory=directory, extension='.bmp')
+	cache.setOverlay(runs, palette)
+	for visible in (False, True):
+		cache.setOverlayVisible(visible)
+		for index in indices:
+			cache.getTexture(index)
+
+	def switch(index, visible):
+		cache.setOverlayVisible(visible)
+		cache.getTexture(index)
+	report('cached switch', switch)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,64 @@
+"""Frame time control of quality_controller.py, simulated with the headless
+harness. The scene costs 5 ms per frame plus noise, and 8.5 ms during a
+heavy phase in the middle of the run. Each knob level saves a fixed cost.
+A controller reacting to every single frame is compared with the default
+hysteresis settings by the number of quality changes and of frames over
+the 90 fps budget:
+
+	python benchmarks/bench_quality.py
+"""
+
+import random
+
+import harness
+viz = harness.install()
+
+import quality_controller
+
+
+FRAMES = 2700
+BUDGET = 1.0/90.0
+#cost in seconds of each level of slice level and highlight
+KNOB_COSTS = [('slice level', (0.0015, 0.0007, 0.0003)),
+				('highlight', (0.0006, 0.0002))]
+
+
+def sceneCost(frame, rand):
+	base = 0.0085 if FRAMES//3 <= frame < 2*FRAMES//3 else 0.0050
+	return base+rand.gauss(0.0, 0.0008)
+
+
+def run(name, **kwargs):
+	viz.reset()
+	rand = random.Random(1)
+	costs = {}
+	def makeApply(knobName, levelCosts):
+		def apply(value):
+			costs[knobName] = levelCosts[value]
+		return apply
+	knobs = [quality_controller.QualityKnob(knobName, range(len(levelCosts)), makeApply(knobName, levelCosts))
+				for knobName, levelCosts in KNOB_COSTS]
+	controller = quality_controller.QualityController(knobs, targetFrameTime=BUDGET, **kwargs)
+	overBudget = 0
+	levelSum = 0
+	for frame in range(FRAMES):
+		elapsed = sceneCost(frame, rand)+sum(costs.values())
+		if elapsed > BUDGET:
+			overBudget += 1
+		levelSum += sum(controller.getLevels().values())
+		viz.stepFrame(elapsed)
+	return name, controller.changeCount, overBudget, levelSum/float(FRAMES)
+
+
+def main():
+	rows = [run('every frame', degradeRatio=1.0, improveRatio=1.0, degradeFrames=1, improveFrames=1,
+				maxImproveFrames=1, cooldownFrames=0, smoothing=1.0),
+			run('hysteresis (defaults)')]
+	print('adaptive quality, %d frames, heavy phase in the middle third' % FRAMES)
+	print('%-40s %10s %12s %12s' % ('controller', 'changes', 'over budget', 'mean level'))
+	for row in rows:
+		print('%-40s %10d %12d %12.2f' % row)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,79 @@
+"""Benchmark for batched ray queries against item bounds. Compares one
+vectorized query for all rays of a frame with one query per ray, and with
+testing the items one by one for every ray like tools.collision_test.Ray,
+for 1, 2 and 16 rays. Only the box pass is measured; the exact intersection
+of the boxes hit costs the same for every variant. Runs without the Vizard
+runtime:
+
+	python benchmarks/bench_ray_queries.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import spatial
+
+
+RAY_COUNTS = (1, 2, 16)
+ITEM_COUNTS = (10, 100, 1000)
+REPEAT = 200
+
+
+def makeScene(itemCount, rayCount, seed=0):
+	"""Returns random item boxes and rays pointing into the item cloud"""
+	random = numpy.random.RandomState(seed)
+	centers = random.uniform(-5.0, 5.0, (itemCount, 3))
+	sizes = random.uniform(0.05, 0.5, (itemCount, 3))
+	origins = random.uniform(-1.0, 1.0, (rayCount, 3))-[0.0, 0.0, 10.0]
+	directions = centers[random.randint(0, itemCount, rayCount)]-origins
+	directions /= numpy.linalg.norm(directions, axis=1)[:, None]
+	return centers-sizes, centers+sizes, origins, directions
+
+
+def batched(mins, maxs, origins, directions):
+	return spatial.nearestHits(spatial.rayBoxDistances(origins, directions, mins, maxs))
+
+
+def perRay(mins, maxs, origins, directions):
+	return [spatial.nearestHits(spatial.rayBoxDistances(origins[i], directions[i], mins, maxs))
+			for i in range(len(origins))]
+
+
+def perItem(mins, maxs, origins, directions):
+	"""Tests the bounding sphere of every item for every ray in a loop"""
+	centers = ((mins+maxs)/2.0).tolist()
+	radii = (numpy.linalg.norm(maxs-mins, axis=1)/2.0).tolist()
+	hits = []
+	for origin, direction in zip(origins.tolist(), directions.tolist()):
+		nearest, nearestDist = -1, -1
+		for index, (center, radius) in enumerate(zip(centers, radii)):
+			delta = [c-o for c, o in zip(center, origin)]
+			along = sum(d*f for d, f in zip(delta, direction))
+			off = sum(d*d for d in delta)-along*along
+			if along < 0 or off > radius*radius:
+				continue
+			dist = along-(radius*radius-off)**0.5
+			if nearest < 0 or dist < nearestDist:
+				nearest, nearestDist = index, dist
+		hits.append((nearest, nearestDist))
+	return hits
+
+
+def main():
+	print('%6s %6s %14s %14s %15s %8s' % ('items', 'rays', 'batched [us]', 'per ray [us]', 'per item [us]', 'speedup'))
+	for itemCount in ITEM_COUNTS:
+		for rayCount in RAY_COUNTS:
+			scene = makeScene(itemCount, rayCount)
+			batchedTime = min(timeit.repeat(lambda: batched(*scene), number=REPEAT, repeat=3))/REPEAT
+			perRayTime = min(timeit.repeat(lambda: perRay(*scene), number=REPEAT, repeat=3))/REPEAT
+			perItemTime = min(timeit.repeat(lambda: perItem(*scene), number=REPEAT//10, repeat=3))/(REPEAT//10)
+			print('%6d %6d %14.1f %14.1f %15.1f %7.1fx' % (itemCount, rayCount, batchedTime*1e6, perRayTime*1e6,
+															perItemTime*1e6, perItemTime/batchedTime))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,79 @@
+"""Replays a recorded session through the grabber scene as fast as possible
+and reports the per-frame cost. Without an argument a synthetic recording of
+a hand sweeping over the items and grabbing one of them is generated first.
+Each run is repeated to check that the replay is deterministic:
+
+	python benchmarks/bench_replay.py [recording.vzrp]
+"""
+
+import math
+import os
+import sys
+import tempfile
+
+import harness
+viz = harness.install()
+
+import vizact
+
+import grabber
+import input_bindings
+import replay
+import bench_grabber
+
+
+ITEM_COUNT = 100
+MOUSEBUTTON_LEFT = 1
+
+
+def writeSyntheticRecording(fileName, frameCount=600):
+	"""Writes a recording of a hand sweeping back and forth over the item
+	grid, holding the left mouse button during the middle third
+	"""
+	writer = replay.RecordingWriter(fileName, ['r_hand_tracker'], [('r_hand_input', None)])
+	for frame in range(frameCount):
+		# the hand passes the item at the grid center when the button goes down
+		x = math.sin((frame-frameCount//3)*2.0*math.pi/300.0)
+		pressed = frameCount//3 <= frame < 2*frameCount//3
+		writer.write(frame/90.0, [[x, 0.0, 2.0, 0.0, 0.0, 0.0, 1.0]], [MOUSEBUTTON_LEFT if pressed else 0])
+	writer.close()
+
+
+def run(fileName):
+	"""Replays the recording once and returns the frame stats and the list
+	of grab and release events
+	"""
+	viz.reset()
+	events = []
+	viz.callback(grabber.GRAB_EVENT, lambda e: events.append(('grab', viz.getFrameNumber())))
+	viz.callback(grabber.RELEASE_EVENT, lambda e: events.append(('release', viz.getFrameNumber())))
+
+	session = replay.Replay(fileName, realTime=False)
+	tracker = session.getTracker('r_hand_tracker')
+	mouse = session.getInput('r_hand_input')
+
+	tool = grabber.HandGrabber(usingPhysics=False, usingSprings=False)
+	tool.setItems(bench_grabber.makeItems(ITEM_COUNT))
+	bindings = input_bindings.BindingTable(input_bindings.InputSnapshot({'r_hand_input':mouse}), tool)
+	bindings.bind('r_hand_input', MOUSEBUTTON_LEFT, 'grabAndHold')
+	tool.setUpdateFunction(lambda tool: bindings.dispatch())
+	# stands in for the link between the tracker and the tool
+	vizact.onupdate(viz.PRIORITY_LINKS-1, lambda: tool.setPosition(tracker.getPosition()))
+
+	stats = harness.runFrames('replay, %d items' % ITEM_COUNT, len(session.recording)-1, warmup=0)
+	return stats, events
+
+
+def main(fileName=None):
+	if fileName is None:
+		fileName = os.path.join(tempfile.gettempdir(), 'bench_replay.vzrp')
+		writeSyntheticRecording(fileName)
+	first, firstEvents = run(fileName)
+	second, secondEvents = run(fileName)
+	harness.printStats([first, second])
+	print('events: %s' % firstEvents)
+	print('deterministic: %s' % (firstEvents == secondEvents))
+
+
+if __name__ == '__main__':
+	main(*sys.argv[1:2])
@@ -0,0 +1,55 @@
+"""Time and peak memory of metaimage/resample.py. A 256 x 256 x 128 uint8
+volume with the 0.78 x 0.39 x 1.0 mm spacing from MetaImageCombinedCopy.py
+is resampled to isotropic 0.39 mm voxels. The baseline interpolates the
+whole volume at once on one thread, the others use chunks of 16 output
+slices on 1 to 4 threads. Peak memory is traced with tracemalloc, which
+counts numpy buffers, and excludes the input and output volumes:
+
+	python benchmarks/bench_resample.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metaimage import resample
+
+
+SPACING = [0.78125, 0.390625, 1.0]
+
+
+def run(volume, order, threads, chunkSize):
+	"""Returns the time in seconds and the peak memory in bytes beyond the
+	output volume
+	"""
+	clock = getattr(time, 'perf_counter', time.time)
+	tracemalloc.start()
+	start = clock()
+	out = resample.resample(volume, SPACING, None, order, threads, chunkSize)
+	seconds = clock()-start
+	peak = tracemalloc.get_traced_memory()[1]-out.nbytes
+	tracemalloc.stop()
+	return seconds, peak, out.shape
+
+
+def main():
+	volume = numpy.random.RandomState(1).randint(0, 256, (128, 256, 256)).astype(numpy.uint8)
+	print('resampling %s uint8 to isotropic %.3f mm, %d cores' % (volume.shape, min(SPACING), os.cpu_count() or 1))
+	print('%-8s %-32s %10s %12s %16s' % ('kernel', 'run', 'time [s]', 'peak [MB]', 'output'))
+	for order, kernel in ((resample.LINEAR, 'linear'), (resample.CUBIC, 'cubic')):
+		cases = [('whole volume, 1 thread', 1, volume.shape[0]*4)]
+		cases += [('chunks of 16, %d threads' % threads, threads, 16) for threads in (1, 2, 4)]
+		for name, threads, chunkSize in cases:
+			seconds, peak, shape = run(volume, order, threads, chunkSize)
+			print('%-8s %-32s %10.2f %12.1f %16s' % (kernel, name, seconds, peak/2.0**20, 'x'.join(map(str, shape))))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,68 @@
+"""Segmentation times of metaimage/segmentation.py. The phantom holds a few
+spheres ("organs") of different grey values on a noisy background. The
+threshold and region growing masks of the organs have few runs (scanlines
+of mask voxels), the mask of the background noise has many, and the cost
+of labelling grows with the number of runs:
+
+	python benchmarks/bench_segmentation.py [size]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metaimage import segmentation
+
+
+def makePhantom(size):
+	"""Returns a uint8 volume with spheres of values 150 to 200 and the
+	index of the centre of the largest one"""
+	rand = numpy.random.RandomState(0)
+	volume = rand.randint(0, 40, (size, size, size)).astype(numpy.uint8)
+	largest = None
+	for i in range(6):
+		radius = rand.randint(size//25, size//8)
+		centre = rand.randint(radius, size-radius, 3)
+		z, y, x = numpy.ogrid[-radius:radius+1, -radius:radius+1, -radius:radius+1]
+		box = tuple(slice(c-radius, c+radius+1) for c in centre)
+		volume[box][z*z+y*y+x*x <= radius*radius] = 150+i*10
+		if largest is None or radius > largest[0]:
+			largest = (radius, centre)
+	return volume, [int(c) for c in largest[1][::-1]]
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+	volume, seed = makePhantom(size)
+	clock = getattr(time, 'perf_counter', time.time)
+	print('segmentation of a %d^3 uint8 phantom' % size)
+	print('%-30s %10s %12s %10s' % ('step', 'time [s]', 'runs', 'result'))
+	cases = [('threshold >= 150', lambda: segmentation.threshold(volume, 150), 150, None),
+			('label organs >= 150', lambda: segmentation.labelComponents(volume, 150), 150, None),
+			('grow from seed, tolerance 5', lambda: segmentation.growRegion(volume, seed, 5), None, None),
+			('label noise 0..30', lambda: segmentation.labelComponents(volume, 0, 30), 0, 30)]
+	for name, function, low, high in cases:
+		start = clock()
+		result = function()
+		elapsed = clock()-start
+		if isinstance(result, tuple):
+			result, count = result
+			description = '%d labels' % count
+		else:
+			description = '%d voxels' % numpy.count_nonzero(result)
+		if low is None:
+			value = int(volume[seed[2], seed[1], seed[0]])
+			low, high = value-5, value+5
+		mask = segmentation.threshold(volume, low, high).view(bool)
+		runs = numpy.count_nonzero(mask[:, :, 1:] & ~mask[:, :, :-1])+numpy.count_nonzero(mask[:, :, 0])
+		print('%-30s %10.2f %12d %10s %s' % (name, elapsed, runs, result.dtype, description))
+
+
+if __name__ == '__main__':
+	main()
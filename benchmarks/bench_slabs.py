@@ -0,0 +1,62 @@
+"""Slab latency of metaimage/slabs.py. A slab of each mode steps through
+consecutive slices of a uint8 volume along axis 1, like scrubbing in the
+slice viewer. The baseline reduces all slices of every slab; the engine uses
+prefix sums for averages and the van Herk/Gil-Werman blocks for MIP and
+MinIP, on axis-major copies:
+
+	python benchmarks/bench_slabs.py [size]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metaimage import layouts
+from metaimage import slabs
+
+
+STEPS = 128
+AXIS = 1
+REDUCE = {slabs.MIP:numpy.max, slabs.MINIP:numpy.min, slabs.AVERAGE:numpy.mean}
+
+
+def measure(getSlab, start):
+	"""Returns the mean time in seconds per slab while stepping by one slice"""
+	clock = getattr(time, 'perf_counter', time.time)
+	begin = clock()
+	for index in range(start, start+STEPS):
+		getSlab(index)
+	return (clock()-begin)/STEPS
+
+
+def main():
+	size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+	volume = numpy.random.RandomState(1).randint(0, 256, (size, size, size)).astype(numpy.uint8)
+	clock = getattr(time, 'perf_counter', time.time)
+	start = clock()
+	layout = layouts.AxisMajorLayout(volume, axes=[AXIS])
+	print('slab latency, %d^3 uint8 volume, %d steps along axis %d, layout built in %.0f ms'
+			% (size, STEPS, AXIS, (clock()-start)*1e3))
+	print('%-10s %10s %14s %14s %12s' % ('mode', 'thickness', 'baseline [us]', 'engine [us]', 'setup [ms]'))
+	for mode in (slabs.MIP, slabs.MINIP, slabs.AVERAGE):
+		for thickness in (8, 32, 128):
+			engine = slabs.SlabEngine(volume, AXIS, layout)
+			def baseline(index):
+				first, last = engine.getRange(index, thickness)
+				return REDUCE[mode](layout.getSlices(AXIS, first, last), axis=0)
+			setupStart = clock()
+			engine.getSlab(size//4, thickness, mode)
+			setup = clock()-setupStart
+			print('%-10s %10d %14.1f %14.1f %12.1f' % (mode, thickness, measure(baseline, size//4)*1e6,
+														measure(lambda index: engine.getSlab(index, thickness, mode), size//4)*1e6,
+														setup*1e3))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,79 @@
+"""Headless simulation harness for benchmarking the scene tools without the
+Vizard runtime. install() puts the stand-in backend from headless_backend/
+in front of the module path, so grabber.py and friends import the stand-in
+viz, vizact, vizconnect, vizmat, vizshape and tools modules instead of Vizard's."""
+
+import os
+import sys
+import time
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARK_DIR, 'headless_backend')
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+
+def install():
+	"""Installs the stand-in backend and returns its viz module"""
+	for path in (REPO_DIR, BACKEND_DIR):
+		if path in sys.path:
+			sys.path.remove(path)
+		sys.path.insert(0, path)
+	import viz
+	if not hasattr(viz, 'stepFrame'):
+		raise ImportError('the Vizard viz module was imported before the headless backend')
+	return viz
+
+
+class FrameStats(object):
+	"""Collects the cost of each simulated frame"""
+	def __init__(self, name):
+		self.name = name
+		self.durations = []
+
+	def add(self, duration):
+		self.durations.append(duration)
+
+	def percentile(self, fraction):
+		ordered = sorted(self.durations)
+		return ordered[min(len(ordered)-1, int(fraction*len(ordered)))]
+
+	def mean(self):
+		return sum(self.durations)/len(self.durations)
+
+	def row(self):
+		"""Returns the name and the mean, median, 95th percentile and maximum
+		frame cost in microseconds
+		"""
+		return (self.name,
+				self.mean()*1e6,
+				self.percentile(0.5)*1e6,
+				self.percentile(0.95)*1e6,
+				max(self.durations)*1e6)
+
+
+def printStats(statsList, title=None):
+	"""Prints a table of frame costs"""
+	if title:
+		print(title)
+	print('%-40s %10s %10s %10s %10s' % ('scenario', 'mean [us]', 'p50 [us]', 'p95 [us]', 'max [us]'))
+	for stats in statsList:
+		print('%-40s %10.1f %10.1f %10.1f %10.1f' % stats.row())
+
+
+def runFrames(name, frameCount, script=None, warmup=10):
+	"""Steps the simulation frameCount times and measures each frame. script
+	is called with the frame index before each frame to move trackers and
+	request actions; its own cost is not included.
+	"""
+	import viz
+	stats = FrameStats(name)
+	clock = getattr(time, 'perf_counter', time.time)
+	for frame in range(-warmup, frameCount):
+		if script is not None:
+			script(max(frame, 0))
+		start = clock()
+		viz.stepFrame()
+		if frame >= 0:
+			stats.add(clock()-start)
+	return stats
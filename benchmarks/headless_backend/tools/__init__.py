@@ -0,0 +1,68 @@
+"""Headless stand-in for the Vizard tools package used by grabber.py"""
+
+import viz
+import vizact
+
+
+TAG_GRAB = 1
+TAG_HIGHLIGHT = 2
+
+
+class Tool(viz.VizNode):
+	"""Base tool which runs its update function and finalize once per frame.
+	Position and orientation queries are forwarded to the tool's node.
+	"""
+	def __init__(self, node=None, updatePriority=0, **kwargs):
+		self._node = node if node is not None else viz.addGroup()
+		self._items = []
+		self._frameLocked = 0
+		self._lockRequested = 0
+		self._updateFunction = None
+		self._updateEvent = vizact.onupdate(updatePriority, self._onUpdate)
+
+	def getPosition(self, mode=viz.ABS_PARENT):
+		return self._node.getPosition(mode)
+
+	def setPosition(self, pos, mode=viz.ABS_PARENT):
+		self._node.setPosition(pos, mode)
+
+	def getMatrix(self, mode=viz.ABS_PARENT):
+		return self._node.getMatrix(mode)
+
+	def setMatrix(self, matrix, mode=viz.ABS_PARENT):
+		self._node.setMatrix(matrix, mode)
+
+	def getItems(self):
+		return self._items
+
+	def setItems(self, items, *args, **kwargs):
+		self._items = list(items)
+
+	def removeItems(self, items, *args, **kwargs):
+		self._items = [item for item in self._items if item not in items]
+
+	def setUpdateFunction(self, func):
+		self._updateFunction = func
+
+	def finalize(self):
+		self._frameLocked = self._lockRequested
+		self._lockRequested = 0
+
+	def _onUpdate(self):
+		if self._updateFunction is not None:
+			self._updateFunction(self)
+		self.finalize()
+
+	def remove(self):
+		self._updateEvent.remove()
+
+
+def getIndicatorPlane():
+	return viz.VizNode()
+
+
+from tools import attacher
+from tools import collision_test
+from tools import highlighter
+from tools import placer
+from tools import ray_caster
@@ -0,0 +1,37 @@
+"""Headless stand-in for tools.attacher"""
+
+import viz
+import vizact
+import vizmat
+
+
+class Grab(object):
+	"""Keeps the attached node at a fixed offset from the source node"""
+	def __init__(self, src=None, **kwargs):
+		self._src = src
+		self._dst = None
+		self._offset = None
+		self._updateEvent = vizact.onupdate(viz.PRIORITY_LINKS, self._update)
+
+	def attach(self, dst):
+		self._dst = dst
+		self._offset = dst.getMatrix(viz.ABS_GLOBAL)
+		self._offset.postMult(self._src.getMatrix(viz.ABS_GLOBAL).inverse())
+
+	def detach(self):
+		self._dst = None
+
+	def getDst(self):
+		return self._dst
+
+	def _update(self):
+		if self._dst is not None:
+			matrix = vizmat.Transform(self._offset)
+			matrix.postMult(self._src.getMatrix(viz.ABS_GLOBAL))
+			self._dst.setMatrix(matrix, viz.ABS_GLOBAL)
+
+	def remove(self):
+		self._updateEvent.remove()
+
+
+Spring = Grab
@@ -0,0 +1,75 @@
+"""Headless stand-in for tools.collision_test. Like the Vizard testers, each
+tester checks all of its items one by one."""
+
+import math
+
+import viz
+
+
+class CollisionTester(object):
+	def __init__(self, node=None, **kwargs):
+		self._node = node
+		self._items = []
+
+	def getItems(self):
+		return self._items
+
+	def setItems(self, items):
+		self._items = list(items)
+
+	def _getCandidates(self, tag):
+		if tag is None:
+			return self._items
+		return [item for item in self._items if getattr(item, 'toolTag', 0)&tag]
+
+	def remove(self):
+		self._items = []
+
+
+class Distance(CollisionTester):
+	"""Returns the nearest item whose bounding sphere contains the node"""
+	def __init__(self, node=None, radius=0.0, **kwargs):
+		super(Distance, self).__init__(node=node, **kwargs)
+		self._radius = radius
+
+	def get(self, tag=None):
+		pos = self._node.getPosition(viz.ABS_GLOBAL)
+		nearest, nearestDist = None, -1
+		for item in self._getCandidates(tag):
+			sphere = item.getBoundingSphere(viz.ABS_GLOBAL)
+			dist = math.sqrt(sum((a-b)**2 for a, b in zip(pos, sphere.center)))
+			if dist <= sphere.radius+self._radius and (nearest is None or dist < nearestDist):
+				nearest, nearestDist = item, dist
+		return nearest, nearestDist
+
+
+class Physics(Distance):
+	"""Uses the bounding sphere of the node as the contact volume"""
+	def __init__(self, node=None, **kwargs):
+		super(Physics, self).__init__(node=node, radius=node.getBoundingSphere().radius, **kwargs)
+
+
+class Ray(CollisionTester):
+	"""Returns the nearest item whose bounding sphere is hit by the node's
+	forward ray
+	"""
+	def __init__(self, node=None, ray=None, **kwargs):
+		super(Ray, self).__init__(node=node, **kwargs)
+		self._ray = ray
+
+	def get(self, tag=None):
+		matrix = self._node.getMatrix(viz.ABS_GLOBAL)
+		origin = matrix.getPosition()
+		direction = matrix.getForward()
+		nearest, nearestDist = None, -1
+		for item in self._getCandidates(tag):
+			sphere = item.getBoundingSphere(viz.ABS_GLOBAL)
+			delta = [c-o for c, o in zip(sphere.center, origin)]
+			along = sum(d*f for d, f in zip(delta, direction))
+			off = sum(d*d for d in delta)-along*along
+			if along < 0 or off > sphere.radius**2:
+				continue
+			dist = along-math.sqrt(sphere.radius**2-off)
+			if nearest is None or dist < nearestDist:
+				nearest, nearestDist = item, dist
+		return nearest, nearestDist
@@ -0,0 +1,27 @@
+"""Headless stand-in for tools.highlighter"""
+
+MODE_OUTLINE = 0
+MODE_BOX = 1
+MODE_ARROW = 2
+
+
+class Highlight(object):
+	def __init__(self, mode=MODE_OUTLINE):
+		self._mode = mode
+		self._visibleDict = {}
+
+	def add(self, node):
+		self._visibleDict[node] = True
+
+	def remove(self, node=None):
+		if node is None:
+			self._visibleDict.clear()
+		else:
+			self._visibleDict.pop(node, None)
+
+	def setVisible(self, node, flag):
+		self._visibleDict[node] = flag
+
+
+def addHighlight(mode=MODE_OUTLINE):
+	return Highlight(mode)
@@ -0,0 +1,46 @@
+"""Headless stand-in for tools.placer"""
+
+MODE_MID_AIR = 0
+MODE_INSPECTION = 1
+MODE_DROP_DOWN = 2
+MODE_POINT_AND_PLACE = 3
+
+
+class Placer(object):
+	def __init__(self, previewRay=None, previewObject=None, **kwargs):
+		self._previewRay = previewRay
+		self._previewObject = previewObject
+		self._previewEnabled = False
+
+	def initialize(self, node):
+		pass
+
+	def place(self, node):
+		pass
+
+	def preview(self, node):
+		pass
+
+	def setPreviewEnabled(self, flag):
+		self._previewEnabled = flag
+
+	def remove(self):
+		pass
+
+
+class MidAir(Placer):
+	pass
+
+
+class Inspection(Placer):
+	pass
+
+
+class DropDown(Placer):
+	pass
+
+
+class PointAndPlace(Placer):
+	def __init__(self, targetRayCaster=None, **kwargs):
+		super(PointAndPlace, self).__init__(**kwargs)
+		self._targetRayCaster = targetRayCaster
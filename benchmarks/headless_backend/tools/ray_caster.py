@@ -0,0 +1,26 @@
+"""Headless stand-in for tools.ray_caster"""
+
+import viz
+
+
+class SimpleRay(viz.VizNode):
+	pass
+
+
+class StippledRay(SimpleRay):
+	pass
+
+
+class RayCaster(object):
+	def __init__(self, **kwargs):
+		self._parent = None
+		self._ray = SimpleRay()
+
+	def setParent(self, parent):
+		self._parent = parent
+
+	def setRay(self, ray):
+		self._ray = ray
+
+	def remove(self):
+		pass
@@ -0,0 +1,280 @@
+"""Headless stand-in for the parts of the viz module used by the grabber
+tools. Nodes only keep a global transform and a bounding radius, and frames
+advance when stepFrame is called, which runs all update callbacks in
+priority order like the Vizard main loop does."""
+
+import itertools
+
+import numpy
+
+import vizmat
+
+
+ABS_GLOBAL = 1
+ABS_PARENT = 2
+REL_PARENT = 3
+DYNAMICS = 1
+INTERSECTION = 2
+OFF = 0
+ON = 1
+PRIORITY_LINKS = 0
+PRIORITY_DEFAULT = 0
+
+_eventIds = {}
+_callbacks = {}
+_updates = []
+_updateOrder = itertools.count()
+_frame = [0, 0.0, 1.0/90.0]
+
+
+def getEventID(name):
+	return _eventIds.setdefault(name, 10000+len(_eventIds))
+
+
+class Event(object):
+	def __init__(self, **kwargs):
+		self.__dict__.update(kwargs)
+
+
+def callback(eventId, func):
+	_callbacks.setdefault(eventId, []).append(func)
+
+
+def sendEvent(eventId, event):
+	for func in _callbacks.get(eventId, ()):
+		func(event)
+
+
+def getFrameNumber():
+	return _frame[0]
+
+
+def getFrameTime():
+	return _frame[1]
+
+
+def getFrameElapsed():
+	return _frame[2]
+
+
+def tick():
+	return _frame[1]
+
+
+def logWarn(*args):
+	pass
+
+
+_multiSample = [0]
+
+
+def setMultiSample(level):
+	_multiSample[0] = level
+
+
+class _UpdateHandle(object):
+	def __init__(self, entry):
+		self._entry = entry
+
+	def remove(self):
+		if self._entry in _updates:
+			_updates.remove(self._entry)
+
+	def setEnabled(self, flag):
+		self._entry[3][0] = bool(flag)
+
+
+def _addUpdate(priority, func, *args):
+	entry = (priority, next(_updateOrder), lambda: func(*args), [True])
+	_updates.append(entry)
+	_updates.sort(key=lambda e: e[:2])
+	return _UpdateHandle(entry)
+
+
+def stepFrame(elapsed=1.0/90.0):
+	"""Advances the simulation by one frame"""
+	_frame[0] += 1
+	_frame[1] += elapsed
+	_frame[2] = elapsed
+	for entry in list(_updates):
+		if entry[3][0]:
+			entry[2]()
+
+
+def reset():
+	"""Clears all update callbacks and event handlers"""
+	del _updates[:]
+	_callbacks.clear()
+	_frame[:] = [0, 0.0, 1.0/90.0]
+
+
+class _BoundingSphere(object):
+	def __init__(self, center, radius):
+		self.center = center
+		self.radius = radius
+
+
+class _BoundingBox(object):
+	def __init__(self, center, radius):
+		self.xmin, self.ymin, self.zmin = [c-radius for c in center]
+		self.xmax, self.ymax, self.zmax = [c+radius for c in center]
+		self.center = center
+
+
+class _Intersection(object):
+	def __init__(self, valid=False, point=(0.0, 0.0, 0.0), object=None):
+		self.valid = valid
+		self.point = list(point)
+		self.object = object
+
+
+class VizNode(object):
+	"""Scene node with a global transform and a bounding sphere radius"""
+	def __init__(self, radius=0.0):
+		self._matrix = vizmat.Transform()
+		self._radius = radius
+		self._visible = True
+		self._parent = None
+
+	def getPosition(self, mode=ABS_PARENT):
+		return self._matrix.getPosition()
+
+	def setPosition(self, pos, mode=ABS_PARENT):
+		self._matrix.setPosition(pos)
+
+	def getMatrix(self, mode=ABS_PARENT):
+		return self._matrix.copy()
+
+	def setMatrix(self, matrix, mode=ABS_PARENT):
+		self._matrix = vizmat.Transform(matrix)
+
+	def getQuat(self, mode=ABS_PARENT):
+		rotation = self._matrix._m[:3, :3].T/numpy.linalg.norm(self._matrix._m[:3, :3], axis=1)
+		w = 0.5*numpy.sqrt(max(1e-12, 1.0+numpy.trace(rotation)))
+		x = (rotation[2, 1]-rotation[1, 2])/(4*w)
+		y = (rotation[0, 2]-rotation[2, 0])/(4*w)
+		z = (rotation[1, 0]-rotation[0, 1])/(4*w)
+		return [x, y, z, w]
+
+	def setQuat(self, quat, mode=ABS_PARENT):
+		x, y, z, w = quat
+		rotation = numpy.array([[1-2*(y*y+z*z), 2*(x*y-z*w), 2*(x*z+y*w)],
+								[2*(x*y+z*w), 1-2*(x*x+z*z), 2*(y*z-x*w)],
+								[2*(x*z-y*w), 2*(y*z+x*w), 1-2*(x*x+y*y)]])
+		scale = numpy.asarray(self.getScale())
+		self._matrix._m[:3, :3] = rotation.T*scale[:, None]
+
+	def setEuler(self, euler, mode=ABS_PARENT):
+		self._euler = list(euler)
+
+	def getScale(self, mode=ABS_PARENT):
+		return self._matrix.getScale()
+
+	def setScale(self, scale, mode=ABS_PARENT):
+		rotation = self._matrix._m[:3, :3]
+		norms = numpy.linalg.norm(rotation, axis=1)
+		self._matrix._m[:3, :3] = rotation/norms[:, None]*numpy.asarray(scale)[:, None]
+
+	def getBoundingSphere(self, mode=ABS_PARENT):
+		return _BoundingSphere(self.getPosition(), self._radius*max(self.getScale()))
+
+	def getBoundingBox(self, mode=ABS_PARENT):
+		return _BoundingBox(self.getPosition(), self._radius*max(self.getScale()))
+
+	def intersect(self, lineBegin, lineEnd, *args, **kwargs):
+		"""Intersects a line segment with the node's geometry, its bounding
+		sphere, which is smaller than its bounding box
+		"""
+		sphere = self.getBoundingSphere(ABS_GLOBAL)
+		begin = numpy.asarray(lineBegin, dtype=float)
+		segment = numpy.asarray(lineEnd, dtype=float)-begin
+		length = numpy.linalg.norm(segment)
+		if length == 0.0 or sphere.radius <= 0.0:
+			return _Intersection()
+		direction = segment/length
+		delta = numpy.asarray(sphere.center)-begin
+		along = float(numpy.dot(delta, direction))
+		off = float(numpy.dot(delta, delta))-along*along
+		if off > sphere.radius**2:
+			return _Intersection()
+		dist = max(along-(sphere.radius**2-off)**0.5, 0.0)
+		if dist > length or along+(sphere.radius**2-off)**0.5 < 0.0:
+			return _Intersection()
+		return _Intersection(True, begin+direction*dist, self)
+
+	def setParent(self, parent, *args, **kwargs):
+		self._parent = parent
+
+	def visible(self, flag=True, *args):
+		self._visible = bool(flag)
+
+	def getVisible(self, *args):
+		return self._visible
+
+	def enable(self, *args):
+		pass
+
+	def disable(self, *args):
+		pass
+
+	def zoffset(self, *args):
+		pass
+
+	def texture(self, *args, **kwargs):
+		pass
+
+	def remove(self):
+		pass
+
+
+WORLD = VizNode()
+
+
+def addGroup(*args, **kwargs):
+	return VizNode()
+
+
+def addTexQuad(size=(1, 1), **kwargs):
+	return VizNode(radius=0.5*numpy.hypot(size[0], size[1]))
+
+
+class VizBone(VizNode):
+	"""Avatar bone, which only remembers whether it is locked"""
+	def __init__(self):
+		VizNode.__init__(self)
+		self.locked = False
+
+	def lock(self):
+		self.locked = True
+
+	def unlock(self):
+		self.locked = False
+
+
+class VizAvatar(VizNode):
+	"""Avatar whose bones are created on first use"""
+	def __init__(self):
+		VizNode.__init__(self)
+		self._boneDict = {}
+
+	def getBone(self, name):
+		if name not in self._boneDict:
+			self._boneDict[name] = VizBone()
+		return self._boneDict[name]
+
+
+def addAvatar(fileName, **kwargs):
+	return VizAvatar()
+
+
+class VizTexture(object):
+	"""Texture which only remembers its file name"""
+	def __init__(self, fileName):
+		self.fileName = fileName
+
+	def remove(self):
+		pass
+
+
+def addTexture(fileName, **kwargs):
+	return VizTexture(fileName)
@@ -0,0 +1,7 @@
+"""Headless stand-in for the update callbacks of vizact"""
+
+import viz
+
+
+def onupdate(priority, func, *args):
+	return viz._addUpdate(priority, func, *args)
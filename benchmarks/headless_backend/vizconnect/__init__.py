@@ -0,0 +1,9 @@
+"""Headless stand-in for the constants of vizconnect"""
+
+AVATAR_HEAD = 'head'
+AVATAR_R_HAND = 'r_hand'
+AVATAR_L_HAND = 'l_hand'
+
+DOF_6DOF = '6dof'
+DOF_POS = 'pos'
+DOF_ORI = 'ori'
@@ -0,0 +1 @@
+"""Headless stand-in for vizconnect.util"""
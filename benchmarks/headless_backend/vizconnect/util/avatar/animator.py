@@ -0,0 +1,42 @@
+"""Headless stand-in for vizconnect.util.avatar.animator. Like the Vizard
+animator, Direct solves every assigned bone on every frame, parents first,
+and places DOF_POS bones with a parent relative to the parent bone."""
+
+import viz
+import vizact
+import vizconnect
+
+
+class Direct(object):
+	def __init__(self, avatar, skeleton, trackerAssignmentDict, updatePriority=viz.PRIORITY_LINKS+1):
+		self._avatar = avatar
+		self._skeleton = skeleton
+		self._assignmentDict = dict(trackerAssignmentDict)
+		def depth(bone):
+			parent = self._assignmentDict[bone][1]
+			return 0 if parent not in self._assignmentDict else 1+depth(parent)
+		self._order = sorted(self._assignmentDict, key=depth)
+		for bone in self._order:
+			skeleton.getBone(bone).lock()
+		self._updateEvent = vizact.onupdate(updatePriority, self.update)
+
+	def update(self):
+		assignmentDict = self._assignmentDict
+		skeleton = self._skeleton
+		for bone in self._order:
+			tracker, parent, dof = assignmentDict[bone]
+			avatarBone = skeleton.getBone(bone)
+			position = tracker.getPosition(viz.ABS_GLOBAL)
+			if dof != vizconnect.DOF_POS:
+				avatarBone.setQuat(tracker.getQuat(viz.ABS_GLOBAL), viz.ABS_GLOBAL)
+			if parent in assignmentDict:
+				# keep the offset to the parent's tracker from the parent bone
+				parentTracker = assignmentDict[parent][0]
+				parentPosition = skeleton.getBone(parent).getPosition(viz.ABS_GLOBAL)
+				offset = [p-q for p, q in zip(position, parentTracker.getPosition(viz.ABS_GLOBAL))]
+				position = [p+o for p, o in zip(parentPosition, offset)]
+			if dof != vizconnect.DOF_ORI:
+				avatarBone.setPosition(position, viz.ABS_GLOBAL)
+
+	def remove(self):
+		self._updateEvent.remove()
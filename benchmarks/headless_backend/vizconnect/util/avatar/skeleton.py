@@ -0,0 +1,22 @@
+"""Headless stand-in for vizconnect.util.avatar.skeleton"""
+
+import vizconnect
+
+
+class Skeleton(object):
+	"""Maps the vizconnect bone ids to the bones of an avatar"""
+	BONE_NAMES = {}
+
+	def __init__(self, avatar):
+		self._avatar = avatar
+
+	def getBone(self, bone):
+		return self._avatar.getBone(self.BONE_NAMES.get(bone, bone))
+
+
+class CompleteCharactersHD(Skeleton):
+	BONE_NAMES = {
+		vizconnect.AVATAR_HEAD:'Bip01 Head',
+		vizconnect.AVATAR_R_HAND:'Bip01 R Hand',
+		vizconnect.AVATAR_L_HAND:'Bip01 L Hand',
+	}
@@ -0,0 +1,72 @@
+"""Headless stand-in for the parts of vizmat used by the grabber tools.
+Transforms use the row vector convention of Vizard, so postX applies X
+after the current transform."""
+
+import numpy
+
+
+class Transform(object):
+	"""4x4 transform matrix"""
+	def __init__(self, other=None):
+		if other is None:
+			self._m = numpy.identity(4)
+		elif isinstance(other, Transform):
+			self._m = other._m.copy()
+		else:
+			self._m = numpy.array(other, dtype=float).reshape(4, 4)
+
+	def copy(self):
+		return Transform(self)
+
+	def makeIdent(self):
+		self._m = numpy.identity(4)
+
+	def getPosition(self):
+		return self._m[3, :3].tolist()
+
+	def setPosition(self, pos):
+		self._m[3, :3] = pos
+
+	def getForward(self):
+		forward = self._m[2, :3]
+		return (forward/numpy.linalg.norm(forward)).tolist()
+
+	def getScale(self):
+		return numpy.linalg.norm(self._m[:3, :3], axis=1).tolist()
+
+	def postTrans(self, vec):
+		self._m[3, :3] += vec
+
+	def preTrans(self, vec):
+		self._m[3, :3] += numpy.dot(vec, self._m[:3, :3])
+
+	def postScale(self, scale):
+		self._m = numpy.dot(self._m, numpy.diag(list(scale)+[1.0]))
+
+	def postMult(self, other):
+		self._m = numpy.dot(self._m, other._m)
+
+	def preMult(self, other):
+		self._m = numpy.dot(other._m, self._m)
+
+	def makeVecRotVec(self, a, b):
+		"""Makes a rotation which turns direction a into direction b"""
+		a = numpy.asarray(a, dtype=float)/numpy.linalg.norm(a)
+		b = numpy.asarray(b, dtype=float)/numpy.linalg.norm(b)
+		axis = numpy.cross(a, b)
+		sin = numpy.linalg.norm(axis)
+		cos = numpy.dot(a, b)
+		rotation = numpy.identity(3)
+		if sin > 1e-12:
+			k = axis/sin
+			cross = numpy.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+			rotation = numpy.identity(3)+sin*cross+(1-cos)*numpy.dot(cross, cross)
+		self._m = numpy.identity(4)
+		# row vector convention stores the transposed rotation
+		self._m[:3, :3] = rotation.T
+
+	def inverse(self):
+		return Transform(numpy.linalg.inv(self._m))
+
+	def preMultVec(self, vec):
+		return (numpy.dot(list(vec)+[1.0], self._m)[:3]).tolist()
@@ -0,0 +1,11 @@
+"""Headless stand-in for the shapes of vizshape"""
+
+import viz
+
+
+def addSphere(radius=0.5, **kwargs):
+	return viz.VizNode(radius=radius)
+
+
+def addCube(size=1.0, **kwargs):
+	return viz.VizNode(radius=0.5*3**0.5*size)
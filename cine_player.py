@@ -0,0 +1,171 @@
+"""Cine playback of 4D studies. A CinePlayer shows one slice of a
+metaimage.sequence.VolumeSequence on a textured quad and steps it through
+time at a target frame rate. The sequence preloads the upcoming timepoints
+on its own thread; if a timepoint isn't loaded when it is due, the player
+keeps showing the current one instead of waiting for the disk, so the
+render loop never stalls. The slice textures of the timepoints shown are
+kept, so later loops only swap textures, and the ring is only moved to the
+timepoints whose texture isn't made yet."""
+
+import os.path
+
+import viz
+import vizact
+
+from metaimage import slices
+
+
+CINE_FRAME_EVENT = viz.getEventID('CINE_FRAME_EVENT')
+
+
+class CinePlayer(object):
+	"""Plays slice index along an array axis of the volumes of a sequence
+	on a quad.
+
+	@param fps timepoints shown per second
+	@param loop start again with the first timepoint after the last one
+	@param extension image format of the slice texture files
+	"""
+	def __init__(self,
+					sequence,
+					quad,
+					axis=0,
+					index=None,
+					fps=15.0,
+					loop=True,
+					directory='textures',
+					prefix='Cine_',
+					extension='.bmp',
+					updatePriority=viz.PRIORITY_LINKS+1):
+		self.sequence = sequence
+		self.quad = quad
+		self.axis = axis
+		self.fps = fps
+		self.loop = loop
+		self.directory = directory
+		self.prefix = prefix
+		self.extension = extension
+		if not os.path.exists(directory):
+			os.makedirs(directory)
+		self._index = None
+		self._textures = {}
+		self._time = 0
+		self._elapsed = 0.0
+		self._playing = False
+		self._heldFrames = 0
+		# first timepoint of the ring, None if every texture is made
+		self._prefetched = None
+		self.setSlice(sequence.shape[axis]//2 if index is None else index)
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+
+	def getTime(self):
+		"""Returns the timepoint shown"""
+		return self._time
+
+	def getSlice(self):
+		return self._index
+
+	def getHeldFrames(self):
+		"""Returns the number of times a due timepoint wasn't loaded yet and
+		the shown one was kept
+		"""
+		return self._heldFrames
+
+	def isPlaying(self):
+		return self._playing
+
+	def play(self):
+		self._playing = True
+		self._elapsed = 0.0
+
+	def pause(self):
+		self._playing = False
+
+	def setFps(self, fps):
+		self.fps = fps
+
+	def setSlice(self, index):
+		"""Shows another slice; the textures of the previous one are released"""
+		index = min(max(int(index), 0), self.sequence.shape[self.axis]-1)
+		if index == self._index:
+			return
+		self._index = index
+		for texture in self._textures.values():
+			texture.remove()
+		self._textures.clear()
+		self.setTime(self._time)
+
+	def setTime(self, time):
+		"""Shows a timepoint, waiting for it to be loaded"""
+		self._time = time
+		self.quad.texture(self._getTexture(time, None))
+		self._prefetch(time)
+	
+	def _prefetch(self, time):
+		"""Internal method which moves the ring of the sequence to the first
+		timepoint after time whose texture isn't made yet
+		"""
+		count = self.sequence.getCount()
+		for i in range(1, count):
+			later = time+i
+			if later >= count:
+				if not self.loop:
+					return
+				later -= count
+			if later not in self._textures:
+				if later != self._prefetched:
+					self._prefetched = later
+					self.sequence.setPosition(later)
+				return
+		self._prefetched = None
+
+	def _getTexture(self, time, timeout):
+		"""Internal method which returns the texture of the slice at a
+		timepoint, or None if its volume isn't loaded within timeout seconds
+		"""
+		texture = self._textures.get(time)
+		if texture is None:
+			volume = self.sequence.getVolume(time, timeout)
+			if volume is None:
+				return None
+			fileName = os.path.join(self.directory, '%s%d_%d_%d%s' % (self.prefix, self.axis, self._index, time, self.extension))
+			slices.saveImage(slices.toGrey(slices.getSlice(volume, self.axis, self._index)), fileName)
+			texture = self._textures[time] = viz.addTexture(fileName)
+		return texture
+
+	def _update(self):
+		if not self._playing:
+			return
+		self._elapsed += viz.getFrameElapsed()
+		period = 1.0/self.fps
+		if self._elapsed < period:
+			return
+		count = self.sequence.getCount()
+		time = self._time+1
+		if time >= count:
+			if not self.loop:
+				self._playing = False
+				return
+			time = 0
+		try:
+			texture = self._getTexture(time, 0)
+		except Exception:
+			# don't raise the error of an unreadable timepoint every frame
+			self._playing = False
+			raise
+		if texture is None:
+			# keep the current timepoint, try again next frame
+			self._heldFrames += 1
+			self._elapsed = period
+			return
+		self.quad.texture(texture)
+		self._time = time
+		self._elapsed = min(self._elapsed-period, period)
+		self._prefetch(time)
+		viz.sendEvent(CINE_FRAME_EVENT, viz.Event(player=self, time=time))
+
+	def remove(self):
+		self._updateEvent.remove()
+		for texture in self._textures.values():
+			texture.remove()
+		self._textures.clear()
@@ -12,11 +12,73 @@ import tools.collision_test
 import tools.highlighter
 import tools.placer
 
+import proximity
+import ray_batch
+
 
 GRAB_EVENT = viz.getEventID('GRABBER_GRAB_EVENT')
 RELEASE_EVENT = viz.getEventID('GRABBER_RELEASE_EVENT')
 UPDATE_INTERSECTION_EVENT = viz.getEventID('GRABBER_UPDATE_INTERSECTION_EVENT')
 
+# behavior table entry for items without their own attacher, placer or highlighter
+_DEFAULT_BEHAVIOR = (None, None, None)
+
+PREVIEW_SIMPLE_RAY = 'simple_ray'
+PREVIEW_STIPPLED_RAY = 'stippled_ray'
+PREVIEW_INDICATOR_PLANE = 'indicator_plane'
+
+
+class PreviewPool(object):
+	"""A pool of placement preview rays and indicator planes. Grabbers borrow
+	preview objects when they set up a placer and give them back when they
+	switch placement modes or are removed, so the scene nodes are reused
+	instead of being created and destroyed.
+	"""
+	_FACTORIES = {
+		PREVIEW_SIMPLE_RAY:lambda: tools.ray_caster.SimpleRay(),
+		PREVIEW_STIPPLED_RAY:lambda: tools.ray_caster.StippledRay(),
+		PREVIEW_INDICATOR_PLANE:lambda: tools.getIndicatorPlane(),
+	}
+	
+	def __init__(self):
+		self._freeDict = dict((kind, []) for kind in self._FACTORIES)
+		self._kindDict = {}
+	
+	def borrow(self, kind):
+		"""Returns a preview object of the given kind, reusing a returned one
+		if available
+		"""
+		free = self._freeDict[kind]
+		if free:
+			obj = free.pop()
+		else:
+			obj = self._FACTORIES[kind]()
+		self._kindDict[obj] = kind
+		return obj
+	
+	def giveBack(self, obj):
+		"""Hides a borrowed preview object and returns it to the pool"""
+		kind = self._kindDict.pop(obj)
+		obj.visible(False)
+		self._freeDict[kind].append(obj)
+	
+	def clear(self):
+		"""Removes all preview objects which aren't currently borrowed"""
+		for free in self._freeDict.values():
+			for obj in free:
+				obj.remove()
+			del free[:]
+
+
+_previewPool = None
+
+def getPreviewPool():
+	"""Returns the PreviewPool shared by all grabbers which don't use their own"""
+	global _previewPool
+	if _previewPool is None:
+		_previewPool = PreviewPool()
+	return _previewPool
+
 
 class AbstractGrabber(tools.Tool):
 	"""An abstract grabber class which can have any given combination of:
@@ -28,6 +90,9 @@ class AbstractGrabber(tools.Tool):
 	LOCK_HOLD = 2
 	LOCK_HOVER = 4
 	
+	# whether the target ray caster of point and place placers draws its ray
+	_hideTargetRay = True
+	
 	def __init__(self,
 					node,
 					collisionTester,
@@ -38,12 +103,26 @@ class AbstractGrabber(tools.Tool):
 					testIntersection=True,
 					useToolTag=True,
 					debug=False,
+					placementMode=None,
+					previewPool=None,
 					**kwargs):
 		
+		# if no placer is given, create one for the placement mode
+		self._previewPool = previewPool if previewPool is not None else getPreviewPool()
+		self._placementMode = None
+		self._pendingPlacementMode = None
+		self._previewRay = None
+		self._previewObject = None
+		self._previewRayCaster = None
+		self._createdPlacer = None
 		self._collisionTester = collisionTester
+		if placer is None:
+			placer = self._createdPlacer = self._createPlacer(placementMode, node)
+		
 		self._attacher = attacher
 		self._placer = placer
 		self._highlighter = highlighter
+		self._ownHighlighter = highlighter
 		
 		self._useToolTag = useToolTag
 		self._preLoadHighlights = preLoadHighlights
@@ -57,9 +136,12 @@ class AbstractGrabber(tools.Tool):
 		
 		self._itemCollisionTesterSet = set()
 		self._itemCollisionTesterList = {}
+		self._itemBehaviorDict = {}
+		self._itemAttacherDict = {}
 		self._currentIntersection = None
 		self._currentHighlightedNode = None
 		self._held = None
+		self._coordinator = None
 	
 	def addItems(self, items, *args, **kwargs):
 		"""Adds items to the existing list of items"""
@@ -120,39 +202,60 @@ class AbstractGrabber(tools.Tool):
 			# the highlight should be updated by the get intersection call
 			intersection = self.getIntersection()
 			if intersection is not None:
-				if hasattr(intersection, 'VIZ_TOOL_ATTACHER_FUNC'):
-					self._currentAttacher = intersection.VIZ_TOOL_ATTACHER_FUNC(src=self)
-				else:
-					self._currentAttacher = self._attacher
-				
-				if hasattr(intersection, 'VIZ_TOOL_PLACER'):
-					self._currentPlacer = intersection.VIZ_TOOL_PLACER
-				else:
-					self._currentPlacer = self._placer
-				
-				# initialize the placer object
-				self._currentPlacer.initialize(intersection)
-				# attach the intersecting item
-				self._currentAttacher.attach(intersection)
-				# enable preview on placer if using previews
-				self._currentPlacer.setPreviewEnabled(True)
-				# send an event
-				viz.sendEvent(GRAB_EVENT, viz.Event(grabber=self, grabbed=intersection))
+				# a coordinator may take over the grab, e.g. as the second
+				# hand of a two handed manipulation
+				if self._coordinator is not None and not self._coordinator.requestGrab(self, intersection):
+					return intersection
+				self._attachItem(intersection)
 			return intersection
 		return None
 	
+	def takeOver(self, item):
+		"""Attaches an item handed over from another grabber, e.g. by a
+		coordinator at the end of a two handed manipulation, as if it had
+		been grabbed.
+		"""
+		if self._currentAttacher.getDst() is not None:
+			self.release()
+		self._attachItem(item)
+		if self._held is not None:
+			self._held = item
+	
+	def _attachItem(self, item):
+		"""Internal method which attaches an item with its attacher and placer"""
+		attacher, placer, highlighter = self._itemBehaviorDict.get(item, _DEFAULT_BEHAVIOR)
+		self._currentAttacher = self._attacher if attacher is None else attacher
+		self._currentPlacer = self._placer if placer is None else placer
+		
+		# initialize the placer object
+		self._currentPlacer.initialize(item)
+		# attach the intersecting item
+		self._currentAttacher.attach(item)
+		# enable preview on placer if using previews
+		self._currentPlacer.setPreviewEnabled(True)
+		# send an event
+		viz.sendEvent(GRAB_EVENT, viz.Event(grabber=self, grabbed=item))
+	
 	def release(self):
 		"""Starts a release"""
+		if self._coordinator is not None:
+			self._coordinator.notifyRelease(self)
 		released = self._currentAttacher.getDst()
 		if released is not None:
 			# release the object
 			self._currentAttacher.detach()
 			# place the object
 			self._currentPlacer.place(released)
+			# let a grid based collision tester refit the placed object
+			if hasattr(self._collisionTester, 'markMoved'):
+				self._collisionTester.markMoved([released])
 			# disable preview on placer if using previews
 			self._currentPlacer.setPreviewEnabled(False)
 			# send out an event
 			viz.sendEvent(RELEASE_EVENT, viz.Event(grabber=self, released=released))
+		# apply a placement mode change requested while holding
+		if self._pendingPlacementMode is not None:
+			self.setPlacementMode(self._pendingPlacementMode)
 		return released
 	
 	def grabAndHold(self):
@@ -183,6 +286,12 @@ class AbstractGrabber(tools.Tool):
 		"""
 		return self._collisionTester
 	
+	def getCoordinator(self):
+		"""Returns the coordinator shared with other grabbers, if any. See
+		multi_grabber.py.
+		"""
+		return self._coordinator
+	
 	def getHighlight(self):
 		"""Returns the highlight object used for highlighting intersections
 		and grabbed objects. See tools/highlighter.py for a set of compatible
@@ -190,6 +299,12 @@ class AbstractGrabber(tools.Tool):
 		"""
 		return self._highlighter
 	
+	def getPlacementMode(self):
+		"""Returns the placement mode of the placer, or None if the placer was
+		set directly
+		"""
+		return self._placementMode
+	
 	def getPlacer(self):
 		"""Returns the placer object used for placing released objects
 		objects. See tools/placer.py for a set of compatible objects. Can be
@@ -211,36 +326,61 @@ class AbstractGrabber(tools.Tool):
 		self._collisionTester = collisionTester
 		self._collisionTester.setItems(self._items)
 	
+	def setCoordinator(self, coordinator):
+		"""Sets the coordinator shared with other grabbers. The coordinator is
+		asked before each grab and notified on each release.
+		"""
+		self._coordinator = coordinator
+	
 	def setHighlight(self, highlight):
 		"""Sets the highlight object used for highlighting intersections
 		and grabbed objects. See tools/highlighter.py for a set of compatible
 		objects. Can be any object derived from tools.highlighter.Highlight
 		"""
+		# the next intersection test highlights the node with the new highlight
+		self._hideHighlight()
 		self._highlighter = highlight
+		self._currentHighlighter = highlight
 		if self._highlighter and self._preLoadHighlights:
 			for item in self._items:
 				self._highlighter.add(item)
 				self._highlighter.setVisible(item, False)
 	
+	def setPlacementMode(self, placementMode):
+		"""Switches to the placer of one of the tools.placer placement modes
+		without rebuilding the grabber. The preview objects of the previous
+		placer go back to the preview pool. If an item is currently held, the
+		switch happens when it is released.
+		"""
+		if self._currentAttacher.getDst() is not None:
+			self._pendingPlacementMode = placementMode
+			return
+		self._pendingPlacementMode = None
+		self._removePlacer()
+		self._placer = self._createdPlacer = self._createPlacer(placementMode, self._node)
+		self._currentPlacer = self._placer
+	
 	def setPlacer(self, placer):
 		"""Sets the placer object used for placing released objects
 		objects. See tools/placer.py for a set of compatible objects. Can be
-		any object derived from tools.placer.Placer.
+		any object derived from tools.placer.Placer. The placer stays owned
+		by the caller and is not removed with the grabber.
 		"""
 		self._placer = placer
+		self._placementMode = None
 	
 	def setItems(self, items, *args, **kwargs):
 		"""Sets the list of grabbable items"""
 		super(AbstractGrabber, self).setItems(items, *args, **kwargs)
 		self._collisionTester.setItems(items)
+		self._updateBehaviorTable(items)
 		if self._highlighter and self._preLoadHighlights:
 			for item in items:
-				if hasattr(item, 'VIZ_TOOL_HIGHLIGHTER'):
-					item.VIZ_TOOL_HIGHLIGHTER.add(item)
-					item.VIZ_TOOL_HIGHLIGHTER.setVisible(item, False)
-				else:
-					self._highlighter.add(item)
-					self._highlighter.setVisible(item, False)
+				highlighter = self._itemBehaviorDict[item][2]
+				if highlighter is None:
+					highlighter = self._highlighter
+				highlighter.add(item)
+				highlighter.setVisible(item, False)
 		if self._useToolTag:
 			for item in items:
 				if hasattr(item, "toolTag"):
@@ -260,11 +400,102 @@ class AbstractGrabber(tools.Tool):
 				ct = self._itemCollisionTesterList[item.VIZ_TOOL_COLLISION_TESTER_FUNC]
 				ct.setItems(ct.getItems()+[item])
 	
+	def remove(self):
+		"""Removes the grabber object"""
+		super(AbstractGrabber, self).remove()
+		for attacher in self._itemAttacherDict.values():
+			attacher.remove()
+		self._itemAttacherDict = {}
+		self._itemBehaviorDict = {}
+	
 	def removeItems(self, items, *args, **kwargs):
 		"""Removes a set of items from the current list of grabbable items."""
 		super(AbstractGrabber, self).removeItems(items, *args, **kwargs)
 		self.setItems(self._items)
 	
+	def _createPlacer(self, placementMode, node):
+		"""Internal method which creates the placer for a placement mode,
+		borrowing its preview objects from the preview pool
+		"""
+		pool = self._previewPool
+		self._placementMode = placementMode
+		if placementMode == tools.placer.MODE_INSPECTION:
+			self._previewRay = pool.borrow(PREVIEW_STIPPLED_RAY)
+			self._previewObject = pool.borrow(PREVIEW_INDICATOR_PLANE)
+			self._previewObject.zoffset(-1)
+			return tools.placer.Inspection(previewRay=self._previewRay,
+											previewObject=self._previewObject,
+											moveTime=1.0,
+											spinTime=1.0)
+		elif placementMode == tools.placer.MODE_DROP_DOWN:
+			self._previewRay = pool.borrow(PREVIEW_SIMPLE_RAY)
+			self._previewObject = pool.borrow(PREVIEW_INDICATOR_PLANE)
+			self._previewObject.zoffset(0)
+			return tools.placer.DropDown(previewRay=self._previewRay, previewObject=self._previewObject)
+		elif placementMode == tools.placer.MODE_POINT_AND_PLACE:
+			self._previewRay = pool.borrow(PREVIEW_SIMPLE_RAY)
+			self._previewObject = pool.borrow(PREVIEW_INDICATOR_PLANE)
+			self._previewObject.zoffset(0)
+			if hasattr(self._collisionTester, 'getHit'):
+				# the hover ray of a ray batch also finds the placement target
+				self._previewRayCaster = ray_batch.HitRayCaster(self._collisionTester)
+			else:
+				self._previewRayCaster = tools.ray_caster.RayCaster()
+			self._previewRayCaster.setParent(node)
+			if self._hideTargetRay:
+				self._previewRayCaster.setRay(None)
+			return tools.placer.PointAndPlace(targetRayCaster=self._previewRayCaster,
+												previewRay=self._previewRay,
+												previewObject=self._previewObject)
+		self._placementMode = tools.placer.MODE_MID_AIR
+		return tools.placer.MidAir()
+	
+	def _removePlacer(self):
+		"""Internal method which removes the placer created for a placement
+		mode and gives its preview objects back to the preview pool. Placers
+		set with setPlacer are left to their owner.
+		"""
+		if self._createdPlacer is not None:
+			self._createdPlacer.remove()
+			self._createdPlacer = None
+		if self._previewRayCaster:
+			self._previewRayCaster.remove()
+			self._previewRayCaster = None
+		if self._previewRay:
+			self._previewPool.giveBack(self._previewRay)
+			self._previewRay = None
+		if self._previewObject:
+			self._previewPool.giveBack(self._previewObject)
+			self._previewObject = None
+	
+	def _updateBehaviorTable(self, items):
+		"""Internal method which resolves the attacher, placer and highlighter
+		of each item once, so grabbing and hovering only need a lookup. Items
+		without their own behavior get None entries, which fall back to the
+		grabber's current defaults. Attachers whose factory no item uses any
+		more are removed, unless they still hold an item.
+		"""
+		self._itemBehaviorDict = {}
+		usedFuncs = set()
+		for item in items:
+			attacher = None
+			attacherFunc = getattr(item, 'VIZ_TOOL_ATTACHER_FUNC', None)
+			if attacherFunc is not None:
+				# attachers are shared by all items using the same factory
+				usedFuncs.add(attacherFunc)
+				attacher = self._itemAttacherDict.get(attacherFunc)
+				if attacher is None:
+					attacher = attacherFunc(src=self)
+					self._itemAttacherDict[attacherFunc] = attacher
+			self._itemBehaviorDict[item] = (attacher,
+											getattr(item, 'VIZ_TOOL_PLACER', None),
+											getattr(item, 'VIZ_TOOL_HIGHLIGHTER', None))
+		for attacherFunc in list(self._itemAttacherDict):
+			attacher = self._itemAttacherDict[attacherFunc]
+			if attacherFunc not in usedFuncs and attacher.getDst() is None:
+				attacher.remove()
+				del self._itemAttacherDict[attacherFunc]
+	
 	def _updateHighlight(self, intersection):
 		"""Internal method which updates the highlight object based on
 		intersections
@@ -273,16 +504,10 @@ class AbstractGrabber(tools.Tool):
 		if self._currentAttacher.getDst() is None and self._currentHighlightedNode != intersection:
 			
 			# hide the currently highlighted object
-			if self._currentHighlightedNode is not None and self._currentHighlighter:
-				if self._preLoadHighlights:
-					self._currentHighlighter.setVisible(self._currentHighlightedNode, False)
-				else:
-					self._currentHighlighter.remove(self._currentHighlightedNode)
+			self._hideHighlight()
 			
-			if hasattr(intersection, 'VIZ_TOOL_HIGHLIGHTER'):
-				self._currentHighlighter = intersection.VIZ_TOOL_HIGHLIGHTER
-			else:
-				self._currentHighlighter = self._highlighter
+			highlighter = self._itemBehaviorDict.get(intersection, _DEFAULT_BEHAVIOR)[2]
+			self._currentHighlighter = self._highlighter if highlighter is None else highlighter
 			
 			# add the new highlight
 			if intersection is not None and self._currentHighlighter:
@@ -293,6 +518,24 @@ class AbstractGrabber(tools.Tool):
 			
 			# update the currently highlighted node
 			self._currentHighlightedNode = intersection
+	
+	def _hideHighlight(self):
+		"""Internal method which hides the currently highlighted node"""
+		if self._currentHighlightedNode is not None and self._currentHighlighter:
+			if self._preLoadHighlights:
+				self._currentHighlighter.setVisible(self._currentHighlightedNode, False)
+			else:
+				self._currentHighlighter.remove(self._currentHighlightedNode)
+		self._currentHighlightedNode = None
+	
+	def _removeHighlight(self):
+		"""Internal method which removes the highlight the grabber was
+		created with. Highlights set later with setHighlight may be shared
+		with other tools, so they are only cleared of the highlighted node.
+		"""
+		self._hideHighlight()
+		if self._ownHighlighter:
+			self._ownHighlighter.remove()
 
 
 class HandGrabber(AbstractGrabber):
@@ -302,6 +545,7 @@ class HandGrabber(AbstractGrabber):
 					usingSprings=True,
 					placementMode=tools.placer.MODE_MID_AIR,
 					highlightMode=tools.highlighter.MODE_OUTLINE,
+					previewPool=None,
 					**kwargs):
 		
 		self._usingPhysics = usingPhysics
@@ -329,43 +573,25 @@ class HandGrabber(AbstractGrabber):
 		if usingPhysics:
 			collisionTestObj = tools.collision_test.Physics(node=node)
 		else:
-			collisionTestObj = tools.collision_test.Distance(node=node)
-		
-		# define placer
-		self._previewRay = None
-		self._previewObject = None
-		if placementMode == tools.placer.MODE_MID_AIR:
-			self._placer = tools.placer.MidAir()
-		elif placementMode == tools.placer.MODE_INSPECTION:
-			self._previewRay = tools.ray_caster.StippledRay()
-			self._previewObject = tools.getIndicatorPlane()
-			self._previewObject.zoffset(-1)
-			self._placer = tools.placer.Inspection(previewRay=self._previewRay,
-													previewObject=self._previewObject,
-													moveTime=1.0,
-													spinTime=1.0)
-		elif placementMode == tools.placer.MODE_DROP_DOWN:
-			self._previewRay = tools.ray_caster.SimpleRay()
-			self._previewObject = tools.getIndicatorPlane()
-			self._placer = tools.placer.DropDown(previewRay=self._previewRay, previewObject=self._previewObject)
-		elif placementMode == tools.placer.MODE_POINT_AND_PLACE:
-			self._previewRay = tools.ray_caster.SimpleRay()
-			self._previewObject = tools.getIndicatorPlane()
-			rayCaster = tools.ray_caster.RayCaster()
-			rayCaster.setParent(node)
-			rayCaster.setRay(None)
-			self._placer = tools.placer.PointAndPlace(targetRayCaster=rayCaster,
-												previewRay=self._previewRay,
-												previewObject=self._previewObject)
-		else:
-			self._placer = tools.placer.MidAir()
+			# grid based proximity instead of testing every item per frame
+			collisionTestObj = proximity.GridDistance(node=node)
 		
 		# setup the grabber
 		super(HandGrabber, self).__init__(node=node,
 											collisionTester=collisionTestObj,
 											attacher=attachmentObj,
-											placer=self._placer,
-											highlighter=highlight)
+											placer=None,
+											highlighter=highlight,
+											placementMode=placementMode,
+											previewPool=previewPool)
+	
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, e.g. spinning shapes, so
+		that the proximity grid follows them every frame. Only used without
+		physics.
+		"""
+		if hasattr(self._collisionTester, 'setAnimatedItems'):
+			self._collisionTester.setAnimatedItems(items)
 	
 	def remove(self):
 		"""Removes the grabber object"""
@@ -373,24 +599,27 @@ class HandGrabber(AbstractGrabber):
 		self._node.remove()
 		self._collisionTester.remove()
 		self._attacher.remove()
-		self._placer.remove()
-		if self._highlighter:
-			self._highlighter.remove()
-		if self._previewRay:
-			self._previewRay.remove()
-			self._previewRay = None
-		if self._previewObject:
-			self._previewObject.remove()
-			self._previewObject = None
+		self._removePlacer()
+		self._removeHighlight()
 
 Grabber = HandGrabber
 
 
 class RayGrabber(AbstractGrabber):
-	"""A convenience grabber class which uses a ray for intersection and placement."""
+	"""A convenience grabber class which uses a ray for intersection and placement.
+	
+	If a ray_batch.RayBatch is given, the ray is answered by the batch
+	together with all other rays of the frame instead of by a
+	tools.collision_test.Ray, which also drives the ray display.
+	"""
+	_hideTargetRay = False
+	
 	def __init__(self,
 					usingPhysics=False,
 					highlightMode=tools.highlighter.MODE_OUTLINE,
+					placementMode=tools.placer.MODE_POINT_AND_PLACE,
+					rayBatch=None,
+					previewPool=None,
 					**kwargs):
 		
 		highlight = tools.highlighter.addHighlight(highlightMode)
@@ -398,27 +627,54 @@ class RayGrabber(AbstractGrabber):
 		node = viz.addGroup()
 		self._ray = tools.ray_caster.SimpleRay()
 		
-		self._collisionTester = tools.collision_test.Ray(node=node, ray=self._ray)
-		
-		self._previewRay = tools.ray_caster.SimpleRay()
-		self._previewObject = tools.getIndicatorPlane()
-		rayCaster = tools.ray_caster.RayCaster()
-		rayCaster.setParent(node)
-		self._placer = tools.placer.PointAndPlace(targetRayCaster=rayCaster,
-													previewRay=self._previewRay,
-													previewObject=self._previewObject)
+		if rayBatch is None:
+			self._collisionTester = tools.collision_test.Ray(node=node, ray=self._ray)
+		else:
+			self._collisionTester = rayBatch.addRay(node)
 		
-		#self._placer = tools.placer.MidAir()
 		self._attacher = tools.attacher.Grab(src=node)
 		
 		super(RayGrabber, self).__init__(node=node,
 											collisionTester=self._collisionTester,
 											attacher=self._attacher,
-											placer=self._placer,
-											highlighter=highlight)
+											placer=None,
+											highlighter=highlight,
+											placementMode=placementMode,
+											previewPool=previewPool)
+	
+	def getRayHit(self):
+		"""Returns the ray_batch.RayHit of the current frame, or None if the
+		grabber doesn't use a ray batch. The hit holds the item, distance and
+		global hit point, so other tools can reuse it without casting again.
+		"""
+		if hasattr(self._collisionTester, 'getHit'):
+			return self._collisionTester.getHit()
+		return None
+	
+	def pickVoxel(self, picker, node, threshold=None):
+		"""Picks the first voxel along the ray with a value of at least
+		threshold, using a metaimage.picking.VoxelPicker. The local coordinate
+		frame of node must be the physical coordinate frame of the picker's
+		image, e.g. a group scaled from millimeters to meters which holds the
+		slice quad or volume.
+		
+		@return metaimage.picking.VoxelHit or None
+		"""
+		rayMatrix = self._node.getMatrix(viz.ABS_GLOBAL)
+		origin = rayMatrix.getPosition()
+		end = [o+f for o, f in zip(origin, rayMatrix.getForward())]
+		toLocal = node.getMatrix(viz.ABS_GLOBAL).inverse()
+		localOrigin = toLocal.preMultVec(origin)
+		localEnd = toLocal.preMultVec(end)
+		direction = [e-o for e, o in zip(localEnd, localOrigin)]
+		return picker.pick(localOrigin, direction, threshold)
 	
 	def finalize(self):
 		"""Finalizes the grabbing"""
+		# the ray of a ray batch passes through the held item to the
+		# placement target behind it
+		if hasattr(self._collisionTester, 'setIgnored'):
+			self._collisionTester.setIgnored(self._currentAttacher.getDst())
 		super(RayGrabber, self).finalize()
 		if self._attacher.getDst() is not None:
 			self._ray.visible(False)
@@ -431,13 +687,6 @@ class RayGrabber(AbstractGrabber):
 		self._node.remove()
 		self._collisionTester.remove()
 		self._attacher.remove()
-		self._placer.remove()
+		self._removePlacer()
 		self._ray.remove()
-		if self._highlighter:
-			self._highlighter.remove()
-		if self._previewRay:
-			self._previewRay.remove()
-			self._previewRay = None
-		if self._previewObject:
-			self._previewObject.remove()
-			self._previewObject = None
+		self._removeHighlight()
@@ -0,0 +1,190 @@
+"""Gesture state machine and finger pose blending for avatar hands. The
+gesture is only re-evaluated when the input mask changes, the finger pose of
+each gesture is computed once and cached, and the finger bones are only
+written while blending from one cached pose to the next, so a steady
+gesture costs a single mask comparison per frame."""
+
+import math
+
+import numpy
+
+import viz
+import vizact
+
+
+GESTURE_CHANGE_EVENT = viz.getEventID('GESTURE_CHANGE_EVENT')
+
+#thumb, index, middle, ring and pinky bones of the Complete Characters HD
+#avatars, three joints per finger from the palm outwards
+FINGER_BONES = [['Bip01 %s Finger%d%s' % ('%s', finger, joint) for joint in ('', '1', '2')]
+				for finger in range(5)]
+
+
+def _quatMultiply(a, b):
+	"""Returns the products of the [x, y, z, w] quaternions in a and b"""
+	ax, ay, az, aw = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+	bx, by, bz, bw = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+	return numpy.stack([aw*bx+ax*bw+ay*bz-az*by,
+						aw*by-ax*bz+ay*bw+az*bx,
+						aw*bz+ax*by-ay*bx+az*bw,
+						aw*bw-ax*bx-ay*by-az*bz], axis=-1)
+
+
+def _nlerp(a, b, t):
+	"""Interpolates two arrays of quaternions along the shorter arc"""
+	sign = numpy.where(numpy.sum(a*b, axis=-1) < 0, -1.0, 1.0)[..., None]
+	result = (1.0-t)*a+t*sign*b
+	return result/numpy.linalg.norm(result, axis=-1)[..., None]
+
+
+class GestureStateMachine(object):
+	"""Maps the buttons of an InputSnapshot to gestures. Rules are checked in
+	order and the first one whose button is down selects the gesture. The
+	rules are only evaluated when the mask of one of their devices changed.
+
+	@param rules list of (device, button, gesture)
+	@param default gesture used while no rule matches
+	"""
+	def __init__(self, snapshot, rules, default):
+		self._snapshot = snapshot
+		self._default = default
+		self._rules = [(snapshot.getIndex(device), snapshot.watch(device, button), gesture)
+						for device, button, gesture in rules]
+		self._indices = sorted(set(index for index, mask, gesture in self._rules))
+		self._masks = None
+		self._gesture = default
+		self._dataDict = {}
+
+	def update(self):
+		"""Re-evaluates the gesture if the input changed and returns True if
+		the gesture changed
+		"""
+		self._snapshot.update()
+		states = self._snapshot.states
+		masks = [states[index] for index in self._indices]
+		if masks == self._masks:
+			return False
+		self._masks = masks
+		gesture = self._default
+		for index, mask, ruleGesture in self._rules:
+			if states[index]&mask:
+				gesture = ruleGesture
+				break
+		if gesture == self._gesture:
+			return False
+		previous = self._gesture
+		self._gesture = gesture
+		viz.sendEvent(GESTURE_CHANGE_EVENT, viz.Event(machine=self, gesture=gesture, previous=previous))
+		return True
+
+	def getGesture(self):
+		self.update()
+		return self._gesture
+
+	def getData(self):
+		"""Returns the (gesture, False, False) tuple of hand sensors. The
+		same tuple object is returned for as long as the gesture is steady.
+		"""
+		gesture = self.getGesture()
+		data = self._dataDict.get(gesture)
+		if data is None:
+			data = self._dataDict[gesture] = (gesture, False, False)
+		return data
+
+
+class FingerPoseBlender(object):
+	"""Bends the finger bones of an avatar into the pose of the current
+	gesture of a GestureStateMachine. A pose is given by the flexion of the
+	thumb, index, middle, ring and pinky between 0 (straight) and 1 (fully
+	bent) and turned into joint rotations once per gesture. Every joint of a
+	finger bends by the same angle, so the poses only approximate those of
+	hand.AvatarHandModel; to keep the hand model's poses, use the machine's
+	getData as the getData of the model's sensor instead, at the cost of
+	the model re-applying the gesture every frame.
+
+	@param flexionDict gesture: (thumb, index, middle, ring, pinky)
+	@param blendTime seconds for blending from one pose to the next
+	@param maxAngle bend angle of each joint at full flexion, in degrees
+	@param axis local axis the finger joints bend around
+	"""
+	def __init__(self,
+					avatar,
+					machine,
+					flexionDict,
+					left=False,
+					blendTime=0.1,
+					maxAngle=80.0,
+					axis=(0.0, 0.0, 1.0),
+					updatePriority=viz.PRIORITY_LINKS+2):
+		side = 'L' if left else 'R'
+		self._bones = [avatar.getBone(name % side) for finger in FINGER_BONES for name in finger]
+		for bone in self._bones:
+			bone.lock()
+		self._restPose = numpy.array([bone.getQuat(viz.ABS_PARENT) for bone in self._bones], dtype=float)
+		self._machine = machine
+		self._flexionDict = flexionDict
+		self._blendTime = blendTime
+		self._maxAngle = maxAngle
+		self._axis = numpy.asarray(axis, dtype=float)/numpy.linalg.norm(axis)
+		self._poseDict = {}
+		self._gesture = machine.getGesture()
+		self._pose = self.getPose(self._gesture)
+		self._startPose = self._pose
+		self._targetPose = self._pose
+		self._blendStart = None
+		self._applyPose(self._pose)
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+
+	def getPose(self, gesture):
+		"""Returns the cached joint rotations of a gesture"""
+		pose = self._poseDict.get(gesture)
+		if pose is None:
+			flexion = numpy.repeat(numpy.asarray(self._flexionDict[gesture], dtype=float), 3)
+			half = 0.5*math.radians(self._maxAngle)*flexion
+			bend = numpy.zeros((len(half), 4))
+			bend[:, :3] = numpy.sin(half)[:, None]*self._axis
+			bend[:, 3] = numpy.cos(half)
+			pose = self._poseDict[gesture] = _quatMultiply(self._restPose, bend)
+		return pose
+
+	def getMachine(self):
+		return self._machine
+
+	def isBlending(self):
+		return self._blendStart is not None
+
+	def _applyPose(self, pose):
+		for bone, quat in zip(self._bones, pose.tolist()):
+			bone.setQuat(quat, viz.ABS_PARENT)
+
+	def _update(self):
+		gesture = self._machine.getGesture()
+		if gesture != self._gesture:
+			self._gesture = gesture
+			self._startPose = self._pose
+			self._targetPose = self.getPose(gesture)
+			self._blendStart = viz.getFrameTime()
+		if self._blendStart is None:
+			return
+		t = 1.0
+		if self._blendTime > 0:
+			t = min(1.0, (viz.getFrameTime()-self._blendStart)/self._blendTime)
+		if t >= 1.0:
+			self._pose = self._targetPose
+			self._blendStart = None
+		else:
+			self._pose = _nlerp(self._startPose, self._targetPose, t)
+		self._applyPose(self._pose)
+
+	def remove(self):
+		self._updateEvent.remove()
+
+
+def addGestureHand(avatar, snapshot, rules, default, flexionDict, left=False, **kwargs):
+	"""Returns a FingerPoseBlender which bends the fingers of an avatar hand
+	into the pose of the gesture selected by the buttons of an InputSnapshot,
+	see GestureStateMachine for rules and default. While the gesture is
+	steady, a frame costs one mask comparison and writes no bones.
+	"""
+	machine = GestureStateMachine(snapshot, rules, default)
+	return FingerPoseBlender(avatar, machine, flexionDict, left=left, **kwargs)
@@ -0,0 +1,168 @@
+"""Declarative input bindings. An InputSnapshot reads every input device once
+per frame into a bit mask, and BindingTables dispatch actions from
+precompiled lists of (mask, action) entries, so transports, tools and
+gestures share one read of each device and bindings can be changed at
+runtime."""
+
+import viz
+
+
+HELD = 0
+PRESSED = 1
+RELEASED = 2
+
+
+class InputSnapshot(object):
+	"""Bit mask state of a set of input devices, read once per frame on first
+	use. Devices are either read through getState(), in which case buttons
+	are mask bits, or through isButtonDown() for a list of watched button
+	codes, in which case bit i of the mask is the i-th watched button.
+
+	@param devices dict of name: device or name: (device, buttons)
+	"""
+	def __init__(self, devices=None):
+		self._names = []
+		self._devices = []
+		self._buttons = []
+		self._indexDict = {}
+		self.states = []
+		self.previous = []
+		self._frame = None
+		for name, device in sorted((devices or {}).items()):
+			if isinstance(device, tuple):
+				self.addDevice(name, device[0], device[1])
+			else:
+				self.addDevice(name, device)
+
+	def addDevice(self, name, device, buttons=None):
+		"""Adds a device. If buttons is None the device's getState() mask is
+		used, otherwise the listed button codes are polled with isButtonDown().
+		"""
+		self._indexDict[name] = len(self._names)
+		self._names.append(name)
+		self._devices.append(device)
+		self._buttons.append(None if buttons is None else list(buttons))
+		self.states.append(0)
+		self.previous.append(0)
+
+	def getDeviceNames(self):
+		return list(self._names)
+
+	def getIndex(self, name):
+		"""Returns the index of a device in the states list"""
+		return self._indexDict[name]
+
+	def getButtons(self, name):
+		"""Returns the watched button codes of a device, or None if the device
+		is read through getState()
+		"""
+		return self._buttons[self._indexDict[name]]
+
+	def watch(self, name, button):
+		"""Returns the mask bit of a button, adding it to the watched buttons
+		of the device if needed
+		"""
+		buttons = self._buttons[self._indexDict[name]]
+		if buttons is None:
+			return button
+		if button not in buttons:
+			buttons.append(button)
+		return 1<<buttons.index(button)
+
+	def update(self):
+		"""Reads all devices, unless they were already read this frame"""
+		frame = viz.getFrameNumber()
+		if frame == self._frame:
+			return
+		self._frame = frame
+		states = self.states
+		self.previous[:] = states
+		for i, device in enumerate(self._devices):
+			buttons = self._buttons[i]
+			if buttons is None:
+				states[i] = device.getState()
+			else:
+				isButtonDown = device.isButtonDown
+				mask = 0
+				for bit, button in enumerate(buttons):
+					if isButtonDown(button):
+						mask |= 1<<bit
+				states[i] = mask
+
+	def getState(self, name):
+		"""Returns the mask of a device for the current frame"""
+		self.update()
+		return self.states[self._indexDict[name]]
+
+	def isDown(self, name, button):
+		"""Returns True if the button of the device is down this frame"""
+		return bool(self.getState(name)&self.watch(name, button))
+
+
+class BindingTable(object):
+	"""Maps device buttons to actions. Actions are callables, or names of
+	methods of the target object, and are called with the keyword arguments
+	given to bind(). HELD bindings fire every frame the button is down,
+	PRESSED and RELEASED bindings on the frame the button changes.
+	"""
+	def __init__(self, snapshot, target=None):
+		self._snapshot = snapshot
+		self._target = target
+		self._bindings = []
+		self._compiled = None
+
+	def bind(self, device, button, action, mode=HELD, **kwargs):
+		"""Adds a binding"""
+		self._bindings.append((device, button, action, mode, kwargs))
+		self._compiled = None
+
+	def unbind(self, device=None, button=None, action=None):
+		"""Removes all bindings matching the given device, button and action"""
+		self._bindings = [b for b in self._bindings
+							if not ((device is None or b[0] == device)
+								and (button is None or b[1] == button)
+								and (action is None or b[2] == action))]
+		self._compiled = None
+
+	def getBindings(self):
+		return list(self._bindings)
+
+	def _compile(self):
+		"""Internal method which groups the bindings per device into lists of
+		(mask, function, kwargs) for each mode
+		"""
+		snapshot = self._snapshot
+		deviceDict = {}
+		for device, button, action, mode, kwargs in self._bindings:
+			index = snapshot.getIndex(device)
+			mask = snapshot.watch(device, button)
+			if not callable(action):
+				action = getattr(self._target, action)
+			entry = deviceDict.setdefault(index, [0, [], [], []])
+			entry[0] |= mask
+			entry[1+mode].append((mask, action, kwargs))
+		self._compiled = [(index, entry[0], entry[1], entry[2], entry[3])
+							for index, entry in sorted(deviceDict.items())]
+
+	def dispatch(self):
+		"""Calls the actions of all bindings which fire this frame"""
+		if self._compiled is None:
+			self._compile()
+		snapshot = self._snapshot
+		snapshot.update()
+		states = snapshot.states
+		previous = snapshot.previous
+		for index, used, held, pressed, released in self._compiled:
+			state = states[index]&used
+			if state:
+				for mask, action, kwargs in held:
+					if state&mask:
+						action(**kwargs)
+			changed = (state^previous[index])&used
+			if changed:
+				for mask, action, kwargs in pressed:
+					if changed&state&mask:
+						action(**kwargs)
+				for mask, action, kwargs in released:
+					if changed&~state&mask:
+						action(**kwargs)
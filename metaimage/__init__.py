@@ -0,0 +1,21 @@
+# MetaImage volume core, usable without the Vizard runtime
+#
+# Importing the package only loads the header parser. numpy, PIL and the
+# other heavy libraries are imported by the submodules that need them, when
+# they are first used, so batch jobs and process pool workers start fast:
+#
+#   metaimage.image        MetaImage, the mhd/raw loader
+#   metaimage.slices       slice extraction and image export
+#   metaimage.contrast     tiled CLAHE contrast enhancement of slices
+#   metaimage.layouts      axis-major and bricked layouts for fast slicing
+#   metaimage.slabs        thick-slab MIP, MinIP and average projections
+#   metaimage.resample     chunked, threaded resampling to a new spacing
+#   metaimage.filters      Gaussian, median and anisotropic diffusion filters
+#   metaimage.segmentation threshold, component and region segmentation
+#   metaimage.labelmaps    run length label volumes and their overlay
+#   metaimage.sequence     4D time series with background preloading
+#   metaimage.picking      ray picking into the voxel data
+
+from __future__ import print_function, division
+
+from metaimage.image import MetaImage
@@ -0,0 +1,93 @@
+# contrast enhancement of 8 bit slice images
+#
+# Tiled CLAHE (contrast limited adaptive histogram equalization): the image
+# is split into a grid of tiles, the histogram of every tile is clipped at
+# clipLimit times the mean bin height, the clipped counts are spread over
+# all bins and the cumulative histogram becomes the lookup table of the
+# tile. Each pixel is mapped by the tables of the four tiles whose centres
+# surround it, bilinearly weighted, so there are no seams between tiles.
+# The histograms of all tiles come from one bincount and the mapping is
+# four gathers from the flattened tables, no loops over tiles or pixels.
+# getTileLuts and applyLuts are separate, so callers can keep the tables of
+# an image and map it again without counting.
+
+from __future__ import print_function, division
+
+import numpy
+
+
+BINS = 256
+
+
+def _getTiles(count, tiles):
+    '''Returns the tile of every row (or column) and the tile count
+    '''
+    tiles = max(min(int(tiles), count), 1)
+    return numpy.arange(count) * tiles // count, tiles
+
+
+def getTileLuts(grey, tiles=(8, 8), clipLimit=2.0):
+    '''Returns the (rows, columns, 256) uint8 lookup tables of the tiles of
+    a 2D uint8 image, tiles being the number of tile rows and columns. A
+    clipLimit of None or 0 equalizes without clipping.
+    '''
+    rowTiles, tileRows = _getTiles(grey.shape[0], tiles[0])
+    colTiles, tileCols = _getTiles(grey.shape[1], tiles[1])
+    offsets = (rowTiles * (tileCols * BINS))[:, None] + (colTiles * BINS)[None, :]
+    hist = numpy.bincount((offsets + grey).ravel(),
+                          minlength=tileRows * tileCols * BINS)
+    hist = hist.reshape(tileRows, tileCols, BINS).astype(numpy.float32)
+    counts = hist.sum(axis=2, keepdims=True)
+    if clipLimit:
+        limit = numpy.maximum(clipLimit * counts / BINS, 1.0)
+        excess = numpy.maximum(hist - limit, 0.0).sum(axis=2, keepdims=True)
+        numpy.minimum(hist, limit, out=hist)
+        hist += excess / BINS
+    cdf = numpy.cumsum(hist, axis=2)
+    cdf *= (BINS - 1) / counts
+    return numpy.clip(numpy.rint(cdf), 0, BINS - 1).astype(numpy.uint8)
+
+
+def _getNeighbours(count, tiles):
+    '''Returns the lower and upper tile whose centres surround every row (or
+    column) and the weight of the upper one
+    '''
+    tileOf = numpy.arange(count) * tiles // count
+    centres = (numpy.bincount(tileOf, weights=numpy.arange(count))
+               / numpy.bincount(tileOf))
+    positions = numpy.arange(count)
+    lower = numpy.clip(numpy.searchsorted(centres, positions, 'right') - 1,
+                       0, tiles - 1)
+    upper = numpy.minimum(lower + 1, tiles - 1)
+    span = centres[upper] - centres[lower]
+    span[span == 0] = 1.0
+    weight = numpy.clip((positions - centres[lower]) / span, 0.0, 1.0)
+    return lower, upper, weight.astype(numpy.float32)
+
+
+def applyLuts(grey, luts):
+    '''Returns grey mapped by the tile lookup tables from getTileLuts
+    '''
+    tileRows, tileCols = luts.shape[:2]
+    top, bottom, wy = _getNeighbours(grey.shape[0], tileRows)
+    left, right, wx = _getNeighbours(grey.shape[1], tileCols)
+    flat = luts.reshape(-1)
+    grey = grey.astype(numpy.intp)
+
+    def lookup(rows, cols):
+        offsets = (rows * (tileCols * BINS))[:, None] + (cols * BINS)[None, :]
+        return numpy.take(flat, offsets + grey).astype(numpy.float32)
+
+    wx = wx[None, :]
+    upper = lookup(top, left)
+    upper += (lookup(top, right) - upper) * wx
+    lower = lookup(bottom, left)
+    lower += (lookup(bottom, right) - lower) * wx
+    upper += (lower - upper) * wy[:, None]
+    return numpy.rint(upper).astype(numpy.uint8)
+
+
+def clahe(grey, tiles=(8, 8), clipLimit=2.0):
+    '''Returns grey enhanced with tiled CLAHE, see getTileLuts
+    '''
+    return applyLuts(grey, getTileLuts(grey, tiles, clipLimit))
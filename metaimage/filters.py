@@ -0,0 +1,255 @@
+# smoothing filters for MetaImage volumes
+#
+# Each filter runs over chunks of slices along z in a thread pool. A chunk
+# is read with a halo of neighbouring slices, as many as the filter reaches
+# along z, so the chunks can be filtered independently and only the inner
+# slices of each are written to the output. The float32 scratch buffers of
+# the chunks are kept by the filter and reused by later chunks and calls,
+# so filtering another volume of the same size allocates no new scratch
+# buffers. Integer volumes are rounded and clipped back to their own type.
+
+from __future__ import print_function, division
+
+import concurrent.futures
+import math
+import os
+import threading
+
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class _Scratch(object):
+    '''Named scratch arrays of one chunk task, grown as needed
+    '''
+    def __init__(self):
+        self.__buffers = {}
+
+    def get(self, name, shape, dtype=numpy.float32):
+        size = int(numpy.prod(shape))
+        buffer = self.__buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = self.__buffers[name] = numpy.empty(size, dtype)
+        return buffer[:size].reshape(shape)
+
+    def getMemorySize(self):
+        return sum(buffer.nbytes for buffer in self.__buffers.values())
+
+
+class VolumeFilter(object):
+    '''Base class of the filters. Subclasses set halo, the number of slices
+    the filter reaches along z, and implement filterChunk.
+
+    @param threads number of threads, all cores by default
+    @param chunkSize number of output slices per chunk
+    '''
+    halo = 0
+
+    def __init__(self, threads=None, chunkSize=16):
+        self.threads = threads
+        self.chunkSize = chunkSize
+        self.__scratchPool = []
+        self.__lock = threading.Lock()
+
+    def getKey(self):
+        '''Returns a hashable description of the filter and its parameters,
+        used to cache filtered volumes
+        '''
+        raise NotImplementedError
+
+    def filterChunk(self, chunk, scratch):
+        '''Returns the filtered chunk, an array of the shape of chunk
+        '''
+        raise NotImplementedError
+
+    def getScratchMemorySize(self):
+        '''Returns the bytes held by the scratch buffers
+        '''
+        return sum(scratch.getMemorySize() for scratch in self.__scratchPool)
+
+    def __takeScratch(self):
+        with self.__lock:
+            if self.__scratchPool:
+                return self.__scratchPool.pop()
+        return _Scratch()
+
+    def __returnScratch(self, scratch):
+        with self.__lock:
+            self.__scratchPool.append(scratch)
+
+    def apply(self, dataArray):
+        '''Returns the filtered volume as a new array of the type of
+        dataArray
+        '''
+        out = numpy.empty(dataArray.shape, dtype=dataArray.dtype)
+        if dataArray.dtype.kind in 'ui':
+            info = numpy.iinfo(dataArray.dtype)
+        else:
+            info = None
+        count = dataArray.shape[0]
+
+        def processChunk(start):
+            stop = min(start + self.chunkSize, count)
+            first = max(start - self.halo, 0)
+            last = min(stop + self.halo, count)
+            scratch = self.__takeScratch()
+            try:
+                result = self.filterChunk(dataArray[first:last], scratch)
+                result = result[start - first:stop - first]
+                if info is not None:
+                    result = numpy.clip(numpy.rint(result), info.min, info.max)
+                out[start:stop] = result
+            finally:
+                self.__returnScratch(scratch)
+
+        starts = range(0, count, self.chunkSize)
+        threads = self.threads or os.cpu_count() or 1
+        if threads <= 1:
+            for start in starts:
+                processChunk(start)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+                # list() re-raises errors of the chunks
+                list(pool.map(processChunk, starts))
+        return out
+
+
+def _pad(chunk, radius, scratch, name):
+    '''Returns chunk as float32 padded by radius on every side, repeating
+    the border voxels
+    '''
+    shape = [n + 2 * r for n, r in zip(chunk.shape, radius)]
+    padded = scratch.get(name, shape)
+    inner = tuple(slice(r, r + n) for n, r in zip(chunk.shape, radius))
+    padded[inner] = chunk
+    for axis, r in enumerate(radius):
+        if not r:
+            continue
+        # whole slabs are copied, including the padding of the axes
+        # before, so the corners repeat the corner voxels
+        key = [slice(None)] * 3
+        for before, after in ((slice(0, r), r), (slice(r + chunk.shape[axis], None), r + chunk.shape[axis] - 1)):
+            key[axis] = before
+            edge = [slice(None)] * 3
+            edge[axis] = slice(after, after + 1)
+            padded[tuple(key)] = padded[tuple(edge)]
+    return padded
+
+
+class GaussianFilter(VolumeFilter):
+    '''Separable Gaussian smoothing with sigma in voxels, a single value or
+    x, y, z values. The kernel is cut off at 3 sigma.
+    '''
+    def __init__(self, sigma=1.0, threads=None, chunkSize=16):
+        super(GaussianFilter, self).__init__(threads, chunkSize)
+        if numpy.isscalar(sigma):
+            sigma = [sigma] * 3
+        # per array axis z, y, x
+        self.sigma = [float(s) for s in sigma[::-1]]
+        self.kernels = []
+        for s in self.sigma:
+            radius = int(math.ceil(3.0 * s)) if s > 0 else 0
+            x = numpy.arange(-radius, radius + 1, dtype=numpy.float32)
+            kernel = numpy.exp(-0.5 * (x / max(s, 1e-6)) ** 2)
+            self.kernels.append((kernel / kernel.sum()).astype(numpy.float32))
+        self.halo = len(self.kernels[0]) // 2
+
+    def getKey(self):
+        return ('gaussian', tuple(self.sigma))
+
+    def filterChunk(self, chunk, scratch):
+        result = chunk
+        for axis, kernel in enumerate(self.kernels):
+            radius = len(kernel) // 2
+            if not radius:
+                continue
+            pad = [0, 0, 0]
+            pad[axis] = radius
+            padded = _pad(result, pad, scratch, 'padded')
+            accumulator = scratch.get('sum', result.shape)
+            term = scratch.get('term', result.shape)
+            key = [slice(None)] * 3
+            for i, weight in enumerate(kernel):
+                key[axis] = slice(i, i + result.shape[axis])
+                if i == 0:
+                    numpy.multiply(padded[tuple(key)], weight, out=accumulator)
+                else:
+                    numpy.multiply(padded[tuple(key)], weight, out=term)
+                    accumulator += term
+            result = accumulator
+        return result
+
+
+class MedianFilter(VolumeFilter):
+    '''Median of the size^3 neighbourhood of every voxel. The neighbourhood
+    values are stacked in a scratch array of size^3 chunks, so keep size
+    and chunkSize small.
+    '''
+    def __init__(self, size=3, threads=None, chunkSize=4):
+        super(MedianFilter, self).__init__(threads, chunkSize)
+        self.size = size
+        self.halo = size // 2
+
+    def getKey(self):
+        return ('median', self.size)
+
+    def filterChunk(self, chunk, scratch):
+        radius = self.size // 2
+        padded = _pad(chunk, [radius] * 3, scratch, 'padded')
+        # neighbours along the last axis, partitioning along the contiguous
+        # axis is several times faster than along the first, and one copy
+        # from a window view gathers them faster than a copy per neighbour
+        stack = scratch.get('stack', chunk.shape + (self.size ** 3,))
+        windows = sliding_window_view(padded, (self.size,) * 3)
+        numpy.copyto(stack.reshape(windows.shape), windows)
+        middle = stack.shape[-1] // 2
+        stack.partition(middle, axis=-1)
+        return stack[..., middle]
+
+
+class DiffusionFilter(VolumeFilter):
+    '''Edge preserving Perona-Malik anisotropic diffusion. Gradients much
+    larger than kappa (in grey values) are edges and hardly smoothed. Each
+    iteration reaches one voxel further, so halo is the iteration count.
+    '''
+    def __init__(self, iterations=5, kappa=30.0, step=1.0 / 7.0,
+                 threads=None, chunkSize=16):
+        super(DiffusionFilter, self).__init__(threads, chunkSize)
+        self.iterations = iterations
+        self.kappa = float(kappa)
+        self.step = float(step)
+        self.halo = iterations
+
+    def getKey(self):
+        return ('diffusion', self.iterations, self.kappa, self.step)
+
+    def filterChunk(self, chunk, scratch):
+        u = scratch.get('u', chunk.shape)
+        u[...] = chunk
+        flow = scratch.get('flow', chunk.shape)
+        for iteration in range(self.iterations):
+            flow.fill(0.0)
+            for axis in range(3):
+                if chunk.shape[axis] < 2:
+                    continue
+                upper = [slice(None)] * 3
+                lower = [slice(None)] * 3
+                upper[axis] = slice(1, None)
+                lower[axis] = slice(None, -1)
+                upper, lower = tuple(upper), tuple(lower)
+                shape = list(chunk.shape)
+                shape[axis] -= 1
+                gradient = scratch.get('gradient', shape)
+                flux = scratch.get('flux', shape)
+                numpy.subtract(u[upper], u[lower], out=gradient)
+                # exp(-(gradient / kappa)^2) * gradient
+                numpy.multiply(gradient, 1.0 / self.kappa, out=flux)
+                numpy.square(flux, out=flux)
+                numpy.negative(flux, out=flux)
+                numpy.exp(flux, out=flux)
+                flux *= gradient
+                flow[lower] += flux
+                flow[upper] -= flux
+            flow *= self.step
+            u += flow
+        return u
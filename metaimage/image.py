@@ -0,0 +1,231 @@
+# helper class to load MetaImage information from a file
+#
+# Copyright (C) 2008  'Peter Roesch' <Peter.Roesch@fh-augsburg.de>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+# or open http://www.fsf.org/licensing/licenses/gpl.html
+#
+# numpy is only imported once voxel data is loaded, so reading headers is
+# cheap. With memoryMap=True the voxel data is memory mapped read only and
+# a pickled MetaImage only carries its header: a worker process unpickling
+# it maps the same file again instead of receiving a copy of the volume.
+
+from __future__ import print_function, division
+
+import sys
+import os.path
+
+
+class MetaImage (object):
+    '''Load 3D image characteristics from a mhd file
+    '''
+    __dataTypeMap = \
+            {'MET_UCHAR': 'uint8', 'MET_CHAR': 'int8',
+             'MET_USHORT': 'uint16', 'MET_SHORT': 'int16',
+             'MET_UINT': 'uint32', 'MET_INT': 'int32',
+             'MET_ULONG': 'uint64', 'MET_LONG': 'int64',
+             'MET_FLOAT': 'float32', 'MET_DOUBLE': 'float64'}
+
+    def __init__(self, fileName, doDataLoad=True, memoryMap=False):
+        self.fileName = fileName
+        self.memoryMap = memoryMap
+        self.__dic = {}
+        self.__loadMHD(fileName)
+        self.NDims = 3
+        if 'NDims' in self.__dic:
+            self.NDims = int(self.__dic['NDims'][0])
+        self.BinaryDataByteOrderMSB = []
+        if 'BinaryDataByteOrderMSB' in self.__dic:
+            self.BinaryDataByteOrderMSB \
+                = bool(self.__dic['BinaryDataByteOrderMSB'][0])
+        self.TransformMatrix = [1, 0, 0, 0, 1, 0, 0, 0, 1]
+        if 'TransformMatrix' in self.__dic:
+            self.TransformMatrix = []
+            self.__readPar('TransformMatrix', self.TransformMatrix,
+                           float, '0', 9)
+        self.Offset = []
+        self.__readPar('Offset', self.Offset, float, '0', self.NDims)
+        self.CenterOfRotation = []
+        self.__readPar('CenterOfRotation', self.CenterOfRotation,
+                       float, '0', self.NDims)
+        self.ElementSpacing = []
+        self.__readPar('ElementSpacing', self.ElementSpacing,
+                       float, '0', self.NDims)
+        self.DimSize = []
+        self.__readPar('DimSize', self.DimSize, int, '1', self.NDims)
+        self.ElementType = None
+        if 'ElementType' in self.__dic:
+            self.ElementType = self.__dic['ElementType'][0]
+            if self.ElementType in self.__dataTypeMap:
+                self.__numpyDataType = self.__dataTypeMap[self.ElementType]
+            else:
+                print('illegal data type ', self.ElementType)
+                sys.exit()
+        self.ElementDataFile = None
+        if 'ElementDataFile' in self.__dic:
+            self.ElementDataFile = self.__dic['ElementDataFile'][0]
+        self.dataArray = None
+        self.__layout = None
+        self.__resampled = {}
+        self.__filtered = {}
+        if doDataLoad:
+            self.loadData()
+
+    def __readPar(self, name, target, type, defaultValue, dim=3):
+        for i in range(dim):
+            if name in self.__dic:
+                target.append(type(self.__dic[name][i]))
+            else:
+                target.append(type(defaultValue))
+
+    def __loadMHD(self, fileName):
+        try:
+            mhdFile = open(fileName, 'r')
+        except FileNotFoundError:
+            print('could not open file ', fileName)
+            sys.exit()
+        for line in mhdFile:
+            words = line.split()
+            if len(words) > 0:
+                self.__dic[words[0]] = words[2:]
+        mhdFile.close()
+
+    def getDataFileName(self):
+        '''Returns the path of the raw voxel data file
+        '''
+        return os.path.join(os.path.dirname(self.fileName),
+                            self.ElementDataFile)
+
+    def getDataType(self):
+        '''Returns the numpy type name of the voxels, e.g. 'uint8'
+        '''
+        return self.__numpyDataType
+
+    def loadData(self):
+        '''Loads the voxel data into dataArray, indexed [z, y, x]
+        '''
+        import numpy
+        fName = self.getDataFileName()
+        if not os.path.exists(fName):
+            print('could not open file ', self.ElementDataFile)
+            sys.exit()
+        shape = tuple(self.DimSize[::-1])
+        if self.memoryMap:
+            self.dataArray = numpy.memmap(fName, dtype=self.__numpyDataType,
+                                          mode='r', shape=shape)
+        else:
+            self.dataArray = numpy.fromfile(
+                fName, self.__numpyDataType).reshape(shape)
+        self.__layout = None
+        self.__resampled = {}
+        self.__filtered = {}
+        return self.dataArray
+
+    def buildLayout(self, kind='axis', axes=(0, 1, 2), brickSize=32):
+        '''Builds and caches a layout for slicing, see metaimage.layouts.
+        kind is 'axis' for contiguous copies along the given array axes or
+        'bricks' for a bricked copy. Returns the layout.
+        '''
+        from metaimage import layouts
+        if kind == 'axis':
+            self.__layout = layouts.AxisMajorLayout(self.dataArray, axes)
+        elif kind == 'bricks':
+            self.__layout = layouts.BrickedLayout(self.dataArray, brickSize)
+        else:
+            raise ValueError('unknown layout ' + str(kind))
+        return self.__layout
+
+    def getLayout(self):
+        return self.__layout
+
+    def clearLayout(self):
+        self.__layout = None
+
+    def getSlice(self, axis, index):
+        '''Returns slice index along array axis (0: z, 1: y, 2: x), from
+        the cached layout if one was built
+        '''
+        if self.__layout is not None:
+            return self.__layout.getSlice(axis, index)
+        from metaimage import slices
+        return slices.getSlice(self.dataArray, axis, index)
+
+    def getResampled(self, spacing=None, order=1, threads=None):
+        '''Returns the volume resampled to spacing, x, y, z values, a single
+        value or None for isotropic voxels of the smallest ElementSpacing,
+        together with its x, y, z spacing, see metaimage.resample. order is
+        1 for linear and 3 for cubic interpolation. The result is cached.
+        '''
+        from metaimage import resample
+        spacing = resample.getTargetSpacing(self.ElementSpacing, spacing)
+        key = (tuple(spacing), order)
+        if key not in self.__resampled:
+            self.__resampled[key] = resample.resample(
+                self.dataArray, self.ElementSpacing, spacing, order, threads)
+        return self.__resampled[key], spacing
+
+    def clearResampled(self):
+        self.__resampled = {}
+
+    def getFiltered(self, volumeFilter):
+        '''Returns the volume filtered with a metaimage.filters filter. The
+        result is cached by the filter's key.
+        '''
+        key = volumeFilter.getKey()
+        if key not in self.__filtered:
+            self.__filtered[key] = volumeFilter.apply(self.dataArray)
+        return self.__filtered[key]
+
+    def clearFiltered(self):
+        self.__filtered = {}
+
+    def threshold(self, low, high=None):
+        '''Returns a uint8 mask of the voxels with low <= value <= high, see
+        metaimage.segmentation
+        '''
+        from metaimage import segmentation
+        return segmentation.threshold(self.dataArray, low, high)
+
+    def labelComponents(self, low, high=None):
+        '''Returns the label volume of the connected components of the
+        voxels with low <= value <= high and their number
+        '''
+        from metaimage import segmentation
+        return segmentation.labelComponents(self.dataArray, low, high)
+
+    def growRegion(self, seed, tolerance=10, low=None, high=None):
+        '''Returns the uint8 mask of the region grown from seed, an x, y, z
+        voxel index or a metaimage.picking.VoxelHit
+        '''
+        from metaimage import segmentation
+        return segmentation.growRegion(self.dataArray, seed, tolerance,
+                                       low, high)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # layouts, resampled and filtered volumes are as large as the
+        # volume, workers build their own
+        state['_MetaImage__layout'] = None
+        state['_MetaImage__resampled'] = {}
+        state['_MetaImage__filtered'] = {}
+        if self.memoryMap and self.dataArray is not None:
+            # mapped again when unpickled
+            state['dataArray'] = True
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.dataArray is True:
+            self.loadData()
@@ -0,0 +1,105 @@
+# run length compressed label volumes and their overlay on grey slices
+#
+# Label volumes, e.g. from metaimage.segmentation, are mostly background
+# with a few large regions, so each slice is stored as the values and
+# lengths of the runs of equal labels along the flattened slice. Slices are
+# encoded once for every array axis they are shown along and decoded on
+# demand with a single repeat. Overlays are composited with a palette of
+# one RGBA colour per label, label 0 being transparent: the blended colour
+# of every label and grey value pair is computed once into a table, so
+# compositing a slice is a single gather from it.
+
+from __future__ import print_function, division
+
+import colorsys
+
+import numpy
+
+
+def encode(image):
+    '''Returns the values and uint32 lengths of the runs of equal values of
+    the flattened image
+    '''
+    flat = image.reshape(-1)
+    starts = numpy.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = numpy.concatenate([[0], starts])
+    lengths = numpy.diff(numpy.append(starts, flat.size)).astype(numpy.uint32)
+    return flat[starts], lengths
+
+
+def decode(values, lengths, shape):
+    '''Returns the image of shape encoded by encode
+    '''
+    return numpy.repeat(values, lengths).reshape(shape)
+
+
+class RunLengthLabels(object):
+    '''Run length encoded slices of a label volume along the given array
+    axes. The label volume itself is not kept.
+    '''
+    def __init__(self, labels, axes=(0, 1, 2)):
+        self.shape = labels.shape
+        self.dtype = labels.dtype
+        self.labelCount = int(labels.max()) if labels.size else 0
+        self.__runs = {}
+        for axis in axes:
+            self.__runs[axis] = [encode(numpy.take(labels, index, axis=axis))
+                                 for index in range(labels.shape[axis])]
+
+    def getAxes(self):
+        return sorted(self.__runs)
+
+    def getLabelCount(self):
+        '''Returns the largest label'''
+        return self.labelCount
+
+    def getSlice(self, axis, index):
+        '''Returns slice index along array axis, oriented like
+        numpy.take(labels, index, axis)
+        '''
+        values, lengths = self.__runs[axis][index]
+        shape = [n for i, n in enumerate(self.shape) if i != axis]
+        return decode(values, lengths, shape)
+
+    def getMemorySize(self):
+        '''Returns the bytes held by the runs of all axes'''
+        return sum(values.nbytes + lengths.nbytes
+                   for runs in self.__runs.values() for values, lengths in runs)
+
+
+def getPalette(labelCount, alpha=128):
+    '''Returns a (labelCount + 1, 4) uint8 RGBA palette of well separated
+    hues with a transparent label 0
+    '''
+    palette = numpy.zeros((labelCount + 1, 4), numpy.uint8)
+    for label in range(1, labelCount + 1):
+        # golden ratio steps keep neighbouring labels apart
+        hue = (label * 0.618033988749895) % 1.0
+        rgb = colorsys.hsv_to_rgb(hue, 0.8, 1.0)
+        palette[label, :3] = [int(round(255 * c)) for c in rgb]
+        palette[label, 3] = alpha
+    return palette
+
+
+def getBlendTable(palette):
+    '''Returns the (labels * 256, 3) uint8 table of the RGB colour of every
+    label and grey value pair for an RGBA palette
+    '''
+    palette = numpy.asarray(palette, numpy.uint16)
+    alpha = palette[:, None, 3:]
+    grey = numpy.arange(256, dtype=numpy.uint16)[None, :, None]
+    # at most 255 * (255 - alpha) + 255 * alpha, fits into 16 bits
+    table = grey * (255 - alpha) + palette[:, None, :3] * alpha
+    table += 127
+    table //= 255
+    return table.astype(numpy.uint8).reshape(-1, 3)
+
+
+def blend(grey, labels, table):
+    '''Returns the (rows, columns, 3) uint8 RGB image of a uint8 grey image
+    with labels of the same shape overlaid, table being the blend table of
+    a palette with an entry for every label, see getBlendTable
+    '''
+    indices = labels.astype(numpy.intp) << 8
+    indices |= grey
+    return numpy.take(table, indices, axis=0)
@@ -0,0 +1,108 @@
+# memory layouts for fast slicing of MetaImage volumes along every axis
+#
+# dataArray is C ordered [z, y, x], so axial slices (axis 0) are contiguous,
+# coronal slices (axis 1) gather one row per z and sagittal slices (axis 2)
+# gather single voxels with a stride of a whole row. AxisMajorLayout keeps a
+# contiguous copy per slicing axis, trading one volume of memory per axis
+# for contiguous slices. BrickedLayout stores the volume once, as cubes of
+# brickSize^3 voxels, so every slice only touches the bricks it cuts and the
+# voxels of a slice within a brick lie close together.
+
+from __future__ import print_function, division
+
+import numpy
+
+
+def getSlices(dataArray, axis, start, stop):
+    '''Returns slices start to stop of a plain array along an axis, stacked
+    along the first axis
+    '''
+    key = [slice(None)] * dataArray.ndim
+    key[axis] = slice(start, stop)
+    return numpy.moveaxis(dataArray[tuple(key)], axis, 0)
+
+
+class AxisMajorLayout(object):
+    '''Contiguous copies of the volume with the slicing axis first
+    '''
+    def __init__(self, dataArray, axes=(0, 1, 2)):
+        self.dataArray = dataArray
+        self.__copies = {}
+        for axis in axes:
+            if axis == 0 and dataArray.flags.c_contiguous:
+                self.__copies[axis] = dataArray
+            else:
+                self.__copies[axis] = numpy.ascontiguousarray(
+                    numpy.moveaxis(dataArray, axis, 0))
+
+    def getAxes(self):
+        return sorted(self.__copies)
+
+    def getSlice(self, axis, index):
+        '''Returns slice index along array axis, oriented like
+        numpy.take(dataArray, index, axis)
+        '''
+        copy = self.__copies.get(axis)
+        if copy is None:
+            return numpy.take(self.dataArray, index, axis=axis)
+        return copy[index]
+
+    def getSlices(self, axis, start, stop):
+        '''Returns slices start to stop along array axis, stacked along the
+        first axis
+        '''
+        copy = self.__copies.get(axis)
+        if copy is None:
+            return getSlices(self.dataArray, axis, start, stop)
+        return copy[start:stop]
+
+    def getMemorySize(self):
+        '''Returns the bytes used by the copies, without dataArray
+        '''
+        return sum(copy.nbytes for copy in self.__copies.values()
+                   if copy is not self.dataArray)
+
+
+class BrickedLayout(object):
+    '''The volume as bricks of brickSize^3 voxels, indexed
+    [brick z, brick y, brick x, z, y, x]. The volume is padded to a multiple
+    of brickSize by repeating its border voxels.
+    '''
+    def __init__(self, dataArray, brickSize=32):
+        self.shape = dataArray.shape
+        self.brickSize = brickSize
+        pad = [(0, -n % brickSize) for n in dataArray.shape]
+        if any(p[1] for p in pad):
+            dataArray = numpy.pad(dataArray, pad, mode='edge')
+        nz, ny, nx = [n // brickSize for n in dataArray.shape]
+        self.bricks = numpy.ascontiguousarray(
+            dataArray.reshape(nz, brickSize, ny, brickSize, nx, brickSize)
+            .transpose(0, 2, 4, 1, 3, 5))
+
+    def getAxes(self):
+        return [0, 1, 2]
+
+    def getSlice(self, axis, index):
+        '''Returns slice index along array axis, oriented like
+        numpy.take(dataArray, index, axis)
+        '''
+        brick, offset = divmod(index, self.brickSize)
+        key = [slice(None)] * 6
+        key[axis] = brick
+        key[axis + 3] = offset
+        # remaining [brick row, brick column, row, column]
+        part = self.bricks[tuple(key)]
+        rows, cols = [n for i, n in enumerate(self.shape) if i != axis]
+        image = part.transpose(0, 2, 1, 3).reshape(
+            part.shape[0] * part.shape[2], part.shape[1] * part.shape[3])
+        return image[:rows, :cols]
+
+    def getSlices(self, axis, start, stop):
+        '''Returns slices start to stop along array axis, stacked along the
+        first axis
+        '''
+        return numpy.stack([self.getSlice(axis, index)
+                            for index in range(start, stop)])
+
+    def getMemorySize(self):
+        return self.bricks.nbytes
@@ -0,0 +1,162 @@
+# ray picking into MetaImage voxel data
+#
+# Rays are given in the physical (patient) coordinate frame of the image,
+# i.e. Offset + TransformMatrix * (index * ElementSpacing). The traversal is
+# a vectorized 3D DDA: all cell boundary crossings along the ray are computed
+# at once, first on a coarse grid of bricks to skip empty space and then on
+# the voxels of the remaining bricks.
+
+from __future__ import print_function, division
+
+import numpy
+
+
+class VoxelHit(object):
+    '''First voxel along a ray with a value above the picking threshold
+    '''
+    def __init__(self, value, index, position, distance):
+        self.value = value
+        self.index = index
+        self.position = position
+        self.distance = distance
+
+    def __repr__(self):
+        return 'VoxelHit(value=%s, index=%s, position=%s, distance=%.3f)' % (
+            self.value, self.index, tuple(self.position.tolist()), self.distance)
+
+
+def _clipRay(origin, direction, size):
+    '''Returns the parameter range of the ray inside the box [0, size], or
+    None if the ray misses the box or isn't finite
+    '''
+    if not (numpy.isfinite(origin).all() and numpy.isfinite(direction).all()):
+        return None
+    tStart, tEnd = 0.0, numpy.inf
+    for axis in range(3):
+        if direction[axis] == 0.0:
+            if not 0.0 <= origin[axis] < size[axis]:
+                return None
+            continue
+        t1 = -origin[axis] / direction[axis]
+        t2 = (size[axis] - origin[axis]) / direction[axis]
+        tStart = max(tStart, min(t1, t2))
+        tEnd = min(tEnd, max(t1, t2))
+    # a zero direction never leaves the box
+    if tStart >= tEnd or not numpy.isfinite(tEnd):
+        return None
+    return tStart, tEnd
+
+
+def _traverse(origin, direction, tStart, tEnd, cellSize, gridShape):
+    '''Returns the cells crossed by the ray between tStart and tEnd, in
+    order, as an (n, 3) array of x, y, z cell indices together with the
+    parameter at which the ray enters and leaves each cell, or None if
+    the range isn't finite
+    '''
+    if not (numpy.isfinite(tStart) and numpy.isfinite(tEnd)):
+        return None
+    crossings = [numpy.array([tStart, tEnd])]
+    for axis in range(3):
+        if direction[axis] == 0.0:
+            continue
+        a = origin[axis] + tStart * direction[axis]
+        b = origin[axis] + tEnd * direction[axis]
+        first = numpy.floor(min(a, b) / cellSize) + 1
+        last = numpy.ceil(max(a, b) / cellSize)
+        boundaries = numpy.arange(first, last) * cellSize
+        crossings.append((boundaries - origin[axis]) / direction[axis])
+    t = numpy.unique(numpy.concatenate(crossings))
+    t = t[(t >= tStart) & (t <= tEnd)]
+    middle = 0.5 * (t[:-1] + t[1:])
+    cells = numpy.floor((origin[None, :] + middle[:, None] * direction[None, :])
+                        / cellSize).astype(numpy.intp)
+    numpy.clip(cells, 0, numpy.array(gridShape) - 1, out=cells)
+    return cells, t[:-1], t[1:]
+
+
+class VoxelPicker(object):
+    '''Picks voxels of a MetaImage along rays. The maximum of each brick of
+    brickSize^3 voxels is computed once, so bricks which can't contain a
+    voxel above the threshold are skipped without touching their voxels.
+    '''
+    def __init__(self, image, brickSize=8, threshold=0):
+        self.image = image
+        self.brickSize = brickSize
+        self.threshold = threshold
+        data = image.dataArray
+        self.__size = numpy.array(data.shape[::-1], dtype=float)
+        # missing (zero) spacings count as 1, like in metaimage.resample
+        spacing = numpy.array(image.ElementSpacing[:3], dtype=float)
+        self.__spacing = numpy.where(spacing > 0, spacing, 1.0)
+        self.__offset = numpy.array(image.Offset[:3], dtype=float)
+        self.__rotation = numpy.array(image.TransformMatrix, dtype=float).reshape(3, 3)
+        self.__brickMax = self.__buildBrickMax(data, brickSize)
+
+    @staticmethod
+    def __buildBrickMax(data, brickSize):
+        pad = [(0, -n % brickSize) for n in data.shape]
+        if any(p[1] for p in pad):
+            data = numpy.pad(data, pad, mode='edge')
+        nz, ny, nx = [n // brickSize for n in data.shape]
+        bricks = data.reshape(nz, brickSize, ny, brickSize, nx, brickSize)
+        return bricks.max(axis=(1, 3, 5))
+
+    def toIndex(self, position):
+        '''Converts a physical position to continuous x, y, z voxel
+        coordinates, where voxel i covers [i, i + 1)
+        '''
+        local = self.__rotation.T.dot(numpy.asarray(position, dtype=float) - self.__offset)
+        return local / self.__spacing + 0.5
+
+    def toPosition(self, index):
+        '''Converts x, y, z voxel coordinates to a physical position'''
+        local = (numpy.asarray(index, dtype=float) - 0.5) * self.__spacing
+        return self.__offset + self.__rotation.dot(local)
+
+    def sample(self, position):
+        '''Returns the value of the voxel containing a physical position, or
+        None if the position lies outside the volume
+        '''
+        index = numpy.floor(self.toIndex(position)).astype(int)
+        if (index < 0).any() or (index >= self.__size).any():
+            return None
+        return self.image.dataArray[index[2], index[1], index[0]]
+
+    def pick(self, origin, direction, threshold=None, maxDistance=numpy.inf):
+        '''Returns a VoxelHit for the first voxel along the ray with a value
+        of at least threshold, or None. The direction doesn't need to be
+        normalized; distances are measured in units of its length.
+        '''
+        if threshold is None:
+            threshold = self.threshold
+        origin = numpy.asarray(origin, dtype=float)
+        direction = numpy.asarray(direction, dtype=float)
+        if not (numpy.isfinite(origin).all() and numpy.isfinite(direction).all()):
+            return None
+        start = self.toIndex(origin)
+        step = self.__rotation.T.dot(direction) / self.__spacing
+        clipped = _clipRay(start, step, self.__size)
+        if clipped is None:
+            return None
+        tStart, tEnd = clipped[0], min(clipped[1], maxDistance)
+        if tStart >= tEnd:
+            return None
+
+        data = self.image.dataArray
+        brickMax = self.__brickMax
+        traversed = _traverse(start, step, tStart, tEnd,
+                              self.brickSize, brickMax.shape[::-1])
+        if traversed is None:
+            return None
+        bricks, enter, leave = traversed
+        full = brickMax[bricks[:, 2], bricks[:, 1], bricks[:, 0]] >= threshold
+        for t0, t1 in zip(enter[full], leave[full]):
+            voxels, voxelEnter, _ = _traverse(start, step, t0, t1, 1, data.shape[::-1])
+            values = data[voxels[:, 2], voxels[:, 1], voxels[:, 0]]
+            above = numpy.flatnonzero(values >= threshold)
+            if len(above):
+                i = above[0]
+                t = voxelEnter[i]
+                return VoxelHit(values[i], tuple(int(v) for v in voxels[i]),
+                                self.toPosition(start + t * step), t)
+        return None
@@ -0,0 +1,121 @@
+# resampling of MetaImage volumes to a new voxel spacing
+#
+# The interpolation is separable: for every output index along an axis the
+# input indices and weights of its linear (2 taps) or cubic Catmull-Rom
+# (4 taps) kernel are computed once, and the volume is interpolated along
+# z, y and x in turn. The output is produced in chunks of output slices
+# along z, so only the float32 intermediates of one chunk per thread exist
+# at a time, and the chunks are processed by a thread pool; numpy releases
+# the GIL in the array operations.
+
+from __future__ import print_function, division
+
+import concurrent.futures
+import math
+import os
+
+import numpy
+
+
+LINEAR = 1
+CUBIC = 3
+
+
+def getTargetSpacing(spacing, newSpacing=None):
+    '''Returns the x, y, z output spacing for newSpacing, which may be a
+    single value, three values or None for isotropic voxels of the smallest
+    input spacing. Missing (zero) input spacings count as 1.
+    '''
+    spacing = [s if s > 0 else 1.0 for s in spacing[:3]]
+    if newSpacing is None:
+        return [min(spacing)] * 3
+    if numpy.isscalar(newSpacing):
+        return [float(newSpacing)] * 3
+    return [float(s) for s in newSpacing]
+
+
+def getWeights(count, spacing, newSpacing, order=LINEAR):
+    '''Returns the output count and the (output count, taps) arrays of input
+    indices and weights which resample one axis of count voxels
+    '''
+    if count > 1:
+        outCount = int(math.floor((count - 1) * spacing / newSpacing + 1e-6)) + 1
+    else:
+        outCount = 1
+    positions = numpy.arange(outCount) * (newSpacing / spacing)
+    base = numpy.floor(positions)
+    f = positions - base
+    if order == LINEAR:
+        offsets = [0, 1]
+        weights = [1.0 - f, f]
+    elif order == CUBIC:
+        offsets = [-1, 0, 1, 2]
+        weights = [((-0.5 * f + 1.0) * f - 0.5) * f,
+                   (1.5 * f - 2.5) * f * f + 1.0,
+                   ((-1.5 * f + 2.0) * f + 0.5) * f,
+                   (0.5 * f - 0.5) * f * f]
+    else:
+        raise ValueError('unsupported interpolation order ' + str(order))
+    indices = numpy.clip(base[:, None].astype(numpy.intp) + offsets, 0, count - 1)
+    return outCount, indices, numpy.stack(weights, axis=1).astype(numpy.float32)
+
+
+def _interpolate(data, axis, indices, weights):
+    '''Interpolates data along axis, returns float32
+    '''
+    shape = [1] * data.ndim
+    shape[axis] = -1
+    result = None
+    for tap in range(indices.shape[1]):
+        term = numpy.take(data, indices[:, tap], axis=axis).astype(numpy.float32, copy=False)
+        term *= weights[:, tap].reshape(shape)
+        if result is None:
+            result = term
+        else:
+            result += term
+    return result
+
+
+def resample(dataArray, spacing, newSpacing=None, order=LINEAR, threads=None,
+             chunkSize=16):
+    '''Returns dataArray, indexed [z, y, x] with x, y, z voxel spacing, resampled
+    to newSpacing (see getTargetSpacing) in the input data type. Chunks of
+    chunkSize output slices are interpolated by threads threads, all cores
+    by default.
+    '''
+    spacing = [s if s > 0 else 1.0 for s in spacing[:3]]
+    newSpacing = getTargetSpacing(spacing, newSpacing)
+    # per array axis z, y, x
+    axes = [getWeights(n, s, ns, order) for n, s, ns
+            in zip(dataArray.shape, spacing[::-1], newSpacing[::-1])]
+    out = numpy.empty([a[0] for a in axes], dtype=dataArray.dtype)
+    zIndices, zWeights = axes[0][1:]
+    if dataArray.dtype.kind in 'ui':
+        info = numpy.iinfo(dataArray.dtype)
+    else:
+        info = None
+
+    def processChunk(start):
+        stop = min(start + chunkSize, out.shape[0])
+        indices = zIndices[start:stop]
+        first, last = indices.min(), indices.max() + 1
+        chunk = _interpolate(dataArray[first:last], 0, indices - first,
+                             zWeights[start:stop])
+        chunk = _interpolate(chunk, 1, *axes[1][1:])
+        chunk = _interpolate(chunk, 2, *axes[2][1:])
+        if info is not None:
+            numpy.rint(chunk, out=chunk)
+            numpy.clip(chunk, info.min, info.max, out=chunk)
+        out[start:stop] = chunk
+
+    starts = range(0, out.shape[0], chunkSize)
+    if threads is None:
+        threads = os.cpu_count() or 1
+    if threads <= 1:
+        for start in starts:
+            processChunk(start)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            # list() re-raises errors of the chunks
+            list(pool.map(processChunk, starts))
+    return out
@@ -0,0 +1,201 @@
+# threshold, connected component and region growing segmentation
+#
+# The voxels of a threshold mask are handled as runs, the scanlines of
+# consecutive mask voxels along x. Two runs are connected if they overlap
+# in neighbouring rows along y or slices along z (face connectivity). All
+# runs are found with one comparison over the flat mask, the overlapping
+# runs of the previous row and slice with binary searches or, for many
+# runs, a table of the number of runs before every voxel, and the runs are
+# merged by a vectorized union-find: every pass hooks the larger root of
+# each connected pair to the smaller one and then replaces every parent by
+# its parent until every run points at its root. Labels are numbered in
+# raster order of their first voxel and stored as uint8, uint16 or uint32,
+# whichever holds them. Sparse label volumes are painted voxel by voxel,
+# dense ones by writing each label at the start and its negative at the
+# end of its runs and summing along the flat volume.
+# The cost grows with the number of runs, so noisy volumes are best
+# smoothed first, see metaimage.filters.
+
+from __future__ import print_function, division
+
+import numpy
+
+
+def getLabelType(count):
+    '''Returns the smallest unsigned type holding labels 0 to count
+    '''
+    for dtype in (numpy.uint8, numpy.uint16, numpy.uint32):
+        if count <= numpy.iinfo(dtype).max:
+            return dtype
+    return numpy.uint64
+
+
+def threshold(dataArray, low, high=None):
+    '''Returns a uint8 volume which is 1 where low <= value <= high and 0
+    elsewhere. Without high all values of at least low are inside.
+    '''
+    mask = dataArray >= low
+    if high is not None:
+        mask &= dataArray <= high
+    return mask.view(numpy.uint8)
+
+
+def _findRuns(mask):
+    '''Returns the flat start and end (one past the last voxel) of the runs
+    of a boolean volume, in the volume with one extra voxel at the end of
+    every row, and the row length of that volume
+    '''
+    width = mask.shape[-1] + 1
+    padded = numpy.zeros((mask.size // mask.shape[-1], width + 1), numpy.bool_)
+    padded[:, 1:-1] = mask.reshape(-1, mask.shape[-1])
+    # column x of a row changes where mask[x - 1] != mask[x], the changes
+    # of a row come in start, end pairs
+    changes = numpy.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    changes = changes.astype(_getIndexType(padded.size))
+    return changes[0::2], changes[1::2], width
+
+
+def _getIndexType(size):
+    return numpy.int32 if size < 2 ** 31 else numpy.int64
+
+
+def _findOverlaps(starts, ends, countRuns, width, step, moved):
+    '''Returns the pairs of runs which overlap when the runs selected by
+    moved are moved back by step rows. countRuns returns the number of runs
+    starting at or before flat positions.
+    '''
+    runs = numpy.flatnonzero(moved).astype(starts.dtype)
+    start = starts[moved] - step * width
+    end = ends[moved] - step * width
+    # the run containing the moved start, if any, and all runs starting
+    # before the moved end
+    first = countRuns(start)
+    inside = first > 0
+    inside[inside] = ends[first[inside] - 1] > start[inside]
+    first -= inside
+    counts = countRuns(end - 1) - first
+    overlapping = counts > 0
+    # a run overlapping several runs joins them all: instead of a pair
+    # for each, pair it with the first and chain the others to their
+    # predecessors
+    several = counts > 1
+    chained = numpy.bincount(first[several], minlength=len(starts) + 1)
+    chained -= numpy.bincount((first + counts - 1)[several], minlength=len(starts) + 1)
+    chained = numpy.flatnonzero(numpy.cumsum(chained[:-1]) > 0).astype(starts.dtype)
+    return (numpy.concatenate([runs[overlapping], chained + 1]),
+            numpy.concatenate([first[overlapping], chained]))
+
+
+def _findRoots(count, a, b):
+    '''Returns the root, the smallest run, of the component of every run,
+    where runs a[i] and b[i] are connected
+    '''
+    parent = numpy.arange(count, dtype=a.dtype)
+    while len(a):
+        rootA = parent[a]
+        rootB = parent[b]
+        low = numpy.minimum(rootA, rootB)
+        high = numpy.maximum(rootA, rootB)
+        joined = low != high
+        if not joined.any():
+            break
+        # only one of several hooks of a root wins, the others are
+        # retried in the next pass
+        parent[high[joined]] = low[joined]
+        while True:
+            grandparent = parent[parent]
+            if numpy.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        a, b = a[joined], b[joined]
+    return parent
+
+
+def _getComponents(mask):
+    '''Returns the runs of a boolean volume, see _findRuns, and the root of
+    every run
+    '''
+    starts, ends, width = _findRuns(mask)
+    rows = mask.shape[1]
+    size = mask.shape[0] * rows * width
+    if len(starts) > size // 64:
+        # many runs: a table of run counts for all positions is faster
+        # than binary searches
+        runCounts = numpy.zeros(size, numpy.bool_)
+        runCounts[starts] = True
+        runCounts = numpy.cumsum(runCounts, dtype=starts.dtype)
+        countRuns = runCounts.__getitem__
+    else:
+        def countRuns(positions):
+            return numpy.searchsorted(starts, positions, 'right').astype(starts.dtype)
+    # the first row of a slice has no neighbours in the previous row
+    a, b = _findOverlaps(starts, ends, countRuns, width, 1,
+                         starts // width % rows != 0)
+    if mask.shape[0] > 1:
+        slabA, slabB = _findOverlaps(starts, ends, countRuns, width, rows,
+                                     starts >= rows * width)
+        a = numpy.concatenate([a, slabA])
+        b = numpy.concatenate([b, slabB])
+    return starts, ends, width, _findRoots(len(starts), a, b)
+
+
+def _paint(shape, width, starts, ends, values, dtype):
+    '''Returns a volume of dtype with the runs set to their values and 0
+    elsewhere
+    '''
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total < shape[0] * shape[1] * width // 8:
+        # few voxels: write them, at their positions without the extra
+        # voxel of every row
+        result = numpy.zeros(shape, dtype)
+        begin = starts - starts // width - numpy.cumsum(lengths) + lengths
+        positions = numpy.repeat(begin, lengths) + numpy.arange(total, dtype=begin.dtype)
+        result.reshape(-1)[positions] = numpy.repeat(values.astype(dtype), lengths)
+        return result
+    flat = numpy.zeros(shape[0] * shape[1] * width, dtype)
+    # unsigned sums wrap around, the end of every run cancels its start
+    values = values.astype(dtype)
+    flat[starts] = values
+    flat[ends] -= values
+    numpy.cumsum(flat, dtype=dtype, out=flat)
+    return numpy.ascontiguousarray(flat.reshape(shape[0], shape[1], width)[:, :, :-1])
+
+
+def labelComponents(dataArray, low, high=None):
+    '''Labels the face connected components of the voxels with
+    low <= value <= high. Returns the label volume, 0 outside the
+    components, and the number of components.
+    '''
+    mask = threshold(dataArray, low, high).view(numpy.bool_)
+    starts, ends, width, roots = _getComponents(mask)
+    isRoot = roots == numpy.arange(len(roots))
+    labels = numpy.cumsum(isRoot)
+    count = int(labels[-1]) if len(labels) else 0
+    return _paint(mask.shape, width, starts, ends, labels[roots],
+                  getLabelType(count)), count
+
+
+def growRegion(dataArray, seed, tolerance=10, low=None, high=None):
+    '''Returns a uint8 volume which is 1 in the face connected region of
+    voxels within tolerance of the seed value (or within low and high if
+    given) which contains the seed, an x, y, z voxel index or a
+    metaimage.picking.VoxelHit, e.g. from grabber.RayGrabber.pickVoxel.
+    '''
+    if not isinstance(seed, (tuple, list, numpy.ndarray)):
+        seed = seed.index
+    x, y, z = [int(i) for i in seed]
+    value = dataArray[z, y, x].item()
+    if low is None:
+        low = value - tolerance
+    if high is None:
+        high = value + tolerance
+    mask = threshold(dataArray, low, high).view(numpy.bool_)
+    if not mask[z, y, x]:
+        return numpy.zeros(dataArray.shape, numpy.uint8)
+    starts, ends, width, roots = _getComponents(mask)
+    position = (z * dataArray.shape[1] + y) * width + x
+    seedRun = numpy.searchsorted(starts, position, 'right') - 1
+    region = roots == roots[seedRun]
+    return _paint(mask.shape, width, starts[region], ends[region],
+                  numpy.ones(region.sum(), numpy.uint8), numpy.uint8)
@@ -0,0 +1,151 @@
+# time series of MetaImage volumes with background preloading
+#
+# Cardiac and perfusion studies are stored as one mhd/raw pair per
+# timepoint. A VolumeSequence reads all headers up front and keeps a ring of
+# preallocated volume buffers: the current timepoint and the next ones in
+# playback order are read by a background thread straight into free
+# buffers with readinto, so memory stays at ringSize volumes, nothing is
+# allocated while playing and the reader only waits for the disk when
+# playback outruns it. File reads release the GIL, so the thread runs
+# alongside the render loop. A timepoint which can't be read, e.g. a
+# missing or truncated raw file, keeps its error, which getVolume raises,
+# and the thread goes on with the other timepoints.
+
+from __future__ import print_function, division
+
+import threading
+
+import numpy
+
+from metaimage.image import MetaImage
+
+
+class VolumeSequence(object):
+    '''Timepoints of a 4D study, one MetaImage file per timepoint, all of
+    the same size and element type. Volumes returned by getVolume are ring
+    buffers, valid until the position moves on by ringSize timepoints.
+    '''
+    def __init__(self, fileNames, ringSize=4):
+        self.images = [MetaImage(fileName, doDataLoad=False) for fileName in fileNames]
+        if not self.images:
+            raise ValueError('empty sequence')
+        first = self.images[0]
+        for image in self.images[1:]:
+            if image.DimSize != first.DimSize or image.ElementType != first.ElementType:
+                raise ValueError('timepoint ' + image.fileName + ' differs in size or type')
+        self.shape = tuple(first.DimSize[::-1])
+        self.dtype = numpy.dtype(first.getDataType())
+        self.ringSize = max(1, min(ringSize, len(self.images)))
+        self.__buffers = [numpy.empty(self.shape, self.dtype) for i in range(self.ringSize)]
+        # timepoint held by every buffer, None while free or being read
+        self.__held = [None] * self.ringSize
+        # error of every timepoint which failed to load
+        self.__errors = {}
+        self.__wanted = []
+        self.__step = 1
+        self.__closed = False
+        self.__condition = threading.Condition()
+        self.setPosition(0)
+        self.__thread = threading.Thread(target=self.__load, name='VolumeSequence')
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def getCount(self):
+        return len(self.images)
+
+    def getImage(self, time):
+        '''Returns the MetaImage header of a timepoint, without voxel data
+        '''
+        return self.images[time]
+
+    def getMemorySize(self):
+        return sum(buffer.nbytes for buffer in self.__buffers)
+
+    def setPosition(self, time, step=1):
+        '''Sets the timepoint played now; it and the following timepoints in
+        steps of step, wrapping around, are loaded into the ring
+        '''
+        count = len(self.images)
+        wanted = []
+        for i in range(self.ringSize):
+            t = (time + i * step) % count
+            if t not in wanted:
+                wanted.append(t)
+        with self.__condition:
+            if wanted != self.__wanted:
+                self.__wanted = wanted
+                self.__step = step
+                # timepoints which failed are tried again when they come
+                # back into the ring
+                for t in list(self.__errors):
+                    if t not in wanted:
+                        del self.__errors[t]
+                self.__condition.notify_all()
+
+    def isLoaded(self, time):
+        with self.__condition:
+            return time in self.__held
+
+    def getVolume(self, time, timeout=None):
+        '''Returns the volume of a timepoint, indexed [z, y, x], waiting up to
+        timeout seconds (forever for None) for it to be loaded, or None if it
+        is not loaded in time. A timepoint outside the ring becomes the
+        position. Raises the error of a timepoint which failed to load.
+        '''
+        with self.__condition:
+            wanted = time in self.__wanted
+        if not wanted:
+            self.setPosition(time, self.__step)
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: time in self.__held or time in self.__errors
+                                             or self.__closed, timeout):
+                return None
+            if time in self.__errors:
+                raise self.__errors[time]
+            if time not in self.__held:
+                return None
+            return self.__buffers[self.__held.index(time)]
+
+    def __next(self):
+        '''Returns the next wanted timepoint which is not loaded and a buffer
+        to load it into, or None
+        '''
+        for time in self.__wanted:
+            if time not in self.__held and time not in self.__errors:
+                for slot, held in enumerate(self.__held):
+                    if held not in self.__wanted:
+                        return time, slot
+        return None
+
+    def __load(self):
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__closed or self.__next() is not None)
+                if self.__closed:
+                    return
+                time, slot = self.__next()
+                self.__held[slot] = None
+            buffer = self.__buffers[slot]
+            try:
+                fileName = self.images[time].getDataFileName()
+                with open(fileName, 'rb') as dataFile:
+                    count = dataFile.readinto(memoryview(buffer).cast('B'))
+                if count != buffer.nbytes:
+                    raise IOError('%s holds %d of %d bytes' % (fileName, count, buffer.nbytes))
+            except Exception as error:
+                with self.__condition:
+                    self.__errors[time] = error
+                    self.__condition.notify_all()
+                continue
+            with self.__condition:
+                self.__held[slot] = time
+                self.__condition.notify_all()
+
+    def close(self):
+        '''Stops the loading thread
+        '''
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
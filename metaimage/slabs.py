@@ -0,0 +1,148 @@
+# thick-slab projections of MetaImage volumes
+#
+# A slab of thickness k around slice i combines slices i - k // 2 to
+# i - k // 2 + k - 1 along an array axis. Average slabs use prefix sums
+# along that axis, built once, so every slab costs one subtraction per
+# pixel whatever its thickness. Maximum (MIP) and minimum (MinIP) slabs use
+# the van Herk/Gil-Werman sliding window: the slices are split into blocks
+# of k, and the running maximum from the start and from the end of each
+# block are computed once. A slab then overlaps at most two blocks and is
+# the maximum of one slice of each, so stepping the slab by one slice only
+# computes the running maxima of a new block once every k steps.
+
+from __future__ import print_function, division
+
+import collections
+
+import numpy
+
+from metaimage import layouts
+
+
+AVERAGE = 'average'
+MIP = 'mip'
+MINIP = 'minip'
+
+_REDUCE = {MIP: numpy.maximum, MINIP: numpy.minimum}
+
+
+def _copy(source, out):
+    if out is None:
+        return source.copy()
+    numpy.copyto(out, source)
+    return out
+
+
+class SlabEngine(object):
+    '''Slab projections of a volume along one array axis. The slices are
+    read from layout if one is given, see metaimage.layouts.
+
+    @param blockCache number of blocks whose running maxima or minima are kept
+    '''
+    def __init__(self, dataArray, axis=1, layout=None, blockCache=4):
+        self.dataArray = dataArray
+        self.axis = axis
+        self.layout = layout
+        self.blockCache = blockCache
+        self.__prefixSums = None
+        self.__blocks = collections.OrderedDict()
+        self.__spare = []
+
+    def getSliceCount(self):
+        return self.dataArray.shape[self.axis]
+
+    def getRange(self, index, thickness):
+        '''Returns the first and one past the last slice of the slab of the
+        given thickness around slice index, shifted to lie in the volume
+        '''
+        count = self.getSliceCount()
+        thickness = min(max(int(thickness), 1), count)
+        start = min(max(index - thickness // 2, 0), count - thickness)
+        return start, start + thickness
+
+    def getSlab(self, index, thickness, mode=MIP, out=None):
+        '''Returns the AVERAGE, MIP or MINIP slab of the given thickness
+        around slice index, oriented like numpy.take(dataArray, index, axis).
+        The slab is written to out if given, float32 for AVERAGE slabs and
+        of the volume type otherwise, or else to a new array; it is owned by
+        the caller and never shares memory with the engine's buffers.
+        '''
+        start, stop = self.getRange(index, thickness)
+        if mode == AVERAGE:
+            sums = self.__getPrefixSums()
+            return numpy.multiply(sums[stop] - sums[start],
+                                  1.0 / (stop - start), dtype=numpy.float32,
+                                  out=out)
+        if mode not in _REDUCE:
+            raise ValueError('unknown slab mode ' + str(mode))
+        if stop - start == 1:
+            return _copy(self.__getSlices(start, stop)[0], out)
+        size = stop - start
+        block = start // size
+        offset = start - block * size
+        forward, backward = self.__getBlock(mode, size, block)
+        if offset == 0:
+            # a view of backward would be overwritten once the block is evicted
+            return _copy(backward[0], out)
+        # suffix of this block and prefix of the next one
+        nextForward = self.__getBlock(mode, size, block + 1)[0]
+        return _REDUCE[mode](backward[offset], nextForward[offset - 1], out=out)
+
+    def __getSlices(self, start, stop):
+        if self.layout is not None:
+            return self.layout.getSlices(self.axis, start, stop)
+        return layouts.getSlices(self.dataArray, self.axis, start, stop)
+
+    def __getPrefixSums(self):
+        if self.__prefixSums is None:
+            slices = self.__getSlices(0, self.getSliceCount())
+            dtype = numpy.float64
+            if slices.dtype.kind in 'ui':
+                info = numpy.iinfo(slices.dtype)
+                bound = max(-int(info.min), int(info.max)) * slices.shape[0]
+                dtype = numpy.int32 if bound < 2 ** 31 else numpy.int64
+            sums = numpy.zeros((slices.shape[0] + 1,) + slices.shape[1:], dtype)
+            numpy.cumsum(slices, axis=0, dtype=dtype, out=sums[1:])
+            self.__prefixSums = sums
+        return self.__prefixSums
+
+    def __getBlock(self, mode, size, block):
+        '''Returns the running reductions of block from its start (forward)
+        and from its end (backward)
+        '''
+        key = (mode, size, block)
+        arrays = self.__blocks.get(key)
+        if arrays is not None:
+            self.__blocks.pop(key)
+            self.__blocks[key] = arrays
+            return arrays
+        start = block * size
+        stop = min(start + size, self.getSliceCount())
+        slices = self.__getSlices(start, stop)
+        reduce = _REDUCE[mode]
+        # one ufunc call per slice, much faster than reduce.accumulate
+        # along the first axis, into the buffers of an evicted block
+        forward = self.__getBuffer(slices)
+        backward = self.__getBuffer(slices)
+        forward[0] = slices[0]
+        backward[-1] = slices[-1]
+        for i in range(1, len(slices)):
+            reduce(forward[i - 1], slices[i], out=forward[i])
+            reduce(backward[-i], slices[-i - 1], out=backward[-i - 1])
+        self.__blocks[key] = forward, backward
+        while len(self.__blocks) > self.blockCache:
+            self.__spare.extend(self.__blocks.popitem(last=False)[1])
+        return forward, backward
+
+    def __getBuffer(self, like):
+        for i, buffer in enumerate(self.__spare):
+            if buffer.shape == like.shape and buffer.dtype == like.dtype:
+                return self.__spare.pop(i)
+        return numpy.empty_like(like)
+
+    def clear(self):
+        '''Releases the prefix sums and the cached blocks
+        '''
+        self.__prefixSums = None
+        self.__blocks.clear()
+        del self.__spare[:]
@@ -0,0 +1,52 @@
+# slice extraction and image export for MetaImage volumes
+#
+# Used by the slice viewer for its textures and by batch jobs writing slice
+# images. numpy and PIL are imported when the functions are first called.
+
+from __future__ import print_function, division
+
+
+def getSlice(dataArray, axis, index):
+    '''Returns slice index of the volume along an array axis
+    '''
+    import numpy
+    return numpy.take(dataArray, index, axis=axis)
+
+
+def getDownsampleFactor(shape, level):
+    '''Returns the block size of pyramid level n for an image of shape,
+    2**n clamped to the shorter side
+    '''
+    factor = 2 ** level
+    while factor > 1 and factor > min(shape[:2]):
+        factor //= 2
+    return factor
+
+
+def downsample(image, level):
+    '''Returns the image at pyramid level n, averaging blocks of 2**n by
+    2**n pixels, or smaller blocks if the image is smaller than that
+    '''
+    factor = getDownsampleFactor(image.shape, level)
+    if factor <= 1:
+        return image
+    rows = image.shape[0] // factor * factor
+    cols = image.shape[1] // factor * factor
+    blocks = image[:rows, :cols].reshape(rows // factor, factor,
+                                         cols // factor, factor)
+    return blocks.mean(axis=(1, 3))
+
+
+def toGrey(image):
+    '''Returns the image as 8 bit grey values
+    '''
+    import numpy
+    return image.astype(numpy.uint8)
+
+
+def saveImage(image, fileName):
+    '''Saves a 2D uint8 array as a grey image or a (rows, columns, 3) uint8
+    array as an RGB image
+    '''
+    from PIL import Image
+    Image.fromarray(image, 'L' if image.ndim == 2 else 'RGB').save(fileName)
@@ -0,0 +1,245 @@
+"""Coordinates several grabbers, typically one per hand. The coordinated
+grabbers share one batched intersection pass per frame, never hover or grab
+the same item at once, and can scale and rotate a held item together."""
+
+import numpy
+
+import viz
+import vizact
+import vizmat
+
+import proximity
+import spatial
+
+
+TWO_HAND_START_EVENT = viz.getEventID('GRABBER_TWO_HAND_START_EVENT')
+TWO_HAND_END_EVENT = viz.getEventID('GRABBER_TWO_HAND_END_EVENT')
+
+
+class _CoordinatedCollisionTester(object):
+	"""Collision tester used by each coordinated grabber. Instead of testing
+	the items itself, it returns the grabber's share of the coordinator's
+	batched intersection pass.
+	"""
+	def __init__(self, coordinator, index):
+		self._coordinator = coordinator
+		self._index = index
+		self._items = []
+	
+	def get(self, tag=None):
+		"""Returns the nearest item assigned to the grabber and its distance"""
+		return self._coordinator.getResult(self._index)
+	
+	def getItems(self):
+		"""Returns the list of items tested by the grabber"""
+		return self._items
+	
+	def setItems(self, items):
+		"""Sets the list of items tested by the grabber"""
+		self._items = list(items)
+		self._coordinator.invalidateItems()
+	
+	def remove(self):
+		"""Removes the collision tester"""
+		self._items = []
+
+
+class MultiHandCoordinator(object):
+	"""Runs the intersection tests of several grabbers in one pass against a
+	shared set of item bounds. When two hands target the same item, the
+	closer hand wins and the other one falls back to its next nearest item.
+	If twoHanded is enabled, a hand may grab an item held by another hand,
+	after which the distance and direction between the two hands scale and
+	rotate the item until either hand releases. scaleRange limits the scale
+	factor relative to the item's scale when the second hand grabbed it.
+	"""
+	def __init__(self,
+					grabbers,
+					radius=0.0,
+					twoHanded=True,
+					scaleRange=(0.1, 10.0),
+					updatePriority=viz.PRIORITY_LINKS+1):
+		
+		self._grabbers = list(grabbers)
+		self._radius = radius
+		self._twoHanded = twoHanded
+		self._scaleRange = scaleRange
+		
+		self._proximity = proximity.ProximityGrid(radius=radius)
+		self._itemsChanged = True
+		self._frame = None
+		self._results = [(None, -1)]*len(self._grabbers)
+		self._twoHandState = None
+		
+		self._testers = []
+		for index, grabber in enumerate(self._grabbers):
+			tester = _CoordinatedCollisionTester(self, index)
+			self._testers.append(tester)
+			previous = grabber.getCollisionTester()
+			grabber.setCollisionTester(tester)
+			previous.remove()
+			grabber.setCoordinator(self)
+		
+		self._updateEvent = vizact.onupdate(updatePriority, self._updateTwoHanded)
+	
+	def getGrabbers(self):
+		"""Returns the list of coordinated grabbers"""
+		return self._grabbers
+	
+	def getResult(self, index):
+		"""Returns the (item, distance) intersection assigned to the grabber
+		with the given index for the current frame.
+		"""
+		self._update()
+		return self._results[index]
+	
+	def invalidateItems(self):
+		"""Marks the shared item bounds for rebuilding on the next pass"""
+		self._itemsChanged = True
+	
+	def isTwoHanded(self):
+		"""Returns True while two grabbers manipulate the same item"""
+		return self._twoHandState is not None
+	
+	def setItems(self, items):
+		"""Sets the list of grabbable items on all coordinated grabbers and
+		rebuilds the shared item bounds once, instead of on the next frame
+		"""
+		for grabber in self._grabbers:
+			grabber.setItems(items)
+		self._updateItems()
+	
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, whose bounds are re-read
+		every frame
+		"""
+		self._updateItems()
+		self._proximity.setAnimatedItems(items)
+	
+	def requestGrab(self, grabber, item):
+		"""Called by a grabber before it attaches an item. Returns False if the
+		coordinator takes over the grab instead.
+		"""
+		if not self._twoHanded or self._twoHandState is not None:
+			return True
+		for other in self._grabbers:
+			if other is not grabber and other.getAttacher().getDst() == item:
+				self._startTwoHanded(other, grabber, item)
+				return False
+		return True
+	
+	def notifyRelease(self, grabber):
+		"""Called by a grabber when it releases. Ends a two handed manipulation
+		the grabber takes part in and hands the item to the other hand, which
+		still holds it.
+		"""
+		state = self._twoHandState
+		if state is None or grabber not in state[1:3]:
+			return
+		item, primary, secondary = state[:3]
+		self._twoHandState = None
+		self._proximity.markMoved([item])
+		holder = secondary if grabber is primary else primary
+		holder.takeOver(item)
+		viz.sendEvent(TWO_HAND_END_EVENT, viz.Event(item=item, primary=primary, secondary=secondary))
+	
+	def remove(self):
+		"""Removes the coordinator from its grabbers"""
+		self._updateEvent.remove()
+		for grabber in self._grabbers:
+			grabber.setCoordinator(None)
+		self._grabbers = []
+		self._testers = []
+		self._twoHandState = None
+	
+	def _getHeld(self, grabber):
+		"""Internal method which returns the item held by a grabber"""
+		state = self._twoHandState
+		if state is not None and grabber in state[1:3]:
+			return state[0]
+		return grabber.getAttacher().getDst()
+	
+	def _updateItems(self):
+		"""Internal method which rebuilds the shared item bounds after the
+		items of a grabber changed
+		"""
+		if self._itemsChanged:
+			self._proximity.setItemLists([tester.getItems() for tester in self._testers])
+			self._itemsChanged = False
+	
+	def _update(self):
+		"""Internal method which runs the batched intersection pass once per
+		frame and assigns the results to the grabbers.
+		"""
+		frame = viz.getFrameNumber()
+		if frame == self._frame:
+			return
+		self._frame = frame
+		self._updateItems()
+		
+		# held items move with the hands, so their bounds are always refit
+		heldList = [self._getHeld(grabber) for grabber in self._grabbers]
+		self._proximity.markMoved([held for held in heldList if held is not None])
+		self._proximity.refit()
+		bounds = self._proximity.bounds
+		points = [grabber.getPosition(viz.ABS_GLOBAL) for grabber in self._grabbers]
+		cols = self._proximity.getCandidates(points)
+		dist = spatial.sphereDistances(points, bounds.centers[cols], bounds.radii[cols], self._radius)
+		
+		# hands which hold something don't hover, and held items are only
+		# available to other hands for two handed manipulation
+		allowed = bounds.allowed.copy()
+		for row, held in enumerate(heldList):
+			if held is not None:
+				allowed[row, :] = False
+				col = bounds.getIndex(held)
+				if col >= 0 and (not self._twoHanded or self._twoHandState is not None):
+					allowed[:, col] = False
+		
+		assignment = spatial.assignNearest(dist, allowed[:, cols])
+		for row, col in enumerate(assignment):
+			if self._twoHandState is not None and heldList[row] is self._twoHandState[0]:
+				# keep the highlight of both hands on the shared item
+				self._results[row] = (heldList[row], 0.0)
+			elif col < 0:
+				self._results[row] = (None, -1)
+			else:
+				self._results[row] = (bounds.items[cols[col]], float(dist[row, col]))
+	
+	def _startTwoHanded(self, primary, secondary, item):
+		"""Internal method which starts a two handed manipulation"""
+		primary.getAttacher().detach()
+		self._twoHandState = (item,
+								primary,
+								secondary,
+								numpy.array(primary.getPosition(viz.ABS_GLOBAL)),
+								numpy.array(secondary.getPosition(viz.ABS_GLOBAL)),
+								item.getMatrix(viz.ABS_GLOBAL))
+		viz.sendEvent(TWO_HAND_START_EVENT, viz.Event(item=item, primary=primary, secondary=secondary))
+	
+	def _updateTwoHanded(self):
+		"""Internal method which scales and rotates the shared item about the
+		midpoint of the two hands.
+		"""
+		if self._twoHandState is None:
+			return
+		item, primary, secondary, startA, startB, startMatrix = self._twoHandState
+		a = numpy.array(primary.getPosition(viz.ABS_GLOBAL))
+		b = numpy.array(secondary.getPosition(viz.ABS_GLOBAL))
+		startDir = startB-startA
+		direction = b-a
+		startLength = numpy.linalg.norm(startDir)
+		length = numpy.linalg.norm(direction)
+		if startLength < 1e-6 or length < 1e-6:
+			return
+		
+		scale = min(max(length/startLength, self._scaleRange[0]), self._scaleRange[1])
+		rotation = vizmat.Transform()
+		rotation.makeVecRotVec(startDir.tolist(), direction.tolist())
+		
+		matrix = vizmat.Transform(startMatrix)
+		matrix.postTrans((-(startA+startB)/2.0).tolist())
+		matrix.postScale([scale, scale, scale])
+		matrix.postMult(rotation)
+		matrix.postTrans(((a+b)/2.0).tolist())
+		item.setMatrix(matrix, viz.ABS_GLOBAL)
@@ -7,6 +7,43 @@ Generated on: 2014-03-17 10:44:55.466000
 import viz
 import vizconnect
 
+import startup_timeline
+
+#################################
+# Startup
+#################################
+
+#record import time and memory per init phase and write a report
+PROFILE_STARTUP = False
+STARTUP_REPORT_FILE = 'startup_report.txt'
+
+_timeline = startup_timeline.getStartupTimeline()
+if PROFILE_STARTUP:
+	_timeline.enableProfiling(STARTUP_REPORT_FILE)
+
+#################################
+# Recording and replay
+#################################
+
+#set RECORD_FILE to record the trackers and inputs of a session, or
+#REPLAY_FILE to replay a recorded session instead of the live devices
+RECORD_FILE = None
+REPLAY_FILE = None
+#replay in real time, or one recorded frame per rendered frame
+REPLAY_REAL_TIME = True
+
+_replay = None
+_recorder = None
+
+def getReplay():
+	"""Returns the replay of REPLAY_FILE, created on first use"""
+	global _replay
+	if _replay is None:
+		import replay
+		_replay = replay.Replay(REPLAY_FILE, realTime=REPLAY_REAL_TIME)
+	return _replay
+
+
 #################################
 # Parent configuration, if any
 #################################
@@ -41,6 +78,7 @@ def preInit():
 # Group Code
 #################################
 
+@_timeline.timedInit()
 def initGroups(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawGroup = vizconnect.getRawGroupDict()
@@ -53,6 +91,7 @@ def initGroups(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Display Code
 #################################
 
+@_timeline.timedInit()
 def initDisplays(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawDisplay = vizconnect.getRawDisplayDict()
@@ -96,6 +135,7 @@ def initDisplays(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Tracker Code
 #################################
 
+@_timeline.timedInit()
 def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTracker = vizconnect.getRawTrackerDict()
@@ -109,14 +149,17 @@ def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			index = 0
 			
 			#VC: create the raw object
-			import oculus
-			sensorList = oculus.getSensors()
-			if index < len(sensorList):
-				orientationTracker = sensorList[index]
+			if REPLAY_FILE:
+				orientationTracker = getReplay().getTracker(_name)
 			else:
-				viz.logWarn("** WARNING: Oculus VR Rift Orientation Tracker not present.")
-				orientationTracker = viz.addGroup()
-				orientationTracker.invalidTracker = True
+				import oculus
+				sensorList = oculus.getSensors()
+				if index < len(sensorList):
+					orientationTracker = sensorList[index]
+				else:
+					viz.logWarn("** WARNING: Oculus VR Rift Orientation Tracker not present.")
+					orientationTracker = viz.addGroup()
+					orientationTracker.invalidTracker = True
 			rawTracker[_name] = orientationTracker
 	
 		#VC: init the wrapper (DO NOT EDIT)
@@ -143,6 +186,7 @@ def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Input Code
 #################################
 
+@_timeline.timedInit()
 def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawInput = vizconnect.getRawInputDict()
@@ -215,6 +259,7 @@ def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Event Code
 #################################
 
+@_timeline.timedInit()
 def initEvents(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawEvent = vizconnect.getRawEventDict()
@@ -227,6 +272,7 @@ def initEvents(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Transport Code
 #################################
 
+@_timeline.timedInit()
 def initTransports(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTransport = vizconnect.getRawTransportDict()
@@ -279,6 +325,7 @@ def initTransports(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Tool Code
 #################################
 
+@_timeline.timedInit()
 def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTool = vizconnect.getRawToolDict()
@@ -294,7 +341,7 @@ def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 		if initFlag&vizconnect.INIT_RAW:
 			#VC: initialization code needed by the parameters
 			import tools
-			from tools import grabber
+			import grabber
 			from tools import highlighter
 			
 			#VC: set some parameters
@@ -324,7 +371,7 @@ def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 		if initFlag&vizconnect.INIT_RAW:
 			#VC: initialization code needed by the parameters
 			import tools
-			from tools import grabber
+			import grabber
 			from tools import highlighter
 			
 			#VC: set some parameters
@@ -351,6 +398,7 @@ def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Avatar Code
 #################################
 
+@_timeline.timedInit()
 def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawAvatar = vizconnect.getRawAvatarDict()
@@ -417,7 +465,20 @@ def initSettings():
 def postInit():
 	"""Add any code here which should be called after all of the initialization of this configuration is complete.
 	Returned values can be obtained by calling getPostInitResult for this file's vizconnect.Configuration instance."""
-	return None
+	_timeline.mark('configuration done')
+	#share the intersection work of both touch controller grabbers and
+	#allow grabbing the same item with both hands
+	import multi_grabber
+	rawTool = vizconnect.getRawToolDict()
+	coordinator = multi_grabber.MultiHandCoordinator([rawTool['grabber'], rawTool['grabber2']])
+	
+	#record the session if requested
+	global _recorder
+	if RECORD_FILE:
+		import replay
+		rawTracker = vizconnect.getRawTrackerDict()
+		_recorder = replay.Recorder(RECORD_FILE, trackers={'rift_orientation_tracker':rawTracker['rift_orientation_tracker']})
+	return coordinator
 
 
 #################################
@@ -0,0 +1,177 @@
+"""Orthogonal three-plane viewer for MetaImage volumes. Axial, coronal and
+sagittal slice quads intersect at a 3D cursor, which can be grabbed and
+dragged, e.g. with the RayGrabber. Only the planes whose slice index changed
+are updated: their quads move at once and show the nearest cached slice,
+and the exact slice textures are loaded within a budget per frame, so
+dragging the cursor through a large volume doesn't stall the frame."""
+
+import collections
+
+import viz
+import vizact
+import vizshape
+
+import slice_textures
+
+
+ORTHO_CURSOR_EVENT = viz.getEventID('ORTHO_CURSOR_EVENT')
+
+AXIAL = 0
+CORONAL = 1
+SAGITTAL = 2
+
+#plane, i.e. the array axis it slices: (x, y, z dimension of its normal,
+#euler of its quad)
+_PLANES = {AXIAL:(2, [0, 0, 0]), CORONAL:(1, [0, 90, 0]), SAGITTAL:(0, [90, 0, 90])}
+
+
+class OrthogonalViewer(object):
+	"""Shows the axial, coronal and sagittal slices of a MetaImage through a
+	cursor voxel. The viewer node holds the volume in millimeters, scaled so
+	its longest side is size meters long.
+
+	@param layout layout from MetaImage.buildLayout used for slicing,
+	axis-major copies of all three axes keep slicing cheap
+	@param uploadsPerFrame exact slice textures loaded per frame
+	@param capacity slice textures cached per plane
+	@param extension image format of the slice texture files, see
+	slice_textures.SliceTextureCache
+	"""
+	def __init__(self,
+					image,
+					layout=None,
+					size=1.0,
+					pos=(0.0, 0.0, 0.0),
+					cursorRadius=0.02,
+					uploadsPerFrame=1,
+					capacity=32,
+					directory='textures',
+					extension='.bmp',
+					updatePriority=viz.PRIORITY_LINKS+1):
+		self.image = image
+		#voxel counts and spacing in x, y, z
+		self._dims = list(image.dataArray.shape[::-1])
+		self._spacing = [s if s > 0 else 1.0 for s in image.ElementSpacing[:3]]
+		extent = [n*s for n, s in zip(self._dims, self._spacing)]
+		self.node = viz.addGroup()
+		scale = size/max(extent)
+		self.node.setScale([scale]*3)
+		self.node.setPosition(pos)
+		self._caches = {}
+		self._quads = {}
+		for axis, (dim, euler) in _PLANES.items():
+			width, height = [extent[d] for d in range(3) if d != dim]
+			quad = viz.addTexQuad(size=[width, height], parent=self.node)
+			quad.setEuler(euler)
+			self._quads[axis] = quad
+			self._caches[axis] = slice_textures.SliceTextureCache(image.dataArray, axis=axis, capacity=capacity,
+																	directory=directory, prefix='Plane%d_' % axis,
+																	layout=layout, extension=extension)
+		self._extent = extent
+		self._uploadsPerFrame = uploadsPerFrame
+		self._pending = collections.OrderedDict()
+		self._index = [None, None, None]
+		self._shownIndex = [None, None, None]
+		self.cursor = vizshape.addSphere(radius=cursorRadius)
+		self._cursorPosition = None
+		self.setCursor([n//2 for n in self._dims])
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+
+	def getCursor(self):
+		"""Returns the x, y, z voxel index of the cursor"""
+		return list(self._index)
+
+	def setCursor(self, index):
+		"""Moves the cursor to an x, y, z voxel index, e.g. the index of a
+		metaimage.picking.VoxelHit
+		"""
+		index = [min(max(int(i), 0), n-1) for i, n in zip(index, self._dims)]
+		local = [(i+0.5)*s for i, s in zip(index, self._spacing)]
+		self.cursor.setPosition(self.node.getMatrix(viz.ABS_GLOBAL).preMultVec(local), viz.ABS_GLOBAL)
+		self._cursorPosition = self.cursor.getPosition(viz.ABS_GLOBAL)
+		self._setIndex(index)
+
+	def getPlane(self, axis):
+		"""Returns the quad of the AXIAL, CORONAL or SAGITTAL plane"""
+		return self._quads[axis]
+
+	def getSliceIndex(self, axis):
+		"""Returns the slice index of a plane along its array axis"""
+		return self._index[_PLANES[axis][0]]
+
+	def isSettled(self):
+		"""Returns True if all planes show their exact slice"""
+		return not self._pending
+
+	def setEnhance(self, enhance):
+		"""Switches the CLAHE contrast enhancement of the plane textures, see
+		slice_textures.SliceTextureCache.setEnhance
+		"""
+		for cache in self._caches.values():
+			cache.setEnhance(enhance)
+		self._retexture()
+
+	def setOverlay(self, labels, palette=None):
+		"""Sets the metaimage.labelmaps.RunLengthLabels overlaid on the planes,
+		see slice_textures.SliceTextureCache.setOverlay. The labels need runs
+		along all three array axes.
+		"""
+		for cache in self._caches.values():
+			cache.setOverlay(labels, palette)
+		self._retexture()
+
+	def setOverlayVisible(self, visible):
+		"""Shows or hides the label overlay of the planes"""
+		for cache in self._caches.values():
+			cache.setOverlayVisible(visible)
+		self._retexture()
+
+	def _retexture(self):
+		"""Internal method which puts the textures of the current settings
+		of the shown slices on the planes
+		"""
+		for axis, cache in self._caches.items():
+			shown = self._shownIndex[_PLANES[axis][0]]
+			if shown is not None:
+				self._quads[axis].texture(cache.getTexture(shown))
+
+	def _setIndex(self, index):
+		changed = [axis for axis, (dim, euler) in _PLANES.items() if index[dim] != self._index[dim]]
+		if not changed:
+			return
+		self._index = index
+		for axis in changed:
+			dim = _PLANES[axis][0]
+			position = [0.5*e for e in self._extent]
+			position[dim] = (index[dim]+0.5)*self._spacing[dim]
+			self._quads[axis].setPosition(position)
+			cachedIndex, texture = self._caches[axis].getNearest(index[dim])
+			if texture is not None and cachedIndex != self._shownIndex[dim]:
+				self._quads[axis].texture(texture)
+				self._shownIndex[dim] = cachedIndex
+			if self._shownIndex[dim] != index[dim]:
+				# pending planes keep their place, the longest waiting loads first
+				self._pending[axis] = True
+			else:
+				self._pending.pop(axis, None)
+		viz.sendEvent(ORTHO_CURSOR_EVENT, viz.Event(viewer=self, index=list(index), planes=changed))
+
+	def _update(self):
+		position = self.cursor.getPosition(viz.ABS_GLOBAL)
+		if position != self._cursorPosition:
+			self._cursorPosition = position
+			local = self.node.getMatrix(viz.ABS_GLOBAL).inverse().preMultVec(position)
+			index = [min(max(int(p//s), 0), n-1) for p, s, n in zip(local, self._spacing, self._dims)]
+			self._setIndex(index)
+		for i in range(min(self._uploadsPerFrame, len(self._pending))):
+			axis = self._pending.popitem(last=False)[0]
+			dim = _PLANES[axis][0]
+			self._quads[axis].texture(self._caches[axis].getTexture(self._index[dim]))
+			self._shownIndex[dim] = self._index[dim]
+
+	def remove(self):
+		self._updateEvent.remove()
+		for cache in self._caches.values():
+			cache.clear()
+		self.cursor.remove()
+		self.node.remove()
@@ -0,0 +1,152 @@
+"""Proximity queries for hand grabbers without physics. The item bounding
+spheres are kept in a spatial.SphereGrid, so finding the items within reach
+of a hand only tests the few items sharing its grid cell instead of every
+item. The grid is refit incrementally: animated items every frame, moved
+items when they are marked, and all other items a few at a time in round
+robin order."""
+
+import viz
+
+import spatial
+
+
+def _getSphere(item):
+	"""Returns the global bounding sphere of an item as a (center, radius) pair"""
+	sphere = item.getBoundingSphere(viz.ABS_GLOBAL)
+	return sphere.center, sphere.radius
+
+
+class ProximityGrid(object):
+	"""Item bounds in a sphere grid, shared by the grid based testers.
+
+	@param radius reach of the query points, added to the item radii
+	@param refitBudget number of items whose bounds are re-read per refit in
+	round robin order, which picks up items moved without being marked
+	"""
+	def __init__(self, radius=0.0, cellSize=None, refitBudget=8):
+		self.radius = radius
+		self.bounds = spatial.ItemBounds()
+		self._cellSize = cellSize
+		self._refitBudget = refitBudget
+		self._grid = spatial.SphereGrid(cellSize=cellSize, queryRadius=radius)
+		self._animated = []
+		self._moved = set()
+		self._nextRefit = 0
+
+	def setItems(self, items):
+		"""Sets the list of items and rebuilds the grid"""
+		self._rebuild(lambda: self.bounds.setItems(items))
+
+	def setItemLists(self, itemLists):
+		"""Sets the items as the union of several item lists, see
+		spatial.ItemBounds.setItemLists
+		"""
+		self._rebuild(lambda: self.bounds.setItemLists(itemLists))
+
+	def _rebuild(self, setBoundItems):
+		animated = [self.bounds.items[index] for index in self._animated]
+		setBoundItems()
+		self.bounds.update(_getSphere)
+		self._grid = spatial.SphereGrid(cellSize=self._cellSize, queryRadius=self.radius)
+		self._grid.build(self.bounds.centers, self.bounds.radii)
+		self.setAnimatedItems(animated)
+		self._moved.clear()
+		self._nextRefit = 0
+
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, whose bounds are re-read
+		on every refit
+		"""
+		self._animated = [index for index in (self.bounds.getIndex(item) for item in items) if index >= 0]
+
+	def markMoved(self, items):
+		"""Marks items moved by the application to be refit on the next refit"""
+		for item in items:
+			index = self.bounds.getIndex(item)
+			if index >= 0:
+				self._moved.add(index)
+
+	def _read(self, indices):
+		bounds = self.bounds
+		for index in indices:
+			bounds.centers[index], bounds.radii[index] = _getSphere(bounds.items[index])
+		self._grid.refit(indices, bounds.centers, bounds.radii)
+
+	def refit(self):
+		"""Re-reads the bounds of the animated and moved items and of the next
+		items in round robin order, and refits the grid
+		"""
+		count = len(self.bounds.items)
+		if not count:
+			return
+		indices = set(self._animated)
+		indices.update(self._moved)
+		self._moved.clear()
+		for i in range(min(self._refitBudget, count)):
+			indices.add((self._nextRefit+i)%count)
+		self._nextRefit = (self._nextRefit+self._refitBudget)%count
+		self._read(indices)
+
+	def getCandidates(self, points):
+		"""Returns the sorted indices of the items which may be in reach of
+		any of the points. Their bounds are re-read, so distances computed
+		from the bounds arrays are exact for them.
+		"""
+		candidates = set()
+		for point in points:
+			candidates.update(self._grid.query(point))
+		candidates = sorted(candidates)
+		self._read(candidates)
+		return candidates
+
+	def clear(self):
+		self.setItems([])
+		self._animated = []
+
+
+class GridDistance(object):
+	"""Collision tester returning the nearest item whose bounding sphere,
+	grown by radius, contains the node. Can be used in place of
+	tools.collision_test.Distance.
+	"""
+	def __init__(self, node=None, radius=0.0, cellSize=None, refitBudget=8):
+		self._node = node
+		self._grid = ProximityGrid(radius=radius, cellSize=cellSize, refitBudget=refitBudget)
+
+	def get(self, tag=None):
+		"""Returns the nearest item in reach of the node and its distance"""
+		grid = self._grid
+		grid.refit()
+		pos = self._node.getPosition(viz.ABS_GLOBAL)
+		bounds = grid.bounds
+		nearest, nearestDist = None, -1
+		for index in grid.getCandidates([pos]):
+			center = bounds.centers[index]
+			dist = ((pos[0]-center[0])**2+(pos[1]-center[1])**2+(pos[2]-center[2])**2)**0.5
+			if dist <= bounds.radii[index]+grid.radius and (nearest is None or dist < nearestDist):
+				nearest, nearestDist = bounds.items[index], float(dist)
+		return nearest, nearestDist
+
+	def getItems(self):
+		"""Returns the list of items tested by the node"""
+		return self._grid.bounds.items
+
+	def setItems(self, items):
+		"""Sets the list of items and rebuilds the grid"""
+		self._grid.setItems(items)
+
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, whose bounds are re-read
+		on every query
+		"""
+		self._grid.setAnimatedItems(items)
+
+	def markMoved(self, items):
+		"""Marks items moved by the application, e.g. placed after a release,
+		to be refit on the next query
+		"""
+		self._grid.markMoved(items)
+
+	def remove(self):
+		"""Removes the collision tester"""
+		self._grid.clear()
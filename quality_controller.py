@@ -0,0 +1,227 @@
+"""Adaptive rendering quality. A QualityController measures the frame time
+and steps quality knobs, like the slice pyramid level or the highlight
+mode, down when the frame time stays above the target and back up when it
+stays well below it. Separate thresholds, dwell times and a cooldown after
+every change keep the quality from flickering."""
+
+import viz
+import vizact
+import tools.highlighter
+
+
+QUALITY_CHANGE_EVENT = viz.getEventID('QUALITY_CHANGE_EVENT')
+
+
+class QualityKnob(object):
+	"""One quality setting with a list of values ordered from the best to
+	the cheapest quality.
+
+	@param apply called with the value whenever the level changes
+	@param minLevel best level the controller may use
+	@param maxLevel cheapest level the controller may use, defaults to the last value
+	"""
+	def __init__(self, name, values, apply, level=0, minLevel=0, maxLevel=None):
+		self.name = name
+		self._values = list(values)
+		self._apply = apply
+		self._minLevel = max(0, minLevel)
+		if maxLevel is None:
+			maxLevel = len(self._values)-1
+		self._maxLevel = min(maxLevel, len(self._values)-1)
+		self._level = min(max(level, self._minLevel), self._maxLevel)
+		self._apply(self._values[self._level])
+
+	def getLevel(self):
+		return self._level
+
+	def getValue(self):
+		return self._values[self._level]
+
+	def getValues(self):
+		return list(self._values)
+
+	def setBounds(self, minLevel, maxLevel):
+		"""Sets the range of levels the controller may use"""
+		self._minLevel = max(0, minLevel)
+		self._maxLevel = min(maxLevel, len(self._values)-1)
+		self.setLevel(self._level)
+
+	def setLevel(self, level):
+		"""Sets the level, clamped to the bounds, and returns True if it changed"""
+		level = min(max(level, self._minLevel), self._maxLevel)
+		if level == self._level:
+			return False
+		self._level = level
+		self._apply(self._values[level])
+		return True
+
+	def canDegrade(self):
+		return self._level < self._maxLevel
+
+	def canImprove(self):
+		return self._level > self._minLevel
+
+	def degrade(self):
+		return self.setLevel(self._level+1)
+
+	def improve(self):
+		return self.setLevel(self._level-1)
+
+
+def sliceLevelKnob(cache, scrubber=None, levels=(0, 1, 2), **kwargs):
+	"""Returns a knob for the pyramid level of a slice_textures.SliceTextureCache.
+	The scrubber showing the slices, if given, reloads the current slice.
+	"""
+	def apply(level):
+		cache.setLevel(level)
+		if scrubber is not None:
+			scrubber.refresh()
+	return QualityKnob('slice level', levels, apply, **kwargs)
+
+
+def highlightKnob(grabbers, modes=(tools.highlighter.MODE_OUTLINE, tools.highlighter.MODE_BOX), **kwargs):
+	"""Returns a knob for the highlight mode of grabbers or other tools with
+	get/setHighlight. Outlines need an extra render pass per highlighted
+	node, boxes do not. One highlight is created per mode, shared by all
+	tools and kept for switching back, so highlights are only swapped with
+	setHighlight and never removed. The tools' original highlights are left
+	to their owners.
+	"""
+	highlightDict = {}
+	def apply(mode):
+		highlight = highlightDict.get(mode)
+		if highlight is None:
+			highlight = highlightDict[mode] = tools.highlighter.addHighlight(mode)
+		for tool in grabbers:
+			if tool.getHighlight() is not highlight:
+				tool.setHighlight(highlight)
+	return QualityKnob('highlight', modes, apply, **kwargs)
+
+
+class QualityController(object):
+	"""Steps quality knobs to keep the frame time near a target. Knobs are
+	degraded in the order they are given and improved in reverse order.
+
+	The frame time is smoothed with an exponential moving average. A knob is
+	degraded once the average has been above degradeRatio*targetFrameTime for
+	degradeFrames frames and improved once it has been below
+	improveRatio*targetFrameTime for improveFrames frames. No knob changes
+	for cooldownFrames frames after a change. If a knob has to be degraded
+	shortly after an improvement, the wait before the next improvement
+	is doubled, up to maxImproveFrames.
+
+	@param maxFrameTime longer frames, e.g. while loading, are not measured
+	"""
+	def __init__(self,
+					knobs=(),
+					targetFrameTime=1.0/90.0,
+					degradeRatio=0.95,
+					improveRatio=0.8,
+					degradeFrames=10,
+					improveFrames=90,
+					maxImproveFrames=720,
+					cooldownFrames=30,
+					smoothing=0.1,
+					maxFrameTime=0.25,
+					updatePriority=viz.PRIORITY_DEFAULT):
+		self._knobs = list(knobs)
+		self.targetFrameTime = targetFrameTime
+		self.degradeRatio = degradeRatio
+		self.improveRatio = improveRatio
+		self.degradeFrames = degradeFrames
+		self.improveFrames = improveFrames
+		self.maxImproveFrames = maxImproveFrames
+		self.cooldownFrames = cooldownFrames
+		self.smoothing = smoothing
+		self.maxFrameTime = maxFrameTime
+		self._improveWait = improveFrames
+		self._frameTime = None
+		self._slowFrames = 0
+		self._fastFrames = 0
+		self._cooldown = 0
+		self._lastImprovedFrame = None
+		self.changeCount = 0
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+
+	def addKnob(self, knob):
+		"""Adds a knob, degraded after the knobs added before it"""
+		self._knobs.append(knob)
+
+	def getKnob(self, name):
+		for knob in self._knobs:
+			if knob.name == name:
+				return knob
+		return None
+
+	def getKnobs(self):
+		return list(self._knobs)
+
+	def getFrameTime(self):
+		"""Returns the smoothed frame time in seconds"""
+		return self._frameTime
+
+	def getLevels(self):
+		"""Returns a dictionary of knob name: level"""
+		return dict((knob.name, knob.getLevel()) for knob in self._knobs)
+
+	def setEnabled(self, flag):
+		self._updateEvent.setEnabled(flag)
+		self._slowFrames = 0
+		self._fastFrames = 0
+
+	def _update(self):
+		elapsed = viz.getFrameElapsed()
+		if elapsed <= 0 or elapsed > self.maxFrameTime:
+			return
+		if self._frameTime is None:
+			self._frameTime = elapsed
+		else:
+			self._frameTime += self.smoothing*(elapsed-self._frameTime)
+		if self._cooldown > 0:
+			self._cooldown -= 1
+			return
+		if self._frameTime > self.degradeRatio*self.targetFrameTime:
+			self._slowFrames += 1
+			self._fastFrames = 0
+			if self._slowFrames >= self.degradeFrames:
+				self._degrade()
+		elif self._frameTime < self.improveRatio*self.targetFrameTime:
+			self._fastFrames += 1
+			self._slowFrames = 0
+			if self._fastFrames >= self._improveWait:
+				self._improve()
+		else:
+			self._slowFrames = 0
+			self._fastFrames = 0
+
+	def _degrade(self):
+		for knob in self._knobs:
+			if knob.canDegrade():
+				if (self._lastImprovedFrame is not None
+						and viz.getFrameNumber()-self._lastImprovedFrame <= self._improveWait+self.cooldownFrames):
+					self._improveWait = min(2*self._improveWait, self.maxImproveFrames)
+				self._lastImprovedFrame = None
+				knob.degrade()
+				self._changed(knob)
+				return
+		self._slowFrames = 0
+
+	def _improve(self):
+		for knob in reversed(self._knobs):
+			if knob.canImprove():
+				knob.improve()
+				self._lastImprovedFrame = viz.getFrameNumber()
+				self._changed(knob)
+				return
+		self._fastFrames = 0
+		self._improveWait = self.improveFrames
+
+	def _changed(self, knob):
+		self._slowFrames = 0
+		self._fastFrames = 0
+		self._cooldown = self.cooldownFrames
+		self.changeCount += 1
+		viz.sendEvent(QUALITY_CHANGE_EVENT, viz.Event(controller=self, knob=knob, level=knob.getLevel(), value=knob.getValue()))
+
+	def remove(self):
+		self._updateEvent.remove()
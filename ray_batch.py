@@ -0,0 +1,341 @@
+"""Batched ray queries for ray based tools. All rays registered with a
+RayBatch are tested in one pass per frame against the bounding boxes of
+their items, and each hit is kept for the rest of the frame so that
+hovering, placement previews and other tools can reuse it. Like the
+proximity grid of the hand grabbers, the boxes are refit incrementally:
+animated, moved and ignored items every frame, all other items a few at a
+time in round robin order. The slab test is vectorized, except for a few
+rays and items where plain python is faster. It is only the broad phase:
+the items whose boxes a ray enters are intersected with their geometry,
+nearest box first, until no box is nearer than the nearest geometry hit,
+so rotated or thin items whose global box is much larger than they are
+don't catch the ray."""
+
+import numpy
+
+import viz
+import tools.ray_caster
+
+import spatial
+
+
+# below this many ray and box pairs the slab test runs in plain python
+SMALL_QUERY = 256
+
+
+def _getBox(item):
+	"""Returns the global bounding box of an item as a (min, max) pair"""
+	box = item.getBoundingBox(viz.ABS_GLOBAL)
+	return (box.xmin, box.ymin, box.zmin), (box.xmax, box.ymax, box.zmax)
+
+
+class RayHit(object):
+	"""Result of a ray query: the nearest item, the distance along the ray,
+	and the ray origin, direction and hit point in global coordinates. info
+	is the intersection returned by the item's intersect, None for hits of a
+	batch which doesn't test the item geometry.
+	"""
+	def __init__(self):
+		self.item = None
+		self.distance = -1
+		self.origin = numpy.zeros(3)
+		self.direction = numpy.array([0.0, 0.0, 1.0])
+		self.point = None
+		self.info = None
+
+
+class _BatchedRayTester(object):
+	"""Collision tester for a single ray of a RayBatch. The ray starts at the
+	node's global position and points along its forward direction.
+	"""
+	def __init__(self, batch, node):
+		self._batch = batch
+		self._node = node
+		self._items = []
+		self._ignored = None
+		self.hit = RayHit()
+
+	def get(self, tag=None):
+		"""Returns the nearest item hit by the ray and its distance"""
+		self._batch.update()
+		return self.hit.item, self.hit.distance
+
+	def getHit(self):
+		"""Returns the RayHit of the current frame"""
+		self._batch.update()
+		return self.hit
+
+	def getItems(self):
+		"""Returns the list of items tested by the ray"""
+		return self._items
+
+	def setItems(self, items):
+		"""Sets the list of items tested by the ray"""
+		self._items = list(items)
+		self._batch.invalidateItems()
+
+	def getIgnored(self):
+		return self._ignored
+
+	def setIgnored(self, item):
+		"""Sets an item the ray passes through, e.g. the item held by the
+		tool, or None
+		"""
+		self._ignored = item
+
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, see RayBatch"""
+		self._batch.setAnimatedItems(items)
+
+	def markMoved(self, items):
+		"""Marks items moved by the application, see RayBatch"""
+		self._batch.markMoved(items)
+
+	def getRay(self):
+		"""Returns the global origin and direction of the ray"""
+		matrix = self._node.getMatrix(viz.ABS_GLOBAL)
+		return matrix.getPosition(), matrix.getForward()
+
+	def remove(self):
+		"""Removes the ray from its batch"""
+		self._batch.removeRay(self)
+		self._items = []
+
+
+class RayBatch(object):
+	"""Answers the queries of any number of rays per frame with a single
+	slab test against the bounding boxes of the items. Hits further away
+	than maxDistance are ignored. If exact is False, the box hits are not
+	confirmed against the item geometry.
+
+	@param refitBudget number of items whose boxes are re-read per frame in
+	round robin order, which picks up items moved without being marked.
+	Exact hits are confirmed against the geometry, so a stale box can make
+	the ray miss an item for a few frames but never hit the wrong one.
+	"""
+	def __init__(self, maxDistance=100.0, exact=True, refitBudget=4):
+		self._maxDistance = maxDistance
+		self._exact = exact
+		self._refitBudget = refitBudget
+		self._bounds = spatial.ItemBounds()
+		self._testers = []
+		self._itemsChanged = True
+		self._frame = None
+		self._animated = set()
+		self._moved = set()
+		self._nextRefit = 0
+
+	def addRay(self, node):
+		"""Adds a ray following the given node and returns its collision
+		tester, which can be passed to any grabber.
+		"""
+		tester = _BatchedRayTester(self, node)
+		self._testers.append(tester)
+		self._itemsChanged = True
+		return tester
+
+	def removeRay(self, tester):
+		"""Removes a ray from the batch"""
+		if tester in self._testers:
+			self._testers.remove(tester)
+			self._itemsChanged = True
+
+	def invalidateItems(self):
+		"""Marks the item bounds for rebuilding on the next query"""
+		self._itemsChanged = True
+
+	def setAnimatedItems(self, items):
+		"""Sets the items which move by themselves, whose boxes are re-read
+		every frame
+		"""
+		self._animated = set(items)
+
+	def markMoved(self, items):
+		"""Marks items moved by the application, e.g. placed after a release,
+		whose boxes are re-read on the next frame
+		"""
+		self._moved.update(items)
+
+	def query(self, origins, directions, allowed=None):
+		"""Intersects an array of rays with the current item bounds. Returns
+		the index of the nearest item and the distance for each ray, with -1
+		for rays which don't hit anything.
+		"""
+		bounds = self._bounds
+		dist = spatial.rayBoxDistances(origins, directions, bounds.mins, bounds.maxs, self._maxDistance)
+		return spatial.nearestHits(dist, allowed)
+
+	def update(self):
+		"""Updates the hits of all registered rays once per frame"""
+		frame = viz.getFrameNumber()
+		if frame == self._frame:
+			return
+		self._frame = frame
+		bounds = self._bounds
+		if self._itemsChanged:
+			bounds.setItemLists([tester.getItems() for tester in self._testers])
+			bounds.updateBoxes(_getBox)
+			self._itemsChanged = False
+			self._moved.clear()
+			self._nextRefit = 0
+		if not self._testers:
+			return
+
+		# ignored items are usually held, so they move with the tool
+		allowed = bounds.allowed
+		refit = set(self._animated)
+		refit.update(self._moved)
+		self._moved.clear()
+		for row, tester in enumerate(self._testers):
+			ignored = tester.getIgnored()
+			if ignored is not None:
+				refit.add(ignored)
+				col = bounds.getIndex(ignored)
+				if col >= 0:
+					if allowed is bounds.allowed:
+						allowed = allowed.copy()
+					allowed[row, col] = False
+		indices = set(index for index in (bounds.getIndex(item) for item in refit) if index >= 0)
+		count = len(bounds.items)
+		for i in range(min(self._refitBudget, count)):
+			indices.add((self._nextRefit+i)%count)
+		if count:
+			self._nextRefit = (self._nextRefit+self._refitBudget)%count
+		bounds.updateBoxes(_getBox, indices)
+
+		origins = numpy.empty((len(self._testers), 3))
+		directions = numpy.empty((len(self._testers), 3))
+		for row, tester in enumerate(self._testers):
+			origins[row], directions[row] = tester.getRay()
+		if len(self._testers)*count <= SMALL_QUERY:
+			candidates = self._smallCandidates(origins.tolist(), directions.tolist(), allowed)
+		else:
+			dist = spatial.rayBoxDistances(origins, directions, bounds.mins, bounds.maxs, self._maxDistance)
+			candidates = self._candidates(numpy.where(allowed, dist, numpy.inf))
+
+		for row, tester in enumerate(self._testers):
+			hit = tester.hit
+			hit.origin = origins[row]
+			hit.direction = directions[row]
+			hit.item = None
+			hit.distance = -1
+			hit.point = None
+			hit.info = None
+			if self._exact:
+				col, distance, hit.info = self._confirm(origins[row], directions[row], candidates[row])
+			elif candidates[row]:
+				distance, col = candidates[row][0]
+			else:
+				col = -1
+			if col >= 0:
+				hit.item = bounds.items[col]
+				hit.distance = distance
+				hit.point = origins[row]+directions[row]*distance
+
+	def _candidates(self, dist):
+		"""Internal method which returns the (distance, index) pairs of the
+		boxes entered by each ray, nearest first
+		"""
+		candidates = []
+		for row in dist:
+			cols = numpy.flatnonzero(numpy.isfinite(row))
+			cols = cols[numpy.argsort(row[cols], kind='stable')]
+			candidates.append(list(zip(row[cols].tolist(), cols.tolist())))
+		return candidates
+
+	def _smallCandidates(self, origins, directions, allowed):
+		"""Internal method which does the slab test of _candidates in plain
+		python, which is faster than numpy for a few rays and items
+		"""
+		mins = self._bounds.mins.tolist()
+		maxs = self._bounds.maxs.tolist()
+		maxDistance = self._maxDistance
+		candidates = []
+		for row, (origin, direction) in enumerate(zip(origins, directions)):
+			rowAllowed = allowed[row].tolist()
+			pairs = []
+			for col, (low, high) in enumerate(zip(mins, maxs)):
+				if not rowAllowed[col]:
+					continue
+				entry = 0.0
+				exit = maxDistance
+				for axis in range(3):
+					d = direction[axis]
+					o = origin[axis]
+					if d == 0.0:
+						if o < low[axis] or o > high[axis]:
+							break
+						continue
+					t1 = (low[axis]-o)/d
+					t2 = (high[axis]-o)/d
+					if t1 > t2:
+						t1, t2 = t2, t1
+					if t1 > entry:
+						entry = t1
+					if t2 < exit:
+						exit = t2
+					if entry > exit:
+						break
+				else:
+					pairs.append((entry, col))
+			pairs.sort()
+			candidates.append(pairs)
+		return candidates
+
+	def _confirm(self, origin, direction, candidates):
+		"""Internal method which intersects a ray with the geometry of the
+		items whose boxes it enters, in the order of the box distances.
+		Returns the index of the nearest item hit, -1 if none, its distance
+		and the intersection info of the hit.
+		"""
+		items = self._bounds.items
+		begin = origin.tolist()
+		end = (origin+direction*self._maxDistance).tolist()
+		index, nearest, nearestInfo = -1, numpy.inf, None
+		for boxDistance, col in candidates:
+			# the box is entered before the geometry, so no later item is nearer
+			if boxDistance >= nearest:
+				break
+			info = items[col].intersect(begin, end)
+			if info.valid:
+				hitDist = float(numpy.linalg.norm(numpy.subtract(info.point, origin)))
+				if hitDist < nearest:
+					index, nearest, nearestInfo = col, hitDist, info
+		return index, nearest, nearestInfo
+
+
+class _NoIntersection(object):
+	valid = False
+	point = [0.0, 0.0, 0.0]
+	normal = [0.0, 0.0, 0.0]
+	object = None
+
+
+class HitRayCaster(tools.ray_caster.RayCaster):
+	"""Ray caster for the target of a tools.placer.PointAndPlace placer
+	which doesn't cast a ray of its own but returns the intersection of the
+	hit of a ray of a RayBatch, e.g. the hover ray of a RayGrabber. The
+	tester should ignore the held item, see _BatchedRayTester.setIgnored.
+	"""
+	def __init__(self, tester, **kwargs):
+		super(HitRayCaster, self).__init__(**kwargs)
+		self._tester = tester
+
+	def getIntersection(self):
+		"""Returns the intersection of the tester's hit of the current frame"""
+		info = self._tester.getHit().info
+		return _NoIntersection if info is None else info
+
+	def finalize(self):
+		"""The hit is cast by the batch"""
+		pass
+
+
+_sharedRayBatch = None
+
+def getSharedRayBatch():
+	"""Returns a RayBatch shared by all tools which don't create their own"""
+	global _sharedRayBatch
+	if _sharedRayBatch is None:
+		_sharedRayBatch = RayBatch()
+	return _sharedRayBatch
@@ -0,0 +1,225 @@
+"""Records tracker poses and input states per frame to a compact binary file
+and replays them through stand-in trackers and inputs, so a scene can be
+driven the same way on every run, either in real time or one recorded frame
+per rendered frame.
+
+File layout (little endian): the magic 'VZRP', a uint16 version, uint16
+tracker and input counts, then the tracker names, then for each input its
+name and the list of watched button codes, and finally one record per frame
+holding a float64 time stamp, 7 float32 (position and quaternion) per
+tracker and one uint32 button mask per input."""
+
+import struct
+
+import numpy
+
+import viz
+import vizact
+
+import input_bindings
+
+
+MAGIC = b'VZRP'
+VERSION = 1
+
+REPLAY_DONE_EVENT = viz.getEventID('REPLAY_DONE_EVENT')
+
+
+def frameDtype(trackerCount, inputCount):
+	"""Returns the numpy dtype of one frame record"""
+	return numpy.dtype([('time', '<f8'),
+						('poses', '<f4', (trackerCount, 7)),
+						('states', '<u4', (inputCount,))])
+
+
+def _writeString(f, text):
+	data = text.encode('utf-8')
+	f.write(struct.pack('<H', len(data)))
+	f.write(data)
+
+
+def _readString(f):
+	length, = struct.unpack('<H', f.read(2))
+	return f.read(length).decode('utf-8')
+
+
+class RecordingWriter(object):
+	"""Writes frames to a recording file. inputs is a list of (name, buttons)
+	pairs, where buttons is the list of watched button codes, or None if the
+	input's getState() mask is recorded as is.
+	"""
+	def __init__(self, fileName, trackerNames, inputs):
+		self.trackerNames = list(trackerNames)
+		self.inputs = [(name, list(buttons or [])) for name, buttons in inputs]
+		self._dtype = frameDtype(len(self.trackerNames), len(self.inputs))
+		self._record = numpy.zeros(1, dtype=self._dtype)
+		self._file = open(fileName, 'wb')
+		self._file.write(MAGIC)
+		self._file.write(struct.pack('<HHH', VERSION, len(self.trackerNames), len(self.inputs)))
+		for name in self.trackerNames:
+			_writeString(self._file, name)
+		for name, buttons in self.inputs:
+			_writeString(self._file, name)
+			self._file.write(struct.pack('<H', len(buttons)))
+			self._file.write(struct.pack('<%di' % len(buttons), *buttons))
+
+	def write(self, time, poses, states):
+		"""Writes one frame. poses holds a position and quaternion per tracker
+		and states a button mask per input.
+		"""
+		record = self._record
+		record['time'] = time
+		record['poses'] = poses
+		record['states'] = states
+		self._file.write(record.tobytes())
+
+	def close(self):
+		self._file.close()
+
+
+class Recording(object):
+	"""All frames of a recording file, loaded into one structured array"""
+	def __init__(self, fileName):
+		with open(fileName, 'rb') as f:
+			if f.read(4) != MAGIC:
+				raise ValueError('not a replay recording: ' + fileName)
+			version, trackerCount, inputCount = struct.unpack('<HHH', f.read(6))
+			if version != VERSION:
+				raise ValueError('unsupported replay version %d' % version)
+			self.trackerNames = [_readString(f) for i in range(trackerCount)]
+			self.inputs = []
+			for i in range(inputCount):
+				name = _readString(f)
+				count, = struct.unpack('<H', f.read(2))
+				self.inputs.append((name, list(struct.unpack('<%di' % count, f.read(4*count)))))
+			self.frames = numpy.frombuffer(f.read(), dtype=frameDtype(trackerCount, inputCount))
+		self.times = self.frames['time']-(self.frames['time'][0] if len(self.frames) else 0.0)
+
+	def __len__(self):
+		return len(self.frames)
+
+
+class Recorder(object):
+	"""Records the given trackers and inputs every frame until stopped.
+
+	@param trackers dict of name: node, whose position and quaternion are recorded
+	@param inputs dict of name: device or name: (device, buttons), or an
+	InputSnapshot shared with the input bindings. For a plain device its
+	getState() mask is recorded, otherwise bit i of the recorded mask is
+	device.isButtonDown(buttons[i]).
+	"""
+	def __init__(self, fileName, trackers, inputs=None, updatePriority=viz.PRIORITY_LINKS+1):
+		if not isinstance(inputs, input_bindings.InputSnapshot):
+			inputs = input_bindings.InputSnapshot(inputs)
+		self._snapshot = inputs
+		self._trackers = sorted(trackers.items())
+		names = self._snapshot.getDeviceNames()
+		self._writer = RecordingWriter(fileName,
+										[name for name, node in self._trackers],
+										[(name, self._snapshot.getButtons(name)) for name in names])
+		self._poses = numpy.zeros((len(self._trackers), 7), dtype=numpy.float32)
+		self._states = numpy.zeros(len(names), dtype=numpy.uint32)
+		self._updateEvent = vizact.onupdate(updatePriority, self._record)
+
+	def _record(self):
+		for i, (name, node) in enumerate(self._trackers):
+			self._poses[i, :3] = node.getPosition()
+			self._poses[i, 3:] = node.getQuat()
+		self._snapshot.update()
+		self._states[:] = self._snapshot.states
+		self._writer.write(viz.getFrameTime(), self._poses, self._states)
+
+	def stop(self):
+		"""Stops recording and closes the file"""
+		if self._updateEvent is not None:
+			self._updateEvent.remove()
+			self._updateEvent = None
+			self._writer.close()
+
+
+class ReplayInput(object):
+	"""Stand-in for a recorded input device. getState() returns the recorded
+	mask and isButtonDown() maps watched button codes back to their bits.
+	"""
+	def __init__(self, buttons):
+		self._bitDict = dict((button, 1<<bit) for bit, button in enumerate(buttons))
+		self._state = 0
+
+	def getState(self):
+		return self._state
+
+	def isButtonDown(self, button):
+		return bool(self._state&self._bitDict.get(button, 0))
+
+
+class Replay(object):
+	"""Plays a recording back through group nodes and ReplayInput objects,
+	which can be used in place of the recorded raw trackers and inputs.
+
+	In real time mode the frame matching the time since start() is applied,
+	otherwise each rendered frame applies the next recorded frame, so the
+	scene update loop runs through the recording as fast as it can render.
+	"""
+	def __init__(self, fileName, realTime=True, loop=False, updatePriority=-10):
+		self.recording = Recording(fileName)
+		self._realTime = realTime
+		self._loop = loop
+		self._trackers = [viz.addGroup() for name in self.recording.trackerNames]
+		self._inputs = [ReplayInput(buttons) for name, buttons in self.recording.inputs]
+		self._frame = -1
+		self._startTime = None
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+
+	def getTracker(self, name):
+		"""Returns the node replaying the tracker with the given name"""
+		return self._trackers[self.recording.trackerNames.index(name)]
+
+	def getInput(self, name):
+		"""Returns the ReplayInput replaying the input with the given name"""
+		return self._inputs[[n for n, buttons in self.recording.inputs].index(name)]
+
+	def getFrame(self):
+		"""Returns the index of the recorded frame currently applied"""
+		return self._frame
+
+	def isDone(self):
+		return self._frame >= len(self.recording)-1 and not self._loop
+
+	def start(self):
+		"""Restarts playback from the first frame"""
+		self._frame = -1
+		self._startTime = None
+
+	def _update(self):
+		count = len(self.recording)
+		if count == 0 or self.isDone():
+			return
+		if self._realTime:
+			if self._startTime is None:
+				self._startTime = viz.getFrameTime()
+			elapsed = viz.getFrameTime()-self._startTime
+			if self._loop and self.recording.times[-1] > 0:
+				elapsed %= self.recording.times[-1]
+			frame = max(0, int(numpy.searchsorted(self.recording.times, elapsed, side='right'))-1)
+		else:
+			frame = self._frame+1
+			if frame >= count:
+				frame = 0
+		if frame != self._frame:
+			self._apply(frame)
+		if self.isDone():
+			viz.sendEvent(REPLAY_DONE_EVENT, viz.Event(replay=self))
+
+	def _apply(self, frame):
+		self._frame = frame
+		record = self.recording.frames[frame]
+		for node, pose in zip(self._trackers, record['poses']):
+			node.setPosition(pose[:3].tolist())
+			node.setQuat(pose[3:].tolist())
+		for device, state in zip(self._inputs, record['states']):
+			device._state = int(state)
+
+	def remove(self):
+		self._updateEvent.remove()
+		for node in self._trackers:
+			node.remove()
@@ -0,0 +1,176 @@
+"""Grab mode for slice quads. A SliceScrubber shows the slices of a volume on
+a textured quad and sets itself as the quad's VIZ_TOOL_ATTACHER_FUNC, so a
+grabber holding the quad can only move it along its normal, which scrubs
+through the slices. While the quad moves the nearest cached slice texture is
+shown, and the exact slice is loaded once the quad comes to rest."""
+
+import collections
+
+import viz
+import vizact
+
+
+class SliceScrubAttacher(object):
+	"""Attacher which moves the scrubber's quad along its normal by the
+	distance the grabber moved along it since the grab
+	"""
+	def __init__(self, src=None, scrubber=None, updatePriority=viz.PRIORITY_LINKS):
+		self._src = src
+		self._scrubber = scrubber
+		self._dst = None
+		self._startPosition = None
+		self._startOffset = 0.0
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+		self._updateEvent.setEnabled(False)
+
+	def attach(self, dst):
+		self._dst = dst
+		self._startPosition = self._src.getPosition(viz.ABS_GLOBAL)
+		self._startOffset = self._scrubber.getOffset()
+		self._scrubber.startScrub()
+		self._updateEvent.setEnabled(True)
+
+	def detach(self):
+		if self._dst is not None:
+			self._dst = None
+			self._updateEvent.setEnabled(False)
+			self._scrubber.endScrub()
+
+	def getDst(self):
+		return self._dst
+
+	def _update(self):
+		if self._dst is None:
+			return
+		position = self._src.getPosition(viz.ABS_GLOBAL)
+		normal = self._scrubber.normal
+		along = sum((p-s)*n for p, s, n in zip(position, self._startPosition, normal))
+		self._scrubber.scrubTo(self._startOffset+along)
+
+	def remove(self):
+		self._updateEvent.remove()
+
+
+class SliceScrubber(object):
+	"""Shows the slices of a slice_textures.SliceTextureCache on a quad. Slice
+	i is shown with the quad at basePosition+i*sliceSpacing*normal.
+
+	@param settleFrames frames the quad has to rest before the exact slice is loaded
+	@param prefetchStep while scrubbing, every prefetchStep-th slice is loaded
+	into the cache, one per frame, so nearby previews exist; 0 disables it
+	"""
+	def __init__(self,
+					quad,
+					cache,
+					basePosition,
+					normal=(0.0, 0.0, 1.0),
+					sliceSpacing=1.0/255.0,
+					settleFrames=5,
+					prefetchStep=16,
+					updatePriority=viz.PRIORITY_LINKS+1):
+		self.quad = quad
+		self.cache = cache
+		self.basePosition = list(basePosition)
+		length = sum(n*n for n in normal)**0.5
+		self.normal = [n/length for n in normal]
+		self.sliceSpacing = sliceSpacing
+		self._settleFrames = settleFrames
+		self._prefetchStep = prefetchStep
+		self._prefetch = collections.deque()
+		self._index = None
+		self._shownIndex = None
+		self._stillFrames = 0
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+		self._updateEvent.setEnabled(False)
+		quad.VIZ_TOOL_ATTACHER_FUNC = self.createAttacher
+
+	def createAttacher(self, src=None):
+		"""Attacher factory used by the grabbers through VIZ_TOOL_ATTACHER_FUNC"""
+		return SliceScrubAttacher(src=src, scrubber=self)
+
+	def getSlice(self):
+		"""Returns the index of the slice the quad is at"""
+		return self._index
+
+	def getShownSlice(self):
+		"""Returns the index of the slice whose texture is on the quad"""
+		return self._shownIndex
+
+	def getOffset(self):
+		"""Returns the distance of the quad from slice 0 along the normal"""
+		position = self.quad.getPosition(viz.ABS_GLOBAL)
+		return sum((p-b)*n for p, b, n in zip(position, self.basePosition, self.normal))
+
+	def _moveTo(self, offset):
+		"""Internal method which places the quad on the normal through the
+		base position, clamped to the slices, and returns the slice index
+		"""
+		last = self.cache.getSliceCount()-1
+		offset = min(max(offset, 0.0), last*self.sliceSpacing)
+		self.quad.setPosition([b+offset*n for b, n in zip(self.basePosition, self.normal)], viz.ABS_GLOBAL)
+		return min(max(int(round(offset/self.sliceSpacing)), 0), last)
+
+	def setSlice(self, index):
+		"""Moves the quad to a slice and shows its exact texture"""
+		self._index = self._moveTo(index*self.sliceSpacing)
+		self._showExact()
+
+	def refresh(self):
+		"""Shows the exact texture of the current slice again, e.g. after the
+		pyramid level of the cache changed
+		"""
+		if self._index is not None:
+			self._showExact()
+
+	def scrubTo(self, offset):
+		"""Moves the quad to the given distance from slice 0 and shows the
+		nearest cached slice until the quad rests
+		"""
+		index = self._moveTo(offset)
+		if index == self._index:
+			return
+		self._index = index
+		self._stillFrames = 0
+		cachedIndex, texture = self.cache.getNearest(index)
+		if texture is None:
+			self._showExact()
+		elif cachedIndex != self._shownIndex:
+			self.quad.texture(texture)
+			self._shownIndex = cachedIndex
+		self._updateEvent.setEnabled(True)
+
+	def startScrub(self):
+		"""Called when a grab starts, queues the prefetch of coarse slices"""
+		if self._index is None:
+			self._index = self._moveTo(self.getOffset())
+		if self._prefetchStep > 0:
+			self._prefetch = collections.deque(index for index in range(0, self.cache.getSliceCount(), self._prefetchStep)
+												if not self.cache.isCached(index))
+		self._updateEvent.setEnabled(True)
+
+	def endScrub(self):
+		"""Called when the quad is released, shows the exact slice"""
+		self._prefetch.clear()
+		if self._index != self._shownIndex:
+			self._showExact()
+
+	def _showExact(self):
+		self.quad.texture(self.cache.getTexture(self._index))
+		self._shownIndex = self._index
+		self._stillFrames = 0
+
+	def _update(self):
+		if self._index != self._shownIndex:
+			self._stillFrames += 1
+			if self._stillFrames >= self._settleFrames:
+				self._showExact()
+			return
+		if self._prefetch:
+			# one texture per frame, so scrubbing does not stall
+			self.cache.getTexture(self._prefetch.popleft())
+			return
+		self._updateEvent.setEnabled(False)
+
+	def remove(self):
+		self._updateEvent.remove()
+		self.cache.clear()
@@ -0,0 +1,254 @@
+# texture cache for the slices of MetaImage volumes
+#
+# Slices are converted to 8 bit grey images, saved as png files and loaded
+# with viz.addTexture, like the slice viewer in MetaImageCombinedCopy.py
+# did for every slider change. The cache keeps the most recently used
+# textures, so revisiting a slice costs nothing, and can return the nearest
+# cached slice for previews while the exact one is not loaded yet. Slices
+# can be shown at a coarser pyramid level, where level n averages blocks of
+# 2**n by 2**n voxels, to save texture upload and fill rate. With a layout
+# from metaimage.layouts the slices are read from it instead of dataArray.
+# Instead of single slices the cache can show thick slabs, see
+# metaimage.slabs. The textures can be contrast enhanced with tiled CLAHE,
+# see metaimage.contrast: the grey image and the tile lookup tables of a
+# cached slice are kept with its textures, so switching the enhancement on
+# and off again only swaps textures. Label volumes stored with
+# metaimage.labelmaps can be overlaid in colour; the overlay is blended
+# with the kept grey image, so showing and hiding it doesn't extract the
+# slice again either.
+
+from __future__ import print_function, division
+
+import bisect
+import collections
+import os.path
+
+import viz
+
+from metaimage import contrast
+from metaimage import labelmaps
+from metaimage import slabs
+from metaimage import slices
+
+
+class _CachedSlice(object):
+    '''Grey image, CLAHE tile lookup tables and textures of a cached slice,
+    the textures keyed by whether they are enhanced and overlaid
+    '''
+    def __init__(self, grey):
+        self.grey = grey
+        self.luts = None
+        self.textures = {}
+
+    def remove(self):
+        for texture in self.textures.values():
+            texture.remove()
+        self.textures.clear()
+
+
+class SliceTextureCache(object):
+    '''Least recently used cache of the viz textures of the slices of a
+    volume along one array axis. The extension selects the image format of
+    the texture files; uncompressed '.bmp' files are written many times
+    faster than '.png' files. With enhance the textures are CLAHE enhanced
+    with claheTiles tile rows and columns and claheClipLimit, see
+    metaimage.contrast.getTileLuts.
+    '''
+    def __init__(self, dataArray, axis=1, capacity=64, directory='textures',
+                 prefix='TextureConventNumber', layout=None, extension='.png',
+                 enhance=False, claheTiles=(8, 8), claheClipLimit=2.0):
+        self.dataArray = dataArray
+        self.layout = layout
+        self.axis = axis
+        self.capacity = capacity
+        self.directory = directory
+        self.prefix = prefix
+        self.extension = extension
+        self.level = 0
+        self.slabThickness = 1
+        self.slabMode = None
+        self.enhance = enhance
+        self.claheTiles = tuple(claheTiles)
+        self.claheClipLimit = claheClipLimit
+        self.overlay = None
+        self.palette = None
+        self.showOverlay = False
+        self.__blendTable = None
+        self.__slabEngine = None
+        self.__slices = collections.OrderedDict()
+        self.__sortedIndices = []
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def getSliceCount(self):
+        return self.dataArray.shape[self.axis]
+
+    def getLevel(self):
+        return self.level
+
+    def setLevel(self, level):
+        '''Sets the pyramid level of the textures returned from now on. The
+        cached textures of the previous level are released.
+        '''
+        if level != self.level:
+            self.clear()
+            self.level = level
+
+    def setSlab(self, thickness=1, mode=slabs.MIP):
+        '''Shows slabs of the given thickness and mode (slabs.MIP, MINIP or
+        AVERAGE) around each slice, or single slices for a thickness of 1.
+        The cached textures of the previous setting are released.
+        '''
+        if thickness <= 1:
+            thickness, mode = 1, None
+        if (thickness, mode) != (self.slabThickness, self.slabMode):
+            self.clear()
+            self.slabThickness = thickness
+            self.slabMode = mode
+
+    def getEnhance(self):
+        return self.enhance
+
+    def setEnhance(self, enhance):
+        '''Switches the CLAHE enhancement of the textures returned from now
+        on. Nothing cached is released: slices shown in both settings keep
+        both textures.
+        '''
+        self.enhance = bool(enhance)
+
+    def setClahe(self, tiles=(8, 8), clipLimit=2.0):
+        '''Sets the CLAHE tile rows and columns and clip limit. The lookup
+        tables and enhanced textures of the previous setting are released.
+        '''
+        tiles = tuple(tiles)
+        if (tiles, clipLimit) != (self.claheTiles, self.claheClipLimit):
+            for cached in self.__slices.values():
+                cached.luts = None
+                self.__removeTextures(cached, lambda enhanced, overlaid: enhanced)
+            self.claheTiles = tiles
+            self.claheClipLimit = clipLimit
+
+    def setOverlay(self, labels, palette=None):
+        '''Sets the metaimage.labelmaps.RunLengthLabels overlaid on the
+        slices, None for no overlay, and its RGBA palette with an entry for
+        every label, by default labelmaps.getPalette. The overlaid textures
+        of the previous labels are released.
+        '''
+        for cached in self.__slices.values():
+            self.__removeTextures(cached, lambda enhanced, overlaid: overlaid)
+        self.overlay = labels
+        self.palette = palette
+        self.__blendTable = None
+        if labels is not None:
+            if palette is None:
+                self.palette = labelmaps.getPalette(labels.getLabelCount())
+            self.__blendTable = labelmaps.getBlendTable(self.palette)
+
+    def getOverlayVisible(self):
+        return self.showOverlay
+
+    def setOverlayVisible(self, visible):
+        '''Shows or hides the overlay in the textures returned from now on.
+        Like setEnhance, nothing cached is released.
+        '''
+        self.showOverlay = bool(visible)
+
+    def __isOverlaid(self):
+        return self.showOverlay and self.overlay is not None
+
+    @staticmethod
+    def __removeTextures(cached, select):
+        for key in [key for key in cached.textures if select(*key)]:
+            cached.textures.pop(key).remove()
+
+    def getSliceImage(self, index):
+        '''Returns the slice or slab as 8 bit grey values at the current level
+        '''
+        if self.slabThickness > 1:
+            if self.__slabEngine is None:
+                self.__slabEngine = slabs.SlabEngine(self.dataArray, self.axis, self.layout)
+            image = self.__slabEngine.getSlab(index, self.slabThickness, self.slabMode)
+        elif self.layout is not None:
+            image = self.layout.getSlice(self.axis, index)
+        else:
+            image = slices.getSlice(self.dataArray, self.axis, index)
+        return slices.toGrey(slices.downsample(image, self.level))
+
+    def getFileName(self, index):
+        name = self.prefix + str(index)
+        if self.slabThickness > 1:
+            name += '_%s%d' % (self.slabMode, self.slabThickness)
+        if self.level:
+            name += '_level%d' % self.level
+        if self.enhance:
+            name += '_clahe'
+        if self.__isOverlaid():
+            name += '_overlay'
+        return os.path.join(self.directory, name + self.extension)
+
+    def isCached(self, index):
+        return index in self.__slices
+
+    def getTexture(self, index):
+        '''Returns the texture of the slice, loading it if it is not cached
+        '''
+        cached = self.__slices.get(index)
+        if cached is not None:
+            self.__touch(index)
+        else:
+            cached = _CachedSlice(self.getSliceImage(index))
+            self.__slices[index] = cached
+            bisect.insort(self.__sortedIndices, index)
+            while len(self.__slices) > self.capacity:
+                self.__evict()
+        return self.__getSliceTexture(index, cached)
+
+    def getNearest(self, index):
+        '''Returns the (index, texture) pair of the cached slice nearest to
+        index, or (None, None) if the cache is empty
+        '''
+        indices = self.__sortedIndices
+        if not indices:
+            return None, None
+        pos = bisect.bisect_left(indices, index)
+        candidates = indices[max(0, pos - 1):pos + 1]
+        nearest = min(candidates, key=lambda i: abs(i - index))
+        self.__touch(nearest)
+        return nearest, self.__getSliceTexture(nearest, self.__slices[nearest])
+
+    def __getSliceTexture(self, index, cached):
+        '''Returns the texture of a cached slice for the current enhancement
+        and overlay, made from its grey image if the slice has none yet
+        '''
+        key = (self.enhance, self.__isOverlaid())
+        texture = cached.textures.get(key)
+        if texture is not None:
+            return texture
+        image = cached.grey
+        if self.enhance:
+            if cached.luts is None:
+                cached.luts = contrast.getTileLuts(image, self.claheTiles, self.claheClipLimit)
+            image = contrast.applyLuts(image, cached.luts)
+        if key[1]:
+            # nearest label of each block of the pyramid level
+            labels = self.overlay.getSlice(self.axis, index)
+            factor = slices.getDownsampleFactor(labels.shape, self.level)
+            labels = labels[::factor, ::factor]
+            image = labelmaps.blend(image, labels[:image.shape[0], :image.shape[1]], self.__blendTable)
+        fileName = self.getFileName(index)
+        slices.saveImage(image, fileName)
+        texture = cached.textures[key] = viz.addTexture(fileName)
+        return texture
+
+    def __touch(self, index):
+        cached = self.__slices.pop(index)
+        self.__slices[index] = cached
+
+    def __evict(self):
+        index, cached = self.__slices.popitem(last=False)
+        self.__sortedIndices.remove(index)
+        cached.remove()
+
+    def clear(self):
+        while self.__slices:
+            self.__evict()
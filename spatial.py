@@ -0,0 +1,253 @@
+"""Vectorized spatial queries shared by the grabber tools. Everything here
+works on plain numpy arrays of item bounds, so a single pass can answer the
+queries of several hands or rays at once and the module can be used without
+the Vizard runtime."""
+
+import math
+
+import numpy
+
+
+class ItemBounds(object):
+	"""Bounding spheres and boxes of a list of items, stored as flat arrays
+	so that all tools share one copy per frame.
+	"""
+	def __init__(self):
+		self.items = []
+		self.centers = numpy.zeros((0, 3))
+		self.radii = numpy.zeros(0)
+		self.mins = numpy.zeros((0, 3))
+		self.maxs = numpy.zeros((0, 3))
+		self.allowed = numpy.zeros((0, 0), dtype=bool)
+		self._indexDict = {}
+
+	def setItems(self, items):
+		"""Sets the list of items and resizes the bound arrays"""
+		self.items = list(items)
+		count = len(self.items)
+		self.centers = numpy.zeros((count, 3))
+		self.radii = numpy.zeros(count)
+		self.mins = numpy.zeros((count, 3))
+		self.maxs = numpy.zeros((count, 3))
+		self.allowed = numpy.ones((1, count), dtype=bool)
+		self._indexDict = dict((item, i) for i, item in enumerate(self.items))
+
+	def setItemLists(self, itemLists):
+		"""Sets the items as the union of several item lists, one per tool.
+		The allowed mask then has one row per list which marks the items of
+		that list.
+		"""
+		items = []
+		seen = set()
+		for itemList in itemLists:
+			for item in itemList:
+				if item not in seen:
+					seen.add(item)
+					items.append(item)
+		self.setItems(items)
+		self.allowed = numpy.zeros((len(itemLists), len(items)), dtype=bool)
+		for row, itemList in enumerate(itemLists):
+			for item in itemList:
+				self.allowed[row, self._indexDict[item]] = True
+
+	def getIndex(self, item):
+		"""Returns the index of the given item, or -1 if it is unknown"""
+		return self._indexDict.get(item, -1)
+
+	def update(self, getSphere):
+		"""Refreshes the bounds. getSphere is called with each item and must
+		return a (center, radius) pair.
+		"""
+		centers = self.centers
+		radii = self.radii
+		for i, item in enumerate(self.items):
+			center, radius = getSphere(item)
+			centers[i] = center
+			radii[i] = radius
+
+	def updateBoxes(self, getBox, indices=None):
+		"""Refreshes the bounding boxes of all items, or of the items with
+		the given indices. getBox is called with each item and must return a
+		(min, max) pair of corners.
+		"""
+		mins = self.mins
+		maxs = self.maxs
+		items = self.items
+		if indices is None:
+			indices = range(len(items))
+		for i in indices:
+			mins[i], maxs[i] = getBox(items[i])
+
+
+def sphereDistances(points, centers, radii, radius):
+	"""Returns the distances between every point and every sphere center as
+	an array of shape (len(points), len(centers)). Entries for spheres which
+	are not within radius of the point's surface are set to inf.
+	"""
+	points = numpy.asarray(points, dtype=float).reshape(-1, 3)
+	delta = points[:, None, :]-centers[None, :, :]
+	dist = numpy.sqrt(numpy.einsum('ijk,ijk->ij', delta, delta))
+	dist[dist > radii[None, :]+radius] = numpy.inf
+	return dist
+
+
+def assignNearest(dist, allowed=None):
+	"""Assigns each row (hand) of a distance matrix to its nearest column
+	(item) so that no two rows share an item. Rows with closer candidates
+	win conflicts, the others fall back to their next best item.
+
+	@return list of column indices, -1 for rows without a candidate
+	"""
+	dist = numpy.array(dist, dtype=float)
+	if allowed is not None:
+		dist[~allowed] = numpy.inf
+	result = [-1]*dist.shape[0]
+	if dist.shape[1] == 0:
+		return result
+	order = numpy.argsort(dist.min(axis=1), kind='stable')
+	for row in order:
+		col = int(numpy.argmin(dist[row]))
+		if numpy.isinf(dist[row, col]):
+			continue
+		result[row] = col
+		dist[:, col] = numpy.inf
+	return result
+
+
+def rayBoxDistances(origins, directions, mins, maxs, maxDistance=numpy.inf):
+	"""Intersects every ray with every box using the slab test. Returns the
+	distances along the rays to the box entry points as an array of shape
+	(len(origins), len(mins)), with inf for misses. Rays starting inside a
+	box hit it at distance 0. Directions are expected to be normalized.
+	"""
+	origins = numpy.asarray(origins, dtype=float).reshape(-1, 3)
+	directions = numpy.asarray(directions, dtype=float).reshape(-1, 3)
+	entry = numpy.zeros((origins.shape[0], mins.shape[0]))
+	exit = numpy.full(entry.shape, numpy.inf)
+	parallel = directions == 0.0
+	# parallel axes get an inverse of 0, their slabs are handled below
+	inverses = numpy.divide(1.0, directions, out=numpy.zeros_like(directions), where=~parallel)
+	parallelAxes = parallel.any(axis=0).tolist()
+	# one slab at a time keeps every operation on contiguous (rays, boxes) arrays
+	for axis in range(3):
+		origin = origins[:, axis, None]
+		inverse = inverses[:, axis, None]
+		low = mins[None, :, axis]
+		high = maxs[None, :, axis]
+		t1 = (low-origin)*inverse
+		t2 = (high-origin)*inverse
+		if parallelAxes[axis]:
+			# rays parallel to a slab either always or never overlap it
+			rows = parallel[:, axis]
+			inside = (origin[rows] >= low)&(origin[rows] <= high)
+			t1[rows] = numpy.where(inside, -numpy.inf, numpy.inf)
+			t2[rows] = numpy.inf
+		numpy.maximum(entry, numpy.minimum(t1, t2), out=entry)
+		numpy.minimum(exit, numpy.maximum(t1, t2), out=exit)
+	hit = (entry <= exit)&(entry <= maxDistance)
+	return numpy.where(hit, entry, numpy.inf)
+
+
+def nearestHits(dist, allowed=None):
+	"""Returns the index and distance of the nearest column of each row of a
+	distance matrix. Rows without a finite distance get index -1.
+	"""
+	dist = numpy.asarray(dist, dtype=float)
+	if allowed is not None:
+		dist = numpy.where(allowed, dist, numpy.inf)
+	if dist.shape[1] == 0:
+		return numpy.full(dist.shape[0], -1), numpy.full(dist.shape[0], numpy.inf)
+	index = dist.argmin(axis=1)
+	nearest = dist[numpy.arange(dist.shape[0]), index]
+	index[numpy.isinf(nearest)] = -1
+	return index, nearest
+
+
+class SphereGrid(object):
+	"""Uniform hash grid over a set of spheres, for finding the spheres near
+	a point without testing all of them. Each sphere is stored in every cell
+	its bounding box, grown by the query radius, overlaps, so a point query
+	only has to look at the cell containing the point. Spheres which would
+	cover more than maxCells cells are kept in a list checked by every query.
+	"""
+	def __init__(self, cellSize=None, queryRadius=0.0, maxCells=64):
+		self.cellSize = cellSize
+		self.queryRadius = queryRadius
+		self.maxCells = maxCells
+		self._cells = {}
+		self._ranges = []
+		self._large = set()
+
+	def _getRange(self, center, radius):
+		"""Returns the lowest and highest cell of a sphere as integer tuples"""
+		extent = radius+self.queryRadius
+		size = self.cellSize
+		low = tuple(int(math.floor((c-extent)/size)) for c in center)
+		high = tuple(int(math.floor((c+extent)/size)) for c in center)
+		return low, high
+
+	def _insert(self, index, cellRange):
+		low, high = cellRange
+		count = (high[0]-low[0]+1)*(high[1]-low[1]+1)*(high[2]-low[2]+1)
+		if count > self.maxCells:
+			self._large.add(index)
+			return
+		cells = self._cells
+		for x in range(low[0], high[0]+1):
+			for y in range(low[1], high[1]+1):
+				for z in range(low[2], high[2]+1):
+					cells.setdefault((x, y, z), set()).add(index)
+
+	def _erase(self, index, cellRange):
+		if index in self._large:
+			self._large.discard(index)
+			return
+		low, high = cellRange
+		cells = self._cells
+		for x in range(low[0], high[0]+1):
+			for y in range(low[1], high[1]+1):
+				for z in range(low[2], high[2]+1):
+					cell = cells.get((x, y, z))
+					if cell is not None:
+						cell.discard(index)
+						if not cell:
+							del cells[(x, y, z)]
+
+	def build(self, centers, radii):
+		"""Rebuilds the grid. Without a fixed cell size, the cell size is
+		twice the median sphere radius grown by the query radius.
+		"""
+		if self.cellSize is None or self.cellSize <= 0:
+			size = 2.0*(float(numpy.median(radii)) if len(radii) else 0.0)+2.0*self.queryRadius
+			self.cellSize = size if size > 0 else 1.0
+		self._cells = {}
+		self._large = set()
+		self._ranges = []
+		for index in range(len(radii)):
+			cellRange = self._getRange(centers[index], radii[index])
+			self._ranges.append(cellRange)
+			self._insert(index, cellRange)
+
+	def refit(self, indices, centers, radii):
+		"""Moves the given spheres to their new bounds. Spheres which stay
+		within their cells are not touched.
+		"""
+		for index in indices:
+			cellRange = self._getRange(centers[index], radii[index])
+			if cellRange != self._ranges[index]:
+				self._erase(index, self._ranges[index])
+				self._ranges[index] = cellRange
+				self._insert(index, cellRange)
+
+	def query(self, point):
+		"""Returns the indices of the spheres which may be within the query
+		radius of the point
+		"""
+		size = self.cellSize
+		key = (int(math.floor(point[0]/size)), int(math.floor(point[1]/size)), int(math.floor(point[2]/size)))
+		cell = self._cells.get(key)
+		if cell is None:
+			return list(self._large)
+		if self._large:
+			return list(cell|self._large)
+		return list(cell)
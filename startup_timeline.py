@@ -0,0 +1,295 @@
+"""Startup timeline for vizconnect configurations. Records how long each init
+function and component takes, and runs non-critical work deferred until
+after the first frame, one task per frame, so the display shows the scene
+while the rest is still loading. The timeline is logged once all deferred
+work is done.
+
+With profiling enabled each entry also records the time spent importing
+modules and the change of the process memory, and init functions of a
+vizconnect configuration are recorded per INIT_* phase."""
+
+import collections
+import functools
+import os
+import sys
+try:
+	import __builtin__ as builtins
+except ImportError:
+	import builtins
+
+try:
+	import psutil
+except ImportError:
+	psutil = None
+
+import viz
+import vizact
+
+
+def getProcessMemory():
+	"""Returns the memory used by the process in bytes, or None if it can
+	not be determined
+	"""
+	if psutil is not None:
+		return psutil.Process(os.getpid()).memory_info().rss
+	if sys.platform == 'win32':
+		import ctypes
+		from ctypes import wintypes
+		class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+			_fields_ = [('cb', wintypes.DWORD),
+						('PageFaultCount', wintypes.DWORD),
+						('PeakWorkingSetSize', ctypes.c_size_t),
+						('WorkingSetSize', ctypes.c_size_t),
+						('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+						('QuotaPagedPoolUsage', ctypes.c_size_t),
+						('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+						('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+						('PagefileUsage', ctypes.c_size_t),
+						('PeakPagefileUsage', ctypes.c_size_t)]
+		counters = PROCESS_MEMORY_COUNTERS()
+		counters.cb = ctypes.sizeof(counters)
+		process = ctypes.windll.kernel32.GetCurrentProcess()
+		if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+			return counters.WorkingSetSize
+		return None
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+	except (IOError, OSError, ValueError):
+		return None
+
+
+class _ImportTimer(object):
+	"""Replaces __import__ to sum up the time spent in top level imports"""
+	def __init__(self):
+		self.total = 0.0
+		self._depth = 0
+		self._original = None
+
+	def install(self):
+		if self._original is None:
+			self._original = builtins.__import__
+			builtins.__import__ = self._import
+
+	def uninstall(self):
+		if self._original is not None:
+			builtins.__import__ = self._original
+			self._original = None
+
+	def _import(self, *args, **kwargs):
+		if self._depth:
+			return self._original(*args, **kwargs)
+		self._depth = 1
+		start = viz.tick()
+		try:
+			return self._original(*args, **kwargs)
+		finally:
+			self.total += viz.tick()-start
+			self._depth = 0
+
+
+class TimelineEntry(object):
+	"""A named span of the startup, in seconds since the timeline started"""
+	def __init__(self, name, start, end=None, deferred=False):
+		self.name = name
+		self.start = start
+		self.end = end
+		self.deferred = deferred
+		self.importTime = None
+		self.memoryDelta = None
+		self.modules = []
+
+	def getDuration(self):
+		return (self.end if self.end is not None else self.start)-self.start
+
+
+class StartupTimeline(object):
+	"""Collects timeline entries and runs the deferred startup tasks"""
+	def __init__(self, updatePriority=viz.PRIORITY_LINKS+10):
+		self._startTime = viz.tick()
+		self._entries = []
+		self._deferred = collections.deque()
+		self._firstFrameTime = None
+		self._logged = False
+		self._updatePriority = updatePriority
+		self._updateEvent = vizact.onupdate(updatePriority, self._update)
+		self._importTimer = None
+		self._reportFile = None
+		self._phaseNames = None
+		self._open = {}
+
+	def enableProfiling(self, reportFile=None):
+		"""Records import time, memory delta and new modules for every entry
+		started from now on. The report is written to reportFile once all
+		deferred tasks are done.
+		"""
+		if self._importTimer is None:
+			self._importTimer = _ImportTimer()
+			self._importTimer.install()
+		self._reportFile = reportFile
+
+	def isProfiling(self):
+		return self._importTimer is not None
+
+	def now(self):
+		"""Returns the seconds since the timeline started"""
+		return viz.tick()-self._startTime
+
+	def mark(self, name):
+		"""Records an instant"""
+		self._entries.append(TimelineEntry(name, self.now()))
+
+	def begin(self, name, deferred=False):
+		"""Starts an entry, which is finished by calling end() with it"""
+		entry = TimelineEntry(name, self.now(), deferred=deferred)
+		self._entries.append(entry)
+		if self._importTimer is not None:
+			self._open[id(entry)] = (self._importTimer.total, getProcessMemory(), set(sys.modules))
+		return entry
+
+	def end(self, entry):
+		entry.end = self.now()
+		state = self._open.pop(id(entry), None)
+		if state is not None:
+			importTime, memory, modules = state
+			entry.importTime = self._importTimer.total-importTime
+			current = getProcessMemory()
+			if memory is not None and current is not None:
+				entry.memoryDelta = current-memory
+			entry.modules = sorted(set(sys.modules)-modules)
+
+	def _getPhaseNames(self):
+		"""Returns (flag, name) pairs of the single bit vizconnect INIT_* flags"""
+		if self._phaseNames is None:
+			import vizconnect
+			self._phaseNames = []
+			for name in sorted(dir(vizconnect)):
+				flag = getattr(vizconnect, name)
+				if name.startswith('INIT_') and isinstance(flag, int) and flag > 0 and not flag&(flag-1):
+					self._phaseNames.append((flag, name[5:]))
+			self._phaseNames.sort()
+		return self._phaseNames
+
+	def timedInit(self, name=None):
+		"""Decorator for the init functions of a vizconnect configuration,
+		which records every call as an entry named after the function and
+		the INIT_* phases of its initFlag
+		"""
+		def decorator(func):
+			entryName = name or func.__name__
+			@functools.wraps(func)
+			def wrapper(*args, **kwargs):
+				initFlag = kwargs.get('initFlag', args[0] if args else None)
+				phases = ''
+				if initFlag is not None:
+					names = [phase for flag, phase in self._getPhaseNames() if initFlag&flag]
+					if len(names) < len(self._getPhaseNames()):
+						phases = ' '+'|'.join(names)
+				entry = self.begin(entryName+phases)
+				try:
+					return func(*args, **kwargs)
+				finally:
+					self.end(entry)
+			return wrapper
+		return decorator
+
+	def timed(self, name=None):
+		"""Decorator recording every call of a function as an entry"""
+		def decorator(func):
+			entryName = name or func.__name__
+			@functools.wraps(func)
+			def wrapper(*args, **kwargs):
+				entry = self.begin(entryName)
+				try:
+					return func(*args, **kwargs)
+				finally:
+					self.end(entry)
+			return wrapper
+		return decorator
+
+	def defer(self, name, func, *args, **kwargs):
+		"""Runs func after the first frame was rendered. Deferred tasks run
+		in the order they were added, one per frame.
+		"""
+		self._deferred.append((name, func, args, kwargs))
+		self._logged = False
+		if self._updateEvent is None:
+			self._updateEvent = vizact.onupdate(self._updatePriority, self._update)
+
+	def getEntries(self):
+		return list(self._entries)
+
+	def getFirstFrameTime(self):
+		"""Returns the seconds until the first frame, or None before it"""
+		return self._firstFrameTime
+
+	def isDone(self):
+		"""Returns True once all deferred tasks have run"""
+		return self._firstFrameTime is not None and not self._deferred
+
+	def _update(self):
+		if self._firstFrameTime is None:
+			# the update before the first frame is drawn
+			if viz.getFrameNumber() < 1:
+				return
+			self._firstFrameTime = self.now()
+			self.mark('first frame')
+			return
+		if self._deferred:
+			name, func, args, kwargs = self._deferred.popleft()
+			entry = self.begin(name, deferred=True)
+			try:
+				func(*args, **kwargs)
+			finally:
+				self.end(entry)
+		if not self._deferred:
+			self._updateEvent.remove()
+			self._updateEvent = None
+			if not self._logged:
+				self._logged = True
+				self.log()
+				if self._reportFile:
+					self.writeReport(self._reportFile)
+
+	def format(self):
+		"""Returns the timeline as text, one entry per line"""
+		profiling = self.isProfiling()
+		header = '%-40s %10s %14s' % ('startup timeline', 'start [ms]', 'duration [ms]')
+		if profiling:
+			header += ' %11s %11s %8s' % ('import [ms]', 'memory [MB]', 'modules')
+		lines = [header]
+		for entry in sorted(self._entries, key=lambda e: e.start):
+			line = '%-40s %10.1f %14.1f' % (entry.name[:40], 1000.0*entry.start, 1000.0*entry.getDuration())
+			if profiling:
+				line += ' %11s %11s %8d' % ('-' if entry.importTime is None else '%.1f' % (1000.0*entry.importTime),
+											'-' if entry.memoryDelta is None else '%+.1f' % (entry.memoryDelta/1048576.0),
+											len(entry.modules))
+			if entry.deferred:
+				line += '  (deferred)'
+			lines.append(line)
+		return '\n'.join(lines)
+
+	def log(self):
+		print(self.format())
+
+	def writeReport(self, fileName):
+		"""Writes the timeline and the modules imported by each entry"""
+		with open(fileName, 'w') as f:
+			f.write(self.format()+'\n')
+			if self._firstFrameTime is not None:
+				f.write('\nfirst frame after %.1f ms\n' % (1000.0*self._firstFrameTime))
+			for entry in sorted(self._entries, key=lambda e: e.start):
+				if entry.modules:
+					f.write('\n%s imported:\n' % entry.name)
+					for module in entry.modules:
+						f.write('\t%s\n' % module)
+
+
+_sharedTimeline = None
+
+def getStartupTimeline():
+	"""Returns the startup timeline shared by the configuration files"""
+	global _sharedTimeline
+	if _sharedTimeline is None:
+		_sharedTimeline = StartupTimeline()
+	return _sharedTimeline
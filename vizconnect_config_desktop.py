@@ -7,6 +7,77 @@ Generated on: 2014-03-17 10:44:55.466000
 import viz
 import vizconnect
 
+import startup_timeline
+
+#################################
+# Startup
+#################################
+
+#defer non-critical components (hand gestures and renderer) until after the
+#first frame and load the scene models asynchronously
+LAZY_STARTUP = True
+
+#solve the Direct animator's skeleton only for the bones which are visible
+#or carry attachments, and only on frames in which their trackers moved
+BUDGET_ANIMATOR = True
+
+#bend the fingers with cached poses selected by an edge triggered state
+#machine, so the finger bones are only written after the gesture changed,
+#instead of the hand model re-applying the gesture every frame
+GESTURE_STATE_MACHINE = True
+
+#answer the grabber's ray with the shared ray batch instead of its own
+#collision tester. The hover hit is reused as the point and place target,
+#but the batch doesn't drive the length of the grabber's ray display
+RAY_BATCH = True
+
+#record import time and memory per init phase and write a report
+PROFILE_STARTUP = False
+STARTUP_REPORT_FILE = 'startup_report.txt'
+
+_timeline = startup_timeline.getStartupTimeline()
+if PROFILE_STARTUP:
+	_timeline.enableProfiling(STARTUP_REPORT_FILE)
+
+#################################
+# Recording and replay
+#################################
+
+#set RECORD_FILE to record the trackers and inputs of a session, or
+#REPLAY_FILE to replay a recorded session instead of the live devices
+RECORD_FILE = None
+REPLAY_FILE = None
+#replay in real time, or one recorded frame per rendered frame
+REPLAY_REAL_TIME = True
+
+#keyboard scan codes which are recorded: W, S, A, D, X, Z, Q, E
+KEYBOARD_BUTTONS = [17, 31, 30, 32, 45, 44, 16, 18]
+
+_replay = None
+
+def getReplay():
+	"""Returns the replay of REPLAY_FILE, created on first use"""
+	global _replay
+	if _replay is None:
+		import replay
+		_replay = replay.Replay(REPLAY_FILE, realTime=REPLAY_REAL_TIME)
+	return _replay
+
+_inputSnapshot = None
+
+def getInputSnapshot():
+	"""Returns the input snapshot shared by the transport, tool and gesture
+	bindings and the recorder, created on first use
+	"""
+	global _inputSnapshot
+	if _inputSnapshot is None:
+		import input_bindings
+		rawInput = vizconnect.getRawInputDict()
+		_inputSnapshot = input_bindings.InputSnapshot({'r_hand_input':rawInput['r_hand_input'],
+														'keyboard':(rawInput['keyboard'], KEYBOARD_BUTTONS)})
+	return _inputSnapshot
+
+
 #################################
 # Parent configuration, if any
 #################################
@@ -41,6 +112,7 @@ def preInit():
 # Group Code
 #################################
 
+@_timeline.timedInit()
 def initGroups(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawGroup = vizconnect.getRawGroupDict()
@@ -53,6 +125,7 @@ def initGroups(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Display Code
 #################################
 
+@_timeline.timedInit()
 def initDisplays(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawDisplay = vizconnect.getRawDisplayDict()
@@ -91,6 +164,7 @@ def initDisplays(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Tracker Code
 #################################
 
+@_timeline.timedInit()
 def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTracker = vizconnect.getRawTrackerDict()
@@ -106,8 +180,11 @@ def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			debug = False
 			
 			#VC: create the raw object
-			from vizconnect.util.virtual_trackers import MouseAndKeyboardWalking
-			rawTracker[_name] = MouseAndKeyboardWalking(positionSensitivity=positionSensitivity, rotationSensitivity=rotationSensitivity, debug=debug)
+			if REPLAY_FILE:
+				rawTracker[_name] = getReplay().getTracker(_name)
+			else:
+				from vizconnect.util.virtual_trackers import MouseAndKeyboardWalking
+				rawTracker[_name] = MouseAndKeyboardWalking(positionSensitivity=positionSensitivity, rotationSensitivity=rotationSensitivity, debug=debug)
 	
 		#VC: init the wrapper (DO NOT EDIT)
 		if initFlag&vizconnect.INIT_WRAPPERS:
@@ -124,8 +201,11 @@ def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			debug = False
 			
 			#VC: create the raw object
-			from vizconnect.util.virtual_trackers import ScrollWheel
-			rawTracker[_name] = ScrollWheel(scaleVelocityWithDistance=scaleVelocityWithDistance, extensionAccel=extensionAccel, debug=debug)
+			if REPLAY_FILE:
+				rawTracker[_name] = getReplay().getTracker(_name)
+			else:
+				from vizconnect.util.virtual_trackers import ScrollWheel
+				rawTracker[_name] = ScrollWheel(scaleVelocityWithDistance=scaleVelocityWithDistance, extensionAccel=extensionAccel, debug=debug)
 	
 		#VC: init the wrapper (DO NOT EDIT)
 		if initFlag&vizconnect.INIT_WRAPPERS:
@@ -148,6 +228,7 @@ def initTrackers(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Input Code
 #################################
 
+@_timeline.timedInit()
 def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawInput = vizconnect.getRawInputDict()
@@ -158,7 +239,10 @@ def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 		#VC: init the raw object
 		if initFlag&vizconnect.INIT_RAW:
 			#VC: create the raw object
-			rawInput[_name] = viz.mouse
+			if REPLAY_FILE:
+				rawInput[_name] = getReplay().getInput(_name)
+			else:
+				rawInput[_name] = viz.mouse
 	
 		#VC: init the wrapper (DO NOT EDIT)
 		if initFlag&vizconnect.INIT_WRAPPERS:
@@ -173,9 +257,12 @@ def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			index = 0
 			
 			#VC: create the raw object
-			d = viz.add('directinput.dle')
-			device = d.getKeyboardDevices()[index]
-			rawInput[_name] = d.addKeyboard(device)
+			if REPLAY_FILE:
+				rawInput[_name] = getReplay().getInput(_name)
+			else:
+				d = viz.add('directinput.dle')
+				device = d.getKeyboardDevices()[index]
+				rawInput[_name] = d.addKeyboard(device)
 	
 		#VC: init the wrapper (DO NOT EDIT)
 		if initFlag&vizconnect.INIT_WRAPPERS:
@@ -189,6 +276,7 @@ def initInputs(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Event Code
 #################################
 
+@_timeline.timedInit()
 def initEvents(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawEvent = vizconnect.getRawEventDict()
@@ -201,6 +289,7 @@ def initEvents(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Transport Code
 #################################
 
+@_timeline.timedInit()
 def initTransports(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTransport = vizconnect.getRawTransportDict()
@@ -249,27 +338,20 @@ def initTransports(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 		if initFlag&vizconnect.INIT_MAPPINGS:
 			#VC: per frame mappings
 			if initFlag&vizconnect.INIT_MAPPINGS_PER_FRAME:
-				#VC: get the raw input dict so we have access to signals
-				import vizact
-				rawInput = vizconnect.getConfiguration().getRawDict('input')
-				#VC: set the update function which checks for input signals
+				#VC: bind the input signals to the transport, the keyboard is read once per frame
+				import input_bindings
+				bindings = input_bindings.BindingTable(getInputSnapshot(), rawTransport[_name])
+				bindings.bind('keyboard', 17, 'moveForward', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key W
+				bindings.bind('keyboard', 31, 'moveBackward', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key S
+				bindings.bind('keyboard', 30, 'moveLeft', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key A
+				bindings.bind('keyboard', 32, 'moveRight', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key D
+				bindings.bind('keyboard', 45, 'moveUp', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key X
+				bindings.bind('keyboard', 44, 'moveDown', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key Z
+				bindings.bind('keyboard', 16, 'turnLeft', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key Q
+				bindings.bind('keyboard', 18, 'turnRight', mag=1)# make=Generic, model=Keyboard, name=keyboard, signal=Key E
+				rawTransport[_name].bindings = bindings
 				def update(transport):
-					if rawInput['keyboard'].isButtonDown(17):# make=Generic, model=Keyboard, name=keyboard, signal=Key W
-						transport.moveForward(mag=1)
-					if rawInput['keyboard'].isButtonDown(31):# make=Generic, model=Keyboard, name=keyboard, signal=Key S
-						transport.moveBackward(mag=1)
-					if rawInput['keyboard'].isButtonDown(30):# make=Generic, model=Keyboard, name=keyboard, signal=Key A
-						transport.moveLeft(mag=1)
-					if rawInput['keyboard'].isButtonDown(32):# make=Generic, model=Keyboard, name=keyboard, signal=Key D
-						transport.moveRight(mag=1)
-					if rawInput['keyboard'].isButtonDown(45):# make=Generic, model=Keyboard, name=keyboard, signal=Key X
-						transport.moveUp(mag=1)
-					if rawInput['keyboard'].isButtonDown(44):# make=Generic, model=Keyboard, name=keyboard, signal=Key Z
-						transport.moveDown(mag=1)
-					if rawInput['keyboard'].isButtonDown(16):# make=Generic, model=Keyboard, name=keyboard, signal=Key Q
-						transport.turnLeft(mag=1)
-					if rawInput['keyboard'].isButtonDown(18):# make=Generic, model=Keyboard, name=keyboard, signal=Key E
-						transport.turnRight(mag=1)
+					bindings.dispatch()
 				rawTransport[_name].setUpdateFunction(update)
 	
 		#VC: init the wrapper (DO NOT EDIT)
@@ -291,6 +373,7 @@ def initTransports(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Tool Code
 #################################
 
+@_timeline.timedInit()
 def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawTool = vizconnect.getRawToolDict()
@@ -307,28 +390,30 @@ def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			#VC: initialization code needed by the parameters
 			import tools
 			import grabber
+			import ray_batch
 			from tools import highlighter
 			
 			#VC: set some parameters
 			usingPhysics = False
 			highlightMode = tools.highlighter.MODE_OUTLINE
 			placementMode = tools.placer.MODE_MID_AIR
+			rayBatch = ray_batch.getSharedRayBatch() if RAY_BATCH else None
 			
 			#VC: create the raw object
 			#rawTool[_name] = grabber.Grabber(usingPhysics=usingPhysics, usingSprings=usingPhysics, highlightMode=highlightMode, placementMode=placementMode, updatePriority=vizconnect.PRIORITY_ANIMATOR+3)
-			rawTool[_name] = grabber.RayGrabber(usingPhysics=usingPhysics, highlightMode=highlightMode, updatePriority=vizconnect.PRIORITY_ANIMATOR+3)
+			rawTool[_name] = grabber.RayGrabber(usingPhysics=usingPhysics, highlightMode=highlightMode, rayBatch=rayBatch, updatePriority=vizconnect.PRIORITY_ANIMATOR+3)
 	
 		#VC: init the mappings for the raw object
 		if initFlag&vizconnect.INIT_MAPPINGS:
 			#VC: per frame mappings
 			if initFlag&vizconnect.INIT_MAPPINGS_PER_FRAME:
-				#VC: get the raw input dict so we have access to signals
-				import vizact
-				rawInput = vizconnect.getConfiguration().getRawDict('input')
-				#VC: set the update function which checks for input signals
+				#VC: bind the input signals to the tool
+				import input_bindings
+				bindings = input_bindings.BindingTable(getInputSnapshot(), rawTool[_name])
+				bindings.bind('r_hand_input', viz.MOUSEBUTTON_LEFT, 'grabAndHold')# make=Generic, model=Mouse Buttons, name=r_hand_input, signal=Left Mouse Button
+				rawTool[_name].bindings = bindings
 				def update(tool):
-					if rawInput['r_hand_input'].getState()&viz.MOUSEBUTTON_LEFT:# make=Generic, model=Mouse Buttons, name=r_hand_input, signal=Left Mouse Button
-						tool.grabAndHold()
+					bindings.dispatch()
 				rawTool[_name].setUpdateFunction(update)
 	
 		#VC: init the wrapper (DO NOT EDIT)
@@ -347,6 +432,7 @@ def initTools(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 # Avatar Code
 #################################
 
+@_timeline.timedInit()
 def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	#VC: place any general initialization code here
 	rawAvatar = vizconnect.getRawAvatarDict()
@@ -378,6 +464,9 @@ def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			avatar.visible(lowerBody, r'mark_legs.cmf')
 			avatar.visible(rightArm, r'mark_arm_r.cmf')
 			avatar.visible(leftArm, r'mark_arm_l.cmf')
+			avatar._visibleBones = [bone for bone, visible in ((vizconnect.AVATAR_HEAD, head),
+																(vizconnect.AVATAR_R_HAND, rightHand),
+																(vizconnect.AVATAR_L_HAND, leftHand)) if visible]
 			rawAvatar[_name] = avatar
 	
 		#VC: init the wrapper (DO NOT EDIT)
@@ -386,9 +475,8 @@ def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 	
 		#VC: init the gestures
 		if initFlag&vizconnect.INIT_GESTURES:
-			#VC: need to get the raw input dict so we have access to signals
-			import vizact
-			rawInput = vizconnect.getConfiguration().getRawDict('input')
+			#VC: the gestures read the input snapshot shared with the bindings
+			snapshot = getInputSnapshot()
 			
 			#VC: gestures for the avatar's r_hand
 			import hand
@@ -396,30 +484,45 @@ def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 				sensor = hand.InputSensor()
 				rawAvatar[_name].handSensor = sensor
 				sensor.createHandRenderer = lambda *args,**kw: hand._InputDeviceRenderer(*args,**kw)
+				fistData = (hand.GESTURE_FIST, False, False)
+				flatData = (hand.GESTURE_FLAT_HAND, False, False)
 				def appliedGetData():
 					#VC: set the mappings for the gestures
-					if rawInput['r_hand_input'].getState()&viz.MOUSEBUTTON_LEFT:# make=Generic, model=Mouse Buttons, name=r_hand_input, signal=Left Mouse Button
-						return (hand.GESTURE_FIST, False, False)# GESTURE_FIST
+					if snapshot.getState('r_hand_input')&viz.MOUSEBUTTON_LEFT:# make=Generic, model=Mouse Buttons, name=r_hand_input, signal=Left Mouse Button
+						return fistData# GESTURE_FIST
 					#VC: end gesture mappings
-					return (hand.GESTURE_FLAT_HAND,False,False)
+					return flatData
 				sensor.getData = appliedGetData
 				return hand.AvatarHandModel(rawAvatar[_name], left=False, type=hand.GLOVE_5DT, sensor=sensor)
-			rightHand = initHand()
-			rawAvatar[_name]._bodyPartDict[vizconnect.AVATAR_R_HAND] = rightHand
-			rawAvatar[_name]._handModelDict[vizconnect.AVATAR_R_HAND] = rightHand
+			def initGestureHand(name):
+				import hand_gestures
+				flexionDict = {hand.GESTURE_FIST:(1, 1, 1, 1, 1), hand.GESTURE_FLAT_HAND:(0, 0, 0, 0, 0)}
+				return hand_gestures.addGestureHand(rawAvatar[name],
+													snapshot,
+													[('r_hand_input', viz.MOUSEBUTTON_LEFT, hand.GESTURE_FIST)],# make=Generic, model=Mouse Buttons, name=r_hand_input, signal=Left Mouse Button
+													hand.GESTURE_FLAT_HAND,
+													flexionDict,
+													left=False)
+			def initGestures(name):
+				if GESTURE_STATE_MACHINE:
+					# the blender bends the finger bones in place of a hand model
+					rawAvatar[name].gestureHand = initGestureHand(name)
+					return
+				rightHand = initHand()
+				rawAvatar[name]._bodyPartDict[vizconnect.AVATAR_R_HAND] = rightHand
+				rawAvatar[name]._handModelDict[vizconnect.AVATAR_R_HAND] = rightHand
+				
+				#VC: gestures may change the raw avatar, so refresh the raw in the wrapper
+				vizconnect.getAvatar(name).setRaw(rawAvatar[name])
 			
-			#VC: gestures may change the raw avatar, so refresh the raw in the wrapper
-			vizconnect.getAvatar(_name).setRaw(rawAvatar[_name])
+			#the hand model and its renderer are not needed for the first frame
+			if LAZY_STARTUP:
+				_timeline.defer(_name+' gestures', initGestures, _name)
+			else:
+				initGestures(_name)
 	
 		#VC: init the animator
 		if initFlag&vizconnect.INIT_ANIMATOR:
-			# need to get the raw tracker dict for animating the avatars
-			from vizconnect.util.avatar import animator
-			from vizconnect.util.avatar import skeleton
-			
-			# get the skeleton from the avatar
-			_skeleton = skeleton.CompleteCharactersHD(rawAvatar[_name])
-			
 			#VC: set which trackers animate which body part
 			# format is: bone: (tracker, parent, degrees of freedom used)
 			_trackerAssignmentDict = {
@@ -428,7 +531,23 @@ def initAvatars(initFlag=vizconnect.INIT_INDEPENDENT, initList=None):
 			}
 			
 			#VC: create the raw object
-			_rawAnimator = animator.Direct(rawAvatar[_name], _skeleton, _trackerAssignmentDict)
+			# need to get the raw tracker dict for animating the avatars
+			from vizconnect.util.avatar import animator
+			from vizconnect.util.avatar import skeleton
+			
+			# get the skeleton from the avatar
+			_skeleton = skeleton.CompleteCharactersHD(rawAvatar[_name])
+			if BUDGET_ANIMATOR:
+				# only solve the visible bones and the bones carrying the display
+				# and the grabber, and only on frames in which a tracker moved
+				import avatar_animator
+				_rawAnimator = avatar_animator.BudgetAnimator(rawAvatar[_name],
+																_skeleton,
+																_trackerAssignmentDict,
+																visibleBones=rawAvatar[_name]._visibleBones,
+																attachedBones=[vizconnect.AVATAR_HEAD, vizconnect.AVATAR_R_HAND])
+			else:
+				_rawAnimator = animator.Direct(rawAvatar[_name], _skeleton, _trackerAssignmentDict)
 			
 			#VC: set animator in wrapper (DO NOT EDIT)
 			vizconnect.getAvatar(_name).setAnimator(_rawAnimator, make='Virtual', model='Direct')
@@ -465,6 +584,14 @@ def initSettings():
 def postInit():
 	"""Add any code here which should be called after all of the initialization of this configuration is complete.
 	Returned values can be obtained by calling getPostInitResult for this file's vizconnect.Configuration instance."""
+	_timeline.mark('configuration done')
+	#record the session if requested
+	if RECORD_FILE:
+		import replay
+		rawTracker = vizconnect.getRawTrackerDict()
+		return replay.Recorder(RECORD_FILE,
+								trackers={'head_tracker':rawTracker['head_tracker'], 'r_hand_tracker':rawTracker['r_hand_tracker']},
+								inputs=getInputSnapshot())
 	return None
 
 
@@ -487,6 +614,7 @@ def initInterface():
 
 if __name__ == "__main__":
 	initInterface()
-	viz.add('piazza.osgb')
-	viz.add('piazza_animations.osgb')
+	_flags = viz.LOAD_ASYNC if LAZY_STARTUP else 0
+	viz.addChild('piazza.osgb', flags=_flags)
+	viz.addChild('piazza_animations.osgb', flags=_flags)
 